@@ -0,0 +1,424 @@
+"""
+Local stand-in for the ANS open data server, used by the benchmarks.
+
+It generates synthetic ZIP files with the real column layouts of the
+Beneficiários and Demonstrações Contábeis datasets, laid out like
+`dadosabertos.ans.gov.br/FTP/PDA/`, and serves them over HTTP with Apache-style
+directory listings, ETag/Last-Modified validation (304), HEAD and Range
+requests. An artificial latency can be added to every request to imitate a
+remote server.
+
+Run it on its own with:
+
+    python benchmarks/ans_server.py --port 8000 --states SP RJ MG
+"""
+
+import argparse
+import html
+import os
+import random
+import threading
+import time
+import zipfile
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+BENEFICIARIOS_DIR = "informacoes_consolidadas_de_beneficiarios-024"
+DEMONSTRACOES_DIR = "demonstracoes_contabeis"
+
+BENEFICIARIOS_COLUMNS = [
+    "ID_CMPT_MOVEL",
+    "CD_OPERADORA",
+    "NM_RAZAO_SOCIAL",
+    "NR_CNPJ",
+    "MODALIDADE_OPERADORA",
+    "SG_UF",
+    "CD_MUNICIPIO",
+    "NM_MUNICIPIO",
+    "TP_SEXO",
+    "DE_FAIXA_ETARIA",
+    "DE_FAIXA_ETARIA_REAJ",
+    "CD_PLANO",
+    "TP_VIGENCIA_PLANO",
+    "DE_CONTRATACAO_PLANO",
+    "DE_SEGMENTACAO_PLANO",
+    "DE_ABRG_GEOGRAFICA_PLANO",
+    "COBERTURA_ASSIST_PLAN",
+    "TIPO_VINCULO",
+    "QT_BENEFICIARIO_ATIVO",
+    "QT_BENEFICIARIO_ADERIDO",
+    "QT_BENEFICIARIO_CANCELADO",
+    "DT_CARGA",
+]
+
+DEMONSTRACOES_COLUMNS = [
+    "DATA",
+    "REG_ANS",
+    "CD_CONTA_CONTABIL",
+    "DESCRICAO",
+    "VL_SALDO_INICIAL",
+    "VL_SALDO_FINAL",
+]
+
+MODALIDADES = [
+    "Cooperativa Médica",
+    "Medicina de Grupo",
+    "Seguradora Especializada em Saúde",
+    "Autogestão",
+    "Filantropia",
+]
+FAIXAS_ETARIAS = [
+    "00 a 18 anos",
+    "19 a 23 anos",
+    "24 a 28 anos",
+    "29 a 33 anos",
+    "34 a 38 anos",
+    "39 a 43 anos",
+    "44 a 48 anos",
+    "49 a 53 anos",
+    "54 a 58 anos",
+    "59 ou mais",
+]
+CONTRATACOES = [
+    "Individual ou Familiar",
+    "Coletivo Empresarial",
+    "Coletivo por Adesão",
+]
+SEGMENTACOES = ["Ambulatorial", "Hospitalar", "Referência", "Odontológico"]
+ABRANGENCIAS = ["Municipal", "Grupo de Municípios", "Estadual", "Nacional"]
+CONTAS = [
+    "1",
+    "11",
+    "111",
+    "1111",
+    "112",
+    "12",
+    "2",
+    "21",
+    "211",
+    "23",
+    "3",
+    "31",
+    "311",
+    "32",
+    "4",
+    "41",
+    "411",
+]
+
+
+# Data generation ----------
+
+
+def _beneficiarios_csv(state: str, month: str, n_rows: int, seed: int) -> str:
+    rng = random.Random(seed)
+    operators = [rng.randint(300000, 499999) for _ in range(200)]
+    municipios = [rng.randint(1100000, 5300000) for _ in range(100)]
+
+    lines = [";".join(BENEFICIARIOS_COLUMNS)]
+    for _ in range(n_rows):
+        operator = rng.choice(operators)
+        municipio = rng.choice(municipios)
+        faixa = rng.choice(FAIXAS_ETARIAS)
+        lines.append(
+            ";".join(
+                [
+                    month,
+                    str(operator),
+                    f"OPERADORA {operator} LTDA",
+                    f"{operator:014d}",
+                    MODALIDADES[operator % len(MODALIDADES)],
+                    state,
+                    str(municipio),
+                    f"MUNICIPIO {municipio}",
+                    rng.choice("MF"),
+                    faixa,
+                    faixa,
+                    str(rng.randint(400000000, 499999999)),
+                    rng.choice("PA"),
+                    rng.choice(CONTRATACOES),
+                    rng.choice(SEGMENTACOES),
+                    rng.choice(ABRANGENCIAS),
+                    "Médico-hospitalar",
+                    rng.choice(["Titular", "Dependente"]),
+                    str(rng.randint(0, 500)),
+                    str(rng.randint(0, 20)),
+                    str(rng.randint(0, 20)),
+                    f"{month[:4]}-{month[4:]}-28",
+                ]
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _demonstracoes_csv(quarter: str, n_rows: int, seed: int) -> str:
+    rng = random.Random(seed)
+    number, year = quarter.split("T")
+    date = f"{year}-{int(number) * 3 - 2:02d}-01"
+    n_operators = max(1, n_rows // len(CONTAS))
+
+    lines = [";".join(f'"{c}"' for c in DEMONSTRACOES_COLUMNS)]
+    for i in range(n_operators):
+        reg_ans = 300000 + i
+        for conta in CONTAS:
+            inicial = rng.randint(0, 10**9) / 100
+            final = rng.randint(0, 10**9) / 100
+            lines.append(
+                ";".join(
+                    f'"{v}"'
+                    for v in [
+                        date,
+                        reg_ans,
+                        conta,
+                        f"CONTA {conta}",
+                        f"{inicial:.2f}".replace(".", ","),
+                        f"{final:.2f}".replace(".", ","),
+                    ]
+                )
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _write_zip(path: str, csv_name: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(csv_name, content.encode("utf-8"))
+
+
+def generate_tree(
+    root: str,
+    states: List[str],
+    months: List[str],
+    quarters: List[str],
+    beneficiarios_rows: int = 10_000,
+    demonstracoes_rows: int = 10_000,
+) -> str:
+    """
+    Write the synthetic `FTP/PDA/` tree under `root`.
+
+    Returns:
+        str: The folder that plays the role of `FTP/PDA/`.
+    """
+    pda = os.path.join(root, "FTP", "PDA")
+
+    for month in months:
+        for state in states:
+            name = f"pda-024-icb-{state}-{month[:4]}_{month[4:]}"
+            path = os.path.join(pda, BENEFICIARIOS_DIR, month, name + ".zip")
+            if not os.path.exists(path):
+                seed = zlib.crc32(f"{state}{month}".encode())
+                content = _beneficiarios_csv(
+                    state, month, beneficiarios_rows, seed
+                )
+                _write_zip(path, name + ".csv", content)
+
+    for quarter in quarters:
+        year = quarter.split("T")[1]
+        path = os.path.join(pda, DEMONSTRACOES_DIR, year, quarter + ".zip")
+        if not os.path.exists(path):
+            content = _demonstracoes_csv(
+                quarter, demonstracoes_rows, zlib.crc32(quarter.encode())
+            )
+            _write_zip(path, quarter + ".csv", content)
+
+    return pda
+
+
+# HTTP server ----------
+
+
+def _human_size(size: int) -> str:
+    for unit in ("", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size:.0f}{unit}" if unit == "" else f"{size:.1f}{unit}"
+        size /= 1024
+    return str(size)
+
+
+class ANSRequestHandler(BaseHTTPRequestHandler):
+    """Serve the files of `server.root` like the ANS Apache server."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "Apache"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.stats_lock:
+            server.stats["requests"] += 1
+
+        path = os.path.join(server.root, self.path.split("?")[0].lstrip("/"))
+        path = os.path.normpath(path)
+        if not path.startswith(server.root):
+            return self._empty(403)
+
+        if os.path.isdir(path):
+            if not self.path.endswith("/"):
+                self.send_response(301)
+                self.send_header("Location", self.path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            return self._send(200, self._listing(path), "text/html", send_body)
+
+        if not os.path.isfile(path):
+            return self._empty(404)
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime * 1e6):x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        if self.headers.get("If-None-Match") == etag or (
+            "If-None-Match" not in self.headers
+            and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            return self._empty(304, {"ETag": etag})
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and if_range in (None, etag, last_modified):
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(data):
+                return self._empty(416)
+            headers["Content-Range"] = (
+                f"bytes {start}-{len(data) - 1}/{len(data)}"
+            )
+            return self._send(
+                206, data[start:], "application/zip", send_body, headers
+            )
+
+        return self._send(200, data, "application/zip", send_body, headers)
+
+    def _listing(self, folder: str) -> bytes:
+        rows = []
+        for name in sorted(os.listdir(folder)):
+            full = os.path.join(folder, name)
+            stat = os.stat(full)
+            modified = time.strftime(
+                "%Y-%m-%d %H:%M", time.localtime(stat.st_mtime)
+            )
+            if os.path.isdir(full):
+                name, size = name + "/", "-"
+            else:
+                size = _human_size(stat.st_size)
+            rows.append(
+                f'<tr><td><a href="{html.escape(name)}">{html.escape(name)}</a>'
+                f'</td><td align="right">{modified}  </td>'
+                f'<td align="right">{size}</td><td>&nbsp;</td></tr>'
+            )
+
+        title = html.escape(self.path)
+        body = (
+            f'<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 3.2 Final//EN">\n'
+            f"<html><head><title>Index of {title}</title></head><body>\n"
+            f"<h1>Index of {title}</h1><table>\n"
+            f"<tr><th>Name</th><th>Last modified</th><th>Size</th>"
+            f"<th>Description</th></tr>\n"
+            f'<tr><td><a href="../">Parent Directory</a></td>'
+            f'<td>&nbsp;</td><td align="right">  - </td><td>&nbsp;</td></tr>\n'
+            + "\n".join(rows)
+            + "\n</table></body></html>\n"
+        )
+        return body.encode("utf-8")
+
+    def _empty(self, status: int, headers: Optional[dict] = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, status, data, content_type, send_body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Accept-Ranges", "bytes")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(data)
+            with self.server.stats_lock:
+                self.server.stats["bytes_sent"] += len(data)
+
+
+class ANSServer(ThreadingHTTPServer):
+    """Threaded HTTP server over a generated tree, counting what it sends.
+
+    Args:
+        root: Folder served as the server root (contains `FTP/PDA/`).
+        port: Port to listen on. 0 picks a free port.
+        latency: Seconds added to every request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: str, port: int = 0, latency: float = 0.0):
+        super().__init__(("127.0.0.1", port), ANSRequestHandler)
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes_sent": 0}
+
+    @property
+    def base_url(self) -> str:
+        """URL playing the role of `https://dadosabertos.ans.gov.br/FTP/PDA/`."""
+        return f"http://127.0.0.1:{self.server_address[1]}/FTP/PDA/"
+
+    def reset_stats(self) -> dict:
+        """Return the counters and set them back to zero."""
+        with self.stats_lock:
+            stats, self.stats = self.stats, {"requests": 0, "bytes_sent": 0}
+        return stats
+
+    def start(self) -> "ANSServer":
+        """Serve in a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", default="ans_stand_in")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--states", nargs="+", default=["SP", "RJ"])
+    parser.add_argument("--months", nargs="+", default=["202401", "202402"])
+    parser.add_argument("--quarters", nargs="+", default=["1T2024", "2T2024"])
+    parser.add_argument("--beneficiarios-rows", type=int, default=10_000)
+    parser.add_argument("--demonstracoes-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    generate_tree(
+        args.root,
+        args.states,
+        args.months,
+        args.quarters,
+        args.beneficiarios_rows,
+        args.demonstracoes_rows,
+    )
+    server = ANSServer(args.root, args.port, args.latency)
+    print(f"Serving the ANS stand-in at {server.base_url}")
+    print(f"Use it with: export ANS_WRAPPER_BASE_URL={server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
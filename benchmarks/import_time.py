@@ -0,0 +1,126 @@
+"""
+Import-time benchmark of ans-wrapper.
+
+Every import is timed in a fresh interpreter, several times, and the best
+time is reported. The run fails (exit code 1) if a light import loads one of
+the heavy dependencies, or takes longer than `--max-ms`, so it can guard
+against regressions in CI:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --max-ms 50 --output imports.json
+"""
+
+import argparse
+import ast
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "src")
+
+# Dependencies that only the dataset classes should load
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "requests",
+    "tqdm",
+    "dateutil",
+]
+
+# Statements to time, and whether they must stay free of heavy modules
+IMPORTS = {
+    "import ans_wrapper": True,
+    "import ans_wrapper.enums": True,
+    "import ans_wrapper.cli": True,
+    "from ans_wrapper import DemonstracoesContabeis": False,
+    "from ans_wrapper import Beneficiarios": False,
+}
+
+_CHILD = """
+import sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(repr((seconds, heavy)))
+"""
+
+
+def time_import(statement: str, runs: int) -> Dict:
+    """Time an import statement in `runs` fresh interpreters."""
+    env = dict(os.environ)
+    # run against the working tree when the package isn't installed
+    if importlib.util.find_spec("ans_wrapper") is None:
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [SRC_DIR, env.get("PYTHONPATH")])
+        )
+
+    code = _CHILD.format(statement=statement, heavy=HEAVY_MODULES)
+    seconds = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        elapsed, heavy = ast.literal_eval(output.strip().splitlines()[-1])
+        seconds.append(elapsed)
+
+    return {
+        "statement": statement,
+        "ms_min": min(seconds) * 1000,
+        "ms_mean": sum(seconds) / len(seconds) * 1000,
+        "heavy_modules": heavy,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=100.0,
+        help="fail if a light import takes longer than this",
+    )
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    failures = []
+    results = []
+    for statement, light in IMPORTS.items():
+        result = time_import(statement, args.runs)
+        results.append(result)
+        print(
+            f"{statement:<48}{result['ms_min']:>9.1f} ms  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+
+        if light and result["heavy_modules"]:
+            failures.append(
+                f"{statement} loads {', '.join(result['heavy_modules'])}"
+            )
+        if light and result["ms_min"] > args.max_ms:
+            failures.append(
+                f"{statement} takes {result['ms_min']:.1f} ms "
+                f"(limit {args.max_ms:.0f} ms)"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
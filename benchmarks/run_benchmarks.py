@@ -0,0 +1,314 @@
+"""
+Benchmarks of the download and parsing paths of ans-wrapper.
+
+A local stand-in of the ANS server (see `ans_server.py`) is started and the
+package is pointed at it through `$ANS_WRAPPER_BASE_URL`. Every scenario runs
+in a fresh process with its own cache folder, and reports its wall time,
+throughput and peak memory. Results are written as JSON, so runs of different
+versions can be compared:
+
+    python benchmarks/run_benchmarks.py --output new.json
+    python benchmarks/run_benchmarks.py --output new.json --compare old.json
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+# Run against the working tree when the package isn't installed
+if importlib.util.find_spec("ans_wrapper") is None:
+    sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "src"))
+
+from ans_server import ANSServer, generate_tree
+
+# Scenarios ----------
+#
+# Every scenario receives the benchmark config and returns the number of rows
+# it produced. It runs in its own process, after `$ANS_WRAPPER_BASE_URL` and
+# `$ANS_WRAPPER_CACHE_DIR` were set.
+
+
+def _quiet():
+    # the messages and progress bars are not part of what is measured
+    os.environ["ANS_WRAPPER_QUIET"] = "1"
+
+
+def dc_get_info(config: dict) -> int:
+    from ans_wrapper import DemonstracoesContabeis
+
+    return len(DemonstracoesContabeis().get_info(config["quarters"]))
+
+
+def dc_get_info_company(config: dict) -> int:
+    from ans_wrapper import DemonstracoesContabeis
+
+    return len(
+        DemonstracoesContabeis().get_info(config["quarters"], company=300000)
+    )
+
+
+def dc_get_info_pipelined(config: dict) -> int:
+    from ans_wrapper import DemonstracoesContabeis
+
+    return len(
+        DemonstracoesContabeis().get_info(config["quarters"], pipelined=True)
+    )
+
+
+def dc_get_info_arrow(config: dict) -> int:
+    from ans_wrapper import DemonstracoesContabeis
+
+    return len(
+        DemonstracoesContabeis().get_info(config["quarters"], backend="arrow")
+    )
+
+
+def ben_build_dataset(config: dict, **kwargs) -> int:
+    from ans_wrapper import Beneficiarios
+
+    output = os.path.join(os.environ["ANS_WRAPPER_CACHE_DIR"], "dataset.csv")
+    df = Beneficiarios().build_dataset(
+        config["states"],
+        start=config["months"][0],
+        end=config["months"][-1],
+        output_name=output,
+        **kwargs,
+    )
+    return len(df)
+
+
+def ben_build_dataset_no_extract(config: dict) -> int:
+    return ben_build_dataset(config, extract=False)
+
+
+def ben_build_dataset_store(config: dict) -> int:
+    return ben_build_dataset(config, use_store=True)
+
+
+def ben_build_dataset_arrow(config: dict) -> int:
+    return ben_build_dataset(config, backend="arrow")
+
+
+def download_only(config: dict) -> int:
+    from ans_wrapper import Beneficiarios
+
+    Beneficiarios().download_raw_data(
+        config["states"], config["months"], extract=False
+    )
+    return 0
+
+
+def concat_csv(config: dict) -> int:
+    from ans_wrapper import Beneficiarios
+    from ans_wrapper.utils import concat_csv_files
+
+    csv_paths = Beneficiarios().download_raw_data(
+        config["states"], config["months"]
+    )
+    output = os.path.join(os.environ["ANS_WRAPPER_CACHE_DIR"], "concat.csv")
+
+    # only the concatenation is timed
+    start = time.perf_counter()
+    concat_csv_files(csv_paths, output)
+    config["timed_seconds"] = time.perf_counter() - start
+    return sum(1 for _ in open(output, "rb")) - 1
+
+
+# Every scenario runs twice: on an empty cache, then on the warm cache
+SCENARIOS: Dict[str, Callable[[dict], int]] = {
+    "download_only": download_only,
+    "dc_get_info": dc_get_info,
+    "dc_get_info_company": dc_get_info_company,
+    "dc_get_info_pipelined": dc_get_info_pipelined,
+    "dc_get_info_arrow": dc_get_info_arrow,
+    "ben_build_dataset": ben_build_dataset,
+    "ben_build_dataset_no_extract": ben_build_dataset_no_extract,
+    "ben_build_dataset_store": ben_build_dataset_store,
+    "ben_build_dataset_arrow": ben_build_dataset_arrow,
+    "concat_csv_files": concat_csv,
+}
+
+
+# Runner ----------
+
+
+def _run_in_child(name: str, config: dict, runs: int, queue):
+    _quiet()
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = SCENARIOS[name](config)
+        elapsed = config.pop("timed_seconds", time.perf_counter() - start)
+        results.append({"seconds": elapsed, "rows": rows})
+
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+    queue.put({"runs": results, "peak_rss_mb": peak_mb})
+
+
+def run_scenario(
+    name: str, config: dict, server: ANSServer, cache_dir: str, warm: bool
+) -> dict:
+    """Run a scenario in a new process and collect its metrics."""
+    os.environ["ANS_WRAPPER_CACHE_DIR"] = cache_dir
+    if not warm:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    server.reset_stats()
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_in_child, args=(name, config, config["repeat"], queue)
+    )
+    process.start()
+    child = queue.get()
+    process.join()
+    stats = server.reset_stats()
+
+    seconds = [run["seconds"] for run in child["runs"]]
+    rows = child["runs"][-1]["rows"]
+    best = min(seconds)
+    return {
+        "scenario": name,
+        "cache": "warm" if warm else "cold",
+        "seconds_min": best,
+        "seconds_mean": sum(seconds) / len(seconds),
+        "rows": rows,
+        "rows_per_second": rows / best if best else None,
+        "requests": stats["requests"] / len(seconds),
+        "bytes_downloaded": stats["bytes_sent"] / len(seconds),
+        "download_mb_per_second": stats["bytes_sent"]
+        / len(seconds)
+        / 1024**2
+        / best
+        if best
+        else None,
+        "peak_rss_mb": child["peak_rss_mb"],
+    }
+
+
+def compare(results: List[dict], baseline_path: str):
+    """Print the change of every metric against a previous results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["scenario"], r["cache"]): r for r in json.load(f)["results"]
+        }
+
+    print(f"\n{'scenario':<36}{'cache':<7}{'time':>10}{'peak rss':>10}")
+    for result in results:
+        old = baseline.get((result["scenario"], result["cache"]))
+        if old is None:
+            continue
+        time_change = result["seconds_min"] / old["seconds_min"] - 1
+        rss_change = result["peak_rss_mb"] / old["peak_rss_mb"] - 1
+        print(
+            f"{result['scenario']:<36}{result['cache']:<7}"
+            f"{time_change:>+10.1%}{rss_change:>+10.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results to compare with")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--states", nargs="+", default=["SP", "RJ", "MG"])
+    parser.add_argument(
+        "--months", nargs="+", default=["202401", "202402", "202403"]
+    )
+    parser.add_argument(
+        "--quarters", nargs="+", default=["1T2024", "2T2024", "3T2024"]
+    )
+    parser.add_argument("--beneficiarios-rows", type=int, default=50_000)
+    parser.add_argument("--demonstracoes-rows", type=int, default=50_000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="seconds added to every request, to imitate a remote server",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workdir", help="folder for the generated data")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ans_bench_")
+    print(f"Generating data in {workdir}")
+    generate_tree(
+        os.path.join(workdir, "server"),
+        args.states,
+        args.months,
+        args.quarters,
+        args.beneficiarios_rows,
+        args.demonstracoes_rows,
+    )
+
+    server = ANSServer(os.path.join(workdir, "server"), latency=args.latency)
+    server.start()
+    os.environ["ANS_WRAPPER_BASE_URL"] = server.base_url
+
+    config = {
+        "states": args.states,
+        "months": args.months,
+        "quarters": args.quarters,
+        "repeat": args.repeat,
+    }
+
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        cache_dir = os.path.join(workdir, "cache", name)
+        for warm in (False, True):
+            result = run_scenario(name, config, server, cache_dir, warm)
+            results.append(result)
+            print(
+                f"{name:<36}{result['cache']:<7}"
+                f"{result['seconds_min']:>8.2f}s"
+                f"{result['rows']:>10} rows"
+                f"{result['peak_rss_mb']:>9.0f} MB"
+                f"{result['requests']:>6.0f} req"
+            )
+
+    server.shutdown()
+
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+
+        package_version = version("ans-wrapper")
+    except PackageNotFoundError:
+        package_version = None
+
+    report = {
+        "package_version": package_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            **config,
+            "beneficiarios_rows": args.beneficiarios_rows,
+            "demonstracoes_rows": args.demonstracoes_rows,
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
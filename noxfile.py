@@ -145,12 +145,31 @@ def build_and_publish(session):
 # Testing ---------------------------------------------------------------------
 
 
+@nox.session
+def benchmark(session):
+    """
+    Run the benchmarks against a local stand-in of the ANS server.
+
+    Extra arguments are passed to the runner, e.g.
+    `nox -s benchmark -- --output new.json --compare old.json`
+    """
+    session.install("-e", ".[parquet]")
+    session.run("python3", "benchmarks/run_benchmarks.py", *session.posargs)
+
+
+@nox.session
+def import_time(session):
+    """Check that `import ans_wrapper` stays fast and light."""
+    session.install("-e", ".")
+    session.run("python3", "benchmarks/import_time.py", *session.posargs)
+
+
 @nox.session
 def run_tests(session):
     session.install("pytest")
 
-    # Install Package in editable mode
-    session.install("-e", ".")
+    # Install Package in editable mode, with pyarrow for the Parquet store
+    session.install("-e", ".[parquet]")
 
     # Run pytest
-    session.run("pytest")
+    session.run("pytest", *session.posargs)
@@ -2,14 +2,65 @@
 
 This package provides access to financial statements and beneficiary information
 from the Brazilian National Health Agency (ANS).
+
+The classes and submodules are imported on first use, so `import ans_wrapper`
+doesn't load pandas, requests and the other heavy dependencies until they are
+needed (see `benchmarks/import_time.py`).
 """
 
-# Import the main classes
-from ans_wrapper.beneficiarios import Beneficiarios
-from ans_wrapper.demonstracoes_contabeis import DemonstracoesContabeis
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ans_wrapper.beneficiarios import Beneficiarios
+    from ans_wrapper.demonstracoes_contabeis import DemonstracoesContabeis
+
+# Main classes, and the module each one is imported from on first use
+_LAZY_ATTRIBUTES = {
+    "Beneficiarios": "ans_wrapper.beneficiarios",
+    "DemonstracoesContabeis": "ans_wrapper.demonstracoes_contabeis",
+}
+
+# Submodules, imported on first access as attributes (`ans_wrapper.cube`)
+_SUBMODULES = {
+    "accounts",
+    "backends",
+    "beneficiarios",
+    "cache",
+    "catalog",
+    "cli",
+    "cube",
+    "demonstracoes_contabeis",
+    "enums",
+    "index",
+    "instrumentation",
+    "locks",
+    "pipeline",
+    "sampling",
+    "schemas",
+    "store",
+    "utils",
+}
 
 __all__ = ["Beneficiarios", "DemonstracoesContabeis"]
 
 __version__ = "0.1.1"
 __author__ = "Mousta Bazzoun"
 __email__ = "bazzounmousta@gmail.com"
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # later accesses don't go through `__getattr__` again
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _SUBMODULES)
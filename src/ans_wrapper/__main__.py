@@ -0,0 +1,7 @@
+"""Run the command line interface with `python -m ans_wrapper`."""
+
+import sys
+
+from ans_wrapper.cli import main
+
+sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Chart of accounts of the Demonstrações Contábeis.
+
+CD_CONTA_CONTABIL codes are hierarchical: every code is a child of its longest
+prefix (`"1"` ⊃ `"12"` ⊃ `"121"`). Once the codes are sorted as strings, the
+descendants of an account are the codes right after it, so every subtree is a
+contiguous range. `AccountTree` precomputes these ranges, and a rollup to any
+level is then a single `np.add.reduceat` over the leaf accounts, for all
+operators and quarters at once.
+
+Trees can be saved as plain lists (`to_dict`), e.g. next to the downloaded
+data, and loaded back without recomputing the ranges.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class AccountTree:
+    """Hierarchy of account codes, with the range of every subtree.
+
+    Args:
+        codes: Account codes. Duplicates are ignored.
+        names: Optional mapping of codes to descriptions (DESCRICAO).
+    """
+
+    def __init__(
+        self, codes: Sequence[str], names: Optional[Dict[str, str]] = None
+    ):
+        codes = sorted({str(code) for code in codes})
+        n = len(codes)
+
+        parent = np.full(n, -1, dtype=np.int64)
+        depth = np.zeros(n, dtype=np.int64)
+        # the subtree of account i is the range [i, end[i])
+        end = np.arange(1, n + 1, dtype=np.int64)
+
+        # walk the sorted codes keeping the chain of ancestors of the current
+        # one, which are always prefixes of it
+        ancestors = []
+        for i, code in enumerate(codes):
+            while ancestors and not code.startswith(codes[ancestors[-1]]):
+                end[ancestors.pop()] = i
+            parent[i] = ancestors[-1] if ancestors else -1
+            depth[i] = len(ancestors) + 1
+            ancestors.append(i)
+        for i in ancestors:
+            end[i] = n
+
+        self.codes = pd.Index(codes, name="CD_CONTA_CONTABIL")
+        self.names = dict(names or {})
+        self.parent = parent
+        self.depth = depth
+        self.end = end
+        self.is_leaf = end == np.arange(1, n + 1)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __repr__(self) -> str:
+        levels = int(self.depth.max()) if len(self) else 0
+        return f"AccountTree({len(self)} accounts, {levels} levels)"
+
+    def level(self, level: int) -> pd.Index:
+        """Return the codes of the accounts at a level (1 is the top)."""
+        return self.codes[self.depth == level]
+
+    def children(self, code: str) -> pd.Index:
+        """Return the codes of the direct children of an account."""
+        i = self.codes.get_loc(str(code))
+        return self.codes[self.parent == i]
+
+    def leaves(self, code: str) -> pd.Index:
+        """Return the codes of the leaf accounts under an account."""
+        i = self.codes.get_loc(str(code))
+        subtree = slice(i, self.end[i])
+        return self.codes[subtree][self.is_leaf[subtree]]
+
+    # Rollups ----------
+
+    def rollup(
+        self,
+        values: np.ndarray,
+        accounts: Sequence[str],
+        level: Optional[int] = None,
+        codes: Optional[Sequence[str]] = None,
+        axis: int = 1,
+    ) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Sum the leaf accounts of `values` into the accounts of a level.
+
+        Only leaf accounts are summed, so the totals reported for parent
+        accounts in the data are not counted twice. NaNs count as missing: a
+        total is NaN only if none of its leaves has a value.
+
+        Args:
+            values: Array with one axis of accounts, e.g. an `AccountCube`'s.
+            accounts: Codes of the `values` accounts axis.
+            level: Level to roll up to (1 is the top).
+            codes: Accounts to roll up to, instead of a whole level.
+            axis: Accounts axis of `values`.
+
+        Returns:
+            The codes of the totals and the array of totals, with the
+            accounts axis in the same place.
+
+        Raises:
+            KeyError: If an account of `values` is not in the tree.
+        """
+        if (level is None) == (codes is None):
+            raise ValueError("provide either `level` or `codes`")
+
+        if codes is None:
+            targets = np.flatnonzero(self.depth == level)
+        else:
+            targets = self.codes.get_indexer([str(code) for code in codes])
+            if (targets < 0).any():
+                raise KeyError(f"accounts not in the tree: {list(codes)}")
+
+        positions = self.codes.get_indexer([str(a) for a in accounts])
+        if (positions < 0).any():
+            raise KeyError("some accounts of `values` are not in the tree")
+
+        values = np.moveaxis(np.asarray(values), axis, -1)
+        leaf = self.is_leaf[positions]
+        leaf_values = values[..., leaf]
+
+        # leaves in tree order, plus a last empty column so that subtrees
+        # ending at the last account are valid `reduceat` boundaries
+        shape = values.shape[:-1] + (len(self) + 1,)
+        sums = np.zeros(shape, dtype=np.float64)
+        counts = np.zeros(shape, dtype=np.int64)
+        sums[..., positions[leaf]] = np.nan_to_num(leaf_values)
+        counts[..., positions[leaf]] = ~np.isnan(leaf_values)
+
+        # segment [start, end) of every target; the segments in between are
+        # discarded
+        bounds = np.empty(2 * len(targets), dtype=np.intp)
+        bounds[0::2] = targets
+        bounds[1::2] = self.end[targets]
+
+        if len(targets):
+            totals = np.add.reduceat(sums, bounds, axis=-1)[..., 0::2]
+            found = np.add.reduceat(counts, bounds, axis=-1)[..., 0::2]
+            totals[found == 0] = np.nan
+        else:
+            totals = np.zeros(values.shape[:-1] + (0,))
+
+        return self.codes[targets], np.moveaxis(totals, -1, axis)
+
+    # Persistence ----------
+
+    def to_dict(self) -> dict:
+        """Return the tree, with its precomputed ranges, as plain lists."""
+        return {
+            "codes": self.codes.tolist(),
+            "names": self.names,
+            "parent": self.parent.tolist(),
+            "depth": self.depth.tolist(),
+            "end": self.end.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AccountTree":
+        """Rebuild a tree from `to_dict`, without recomputing its ranges."""
+        tree = cls.__new__(cls)
+        tree.codes = pd.Index(data["codes"], name="CD_CONTA_CONTABIL")
+        tree.names = data.get("names", {})
+        tree.parent = np.asarray(data["parent"], dtype=np.int64)
+        tree.depth = np.asarray(data["depth"], dtype=np.int64)
+        tree.end = np.asarray(data["end"], dtype=np.int64)
+        tree.is_leaf = tree.end == np.arange(1, len(tree.codes) + 1)
+        return tree
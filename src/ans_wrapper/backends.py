@@ -0,0 +1,197 @@
+"""
+Result backends: pandas, pyarrow or Polars.
+
+By default the datasets are returned as pandas DataFrames. With
+`backend="arrow"` the CSV files are parsed by pyarrow straight into
+`pyarrow.Table`s, and the files of several quarters or months are
+concatenated without copying: the result is a table of chunked arrays, one
+chunk per file. `backend="polars"` wraps that table in a Polars DataFrame,
+also without copying. Call `.to_pandas()` on the result when a DataFrame is
+needed.
+
+Requires `pyarrow` (`pip install ans-wrapper[parquet]`), and `polars` for the
+Polars backend (`pip install ans-wrapper[polars]`).
+"""
+
+from typing import IO, Dict, List, Optional, Sequence, Union
+
+from ans_wrapper.utils import open_csv, read_csv_columns
+
+BACKENDS = ("pandas", "arrow", "polars")
+
+# Size of the blocks read from the CSV. Rows are filtered block by block, so
+# memory use depends on the size of the result.
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def check_backend(backend: str):
+    """
+    Check that a backend is known and its dependencies are installed.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If pyarrow or polars is missing.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"unknown backend {backend!r}, expected one of {BACKENDS}"
+        )
+    if backend == "pandas":
+        return
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            f"the {backend} backend requires pyarrow: "
+            "`pip install ans-wrapper[parquet]`"
+        ) from e
+
+    if backend == "polars":
+        try:
+            import polars  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "the polars backend requires polars: "
+                "`pip install ans-wrapper[polars]`"
+            ) from e
+
+
+def read_table(
+    source: Union[str, IO[bytes]],
+    columns: Optional[List[str]] = None,
+    column_types: Optional[dict] = None,
+    decimal_point: str = ".",
+    where: Optional[Dict[str, Sequence]] = None,
+    default_type=None,
+):
+    """
+    Parse a CSV file (or the CSV inside a ZIP) into a `pyarrow.Table`.
+
+    Args:
+        source: Path of the CSV file or ZIP archive, or an open binary stream.
+        columns: Columns to read. If None, all columns are read.
+        column_types: Optional mapping of column names to pyarrow types,
+            used instead of the inferred types.
+        decimal_point: Decimal separator of the numeric columns.
+        where: Keep only the rows whose columns hold one of the given values,
+            e.g. `{"REG_ANS": [300000]}`. Rows are filtered as they are
+            parsed.
+        default_type: pyarrow type of the columns not in `column_types`,
+            e.g. `pa.string()`. If None, their types are inferred from the
+            first block, and a later block that doesn't fit them fails.
+            Requires `source` to be a path.
+
+    Returns:
+        pyarrow.Table: The rows of the file.
+
+    Raises:
+        KeyError: If a column of `where` is not in the file.
+        ValueError: If `default_type` is given with a stream.
+    """
+    if isinstance(source, str):
+        if default_type is not None:
+            column_types = {
+                **dict.fromkeys(read_csv_columns(source), default_type),
+                **(column_types or {}),
+            }
+        with open_csv(source) as csv_stream:
+            return read_table(
+                csv_stream, columns, column_types, decimal_point, where
+            )
+
+    if default_type is not None:
+        raise ValueError("`default_type` requires the path of the file")
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+
+    include_columns = columns
+    if columns is not None and where:
+        include_columns = [
+            *columns,
+            *(column for column in where if column not in columns),
+        ]
+
+    reader = pv.open_csv(
+        source,
+        read_options=pv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pv.ParseOptions(delimiter=";"),
+        convert_options=pv.ConvertOptions(
+            column_types=column_types,
+            decimal_point=decimal_point,
+            include_columns=include_columns,
+        ),
+    )
+
+    if not where:
+        return reader.read_all()
+
+    names = reader.schema.names
+    missing = [column for column in where if column not in names]
+    if missing:
+        raise KeyError(f"columns not in the file: {missing}")
+
+    value_sets = {
+        column: pa.array(values).cast(reader.schema.field(column).type)
+        for column, values in where.items()
+    }
+
+    batches = []
+    for batch in reader:
+        mask = None
+        for column, value_set in value_sets.items():
+            keep = pc.is_in(batch.column(column), value_set=value_set)
+            mask = keep if mask is None else pc.and_(mask, keep)
+        batches.append(batch.filter(mask))
+
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.select(columns) if columns is not None else table
+
+
+def concat_tables(tables: Sequence):
+    """
+    Concatenate tables without copying their data.
+
+    The columns of the result are chunked arrays made of the tables'
+    columns. Columns missing from a table are filled with nulls, and types
+    are promoted when they differ (e.g. a column that is empty in a file).
+    """
+    import pyarrow as pa
+
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def cast_table(table, column_types: dict):
+    """
+    Cast the columns of a table that have a type in `column_types`.
+
+    Columns cast to a dictionary type are dictionary-encoded as they are,
+    so codes stored as numbers (e.g. NR_CNPJ) keep their values.
+    """
+    import pyarrow as pa
+
+    for i, field in enumerate(table.schema):
+        column_type = column_types.get(field.name)
+        if column_type is None or column_type == field.type:
+            continue
+
+        if pa.types.is_dictionary(column_type):
+            column = table.column(i).dictionary_encode()
+        else:
+            column = table.column(i).cast(column_type)
+        table = table.set_column(i, field.with_type(column.type), column)
+
+    return table
+
+
+def to_backend(table, backend: str):
+    """Convert a `pyarrow.Table` to the result type of a backend."""
+    if backend == "arrow":
+        return table
+    if backend == "polars":
+        import polars as pl
+
+        return pl.from_arrow(table, rechunk=False)
+    return table.to_pandas()
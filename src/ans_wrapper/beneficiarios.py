@@ -2,29 +2,123 @@
 Modulo de Beneficiários
 """
 
+import os
+import time
 from datetime import datetime
-from typing import List, Union
+from typing import (
+    Callable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import pandas as pd
 
+from ans_wrapper.backends import (
+    cast_table,
+    check_backend,
+    concat_tables,
+    read_table,
+    to_backend,
+)
+from ans_wrapper.cache import get_cache
+from ans_wrapper.catalog import get_catalog
 from ans_wrapper.enums import BRAZILIAN_STATE_CODES, STATE_CODES
+from ans_wrapper.instrumentation import timed
+from ans_wrapper.sampling import Sampler
+from ans_wrapper.schemas import BENEFICIARIOS_SCHEMA
 from ans_wrapper.utils import (
+    BASE_URL,
+    DEFAULT_MAX_WORKERS,
+    LISTING_TTL,
     concat_csv_files,
-    download_and_extract_csv,
+    download_many,
     generate_month_range,
-    parse_url_links,
+    iter_downloads,
+    iter_parallel,
+    open_csv,
+    remote_info_many,
 )
 
-BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/"
+
+def _aggregate_file(
+    zip_path: str, by: List[str], values: List[str], chunk_size: int
+) -> pd.DataFrame:
+    """Sum `values` grouped by `by` over one file, chunk by chunk.
+
+    Runs in a worker process, so it has to be a module-level function.
+    """
+    # an empty file sums to no groups
+    empty = pd.DataFrame(columns=by + values).astype(
+        dict.fromkeys(values, "int64")
+    )
+    partial = empty.groupby(by, dropna=False)[values].sum()
+
+    with open_csv(zip_path) as csv_stream:
+        try:
+            chunks = pd.read_csv(
+                csv_stream,
+                delimiter=";",
+                usecols=by + values,
+                chunksize=chunk_size,
+            )
+        except pd.errors.EmptyDataError:
+            # not even a header
+            return partial
+
+        for chunk in chunks:
+            sums = chunk.groupby(by, dropna=False)[values].sum()
+            partial = _add_sums(partial, sums, by)
+
+    return partial
+
+
+def _add_sums(total: pd.DataFrame, sums: pd.DataFrame, by: List[str]):
+    """Merge two group sums indexed by `by`."""
+    if total.empty:
+        return sums
+    return pd.concat([total, sums]).groupby(level=by, dropna=False).sum()
+
+
+class Chunk(NamedTuple):
+    """A piece of the Beneficiários file of a state in a month."""
+
+    state: str
+    month: str
+    data: pd.DataFrame
 
 
 class Beneficiarios:
     ENDPOINT = "informacoes_consolidadas_de_beneficiarios-024/"
     __BENEFICIARIOS_URL = BASE_URL + ENDPOINT
     FILENAME = "pda-024-icb-{state_sigla}-{year}_{month}.zip"
+    STORE_NAME = "beneficiarios"
+    # Version of the column types of the store: partitions recorded with
+    # another version are converted again
+    STORE_VERSION = 2
 
-    def __init__(self):
-        self.available_months = self._fetch_available_months()
+    def __init__(self, offline: bool = False, listing_ttl: float = LISTING_TTL):
+        """
+        Args:
+            offline: Work only from the local cache: the cached listing of
+                months is used however old it is, and cached files are not
+                revalidated with the server.
+            listing_ttl: How long, in seconds, the cached listing of months is
+                used before fetching it again.
+        """
+        self.offline = offline
+        self.listing_ttl = listing_ttl
+        self._available_months = None
+
+    @property
+    def available_months(self) -> List[str]:
+        """Months available on the server, fetched on first access."""
+        if self._available_months is None:
+            self._available_months = self._fetch_available_months()
+        return self._available_months
 
     @property
     def date_range(self):
@@ -60,47 +154,523 @@ class Beneficiarios:
         output_name="resulting_dataset",
         in_chunks=False,
         chunk_size=100_000,
-    ) -> pd.DataFrame:
-        """Create a dataset using customized configs."""
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        extract: bool = True,
+        columns: Optional[List[str]] = None,
+        use_store: bool = False,
+        compact: bool = False,
+        backend: str = "pandas",
+        sample_size: Optional[int] = None,
+        sample_frac: Optional[float] = None,
+        seed: Optional[int] = None,
+        stratify: Optional[str] = None,
+    ):
+        """Create a dataset using customized configs.
+
+        With `extract=False` the CSV files are read straight out of the
+        downloaded ZIP archives, so nothing is extracted to the disk.
+
+        With `use_store=True` each state/month file is converted once into the
+        local Parquet store (see `update_store`) and the dataset is read from
+        there, loading only the requested `columns`. No merged CSV is written.
+
+        With `compact=True` the columns are parsed into compact types
+        (categoricals and small integers, see `ans_wrapper.schemas`).
+
+        With `backend="arrow"` (or `"polars"`) the result is a
+        `pyarrow.Table` (or a Polars DataFrame): each file is parsed by
+        pyarrow and the files are concatenated without copying, and without
+        writing a merged CSV (see `ans_wrapper.backends`). `in_chunks` is
+        only available with the pandas backend.
+
+        With `sample_size` (or `sample_frac`) only a random sample of the rows
+        is returned, for a quick look at months of data: the files are
+        streamed chunk by chunk and only the sampled rows are kept in memory
+        (see `ans_wrapper.sampling`). `sample_size` is the number of rows in
+        the sample, or per state or month with `stratify="state"` or
+        `stratify="month"`; `sample_frac` keeps each row with that
+        probability. The same `seed` gives the same sample. Sampling reads
+        the downloaded files, with the pandas backend.
+        """
         # 1. CHECKS ---------------
-        # Checking date args
-        if (target_date and (start or end)) or (
-            not target_date and not (start and end)
-        ):
+        check_backend(backend)
+        if in_chunks and backend != "pandas":
+            raise ValueError("`in_chunks` requires the pandas backend")
+        sampling = sample_size is not None or sample_frac is not None
+        if sampling and (use_store or in_chunks or backend != "pandas"):
             raise ValueError(
-                "provide either `target_date` or both `start` and `end`, not both."
+                "sampling requires the pandas backend, without `use_store` "
+                "or `in_chunks`"
             )
+        if stratify not in (None, "state", "month"):
+            raise ValueError('`stratify` must be "state" or "month"')
+        states, dates = self.validate_args(states, target_date, start, end)
+        arrow_types = BENEFICIARIOS_SCHEMA.arrow_types() if compact else None
 
-        # checking states
-        if isinstance(states, str):
-            states = [states]
+        if sampling:
+            return self._sample(
+                Sampler(sample_size, sample_frac, seed),
+                stratify,
+                states,
+                target_date,
+                start,
+                end,
+                usecols=columns,
+                chunk_size=chunk_size,
+                max_workers=max_workers,
+                compact=compact,
+            )
 
-        for state in states:
-            if state not in BRAZILIAN_STATE_CODES:
-                raise ValueError(
-                    f"invalid state: {state}, allowed states: {BRAZILIAN_STATE_CODES}"
-                )
+        # 2. READING FROM THE STORE ---------------
+        if use_store:
+            partitions = self.update_store(
+                states, dates, max_workers=max_workers
+            )
+            store = self.get_store()
 
-        # Creating a list of dates
-        dates = (
-            [target_date] if target_date else generate_month_range(start, end)
-        )
+            if in_chunks:
+                chunks = store.iter_read(partitions, columns, chunk_size)
+                if compact:
+                    return (BENEFICIARIOS_SCHEMA.apply(c) for c in chunks)
+                return chunks
+
+            if backend != "pandas":
+                with timed("parse", store.root) as event:
+                    table = store.read_table(partitions, columns)
+                    if compact:
+                        table = cast_table(table, arrow_types)
+                    event["rows"] = table.num_rows
+                return to_backend(table, backend)
+
+            with timed("parse", store.root) as event:
+                df = store.read(partitions, columns)
+                event["rows"] = len(df)
+            return BENEFICIARIOS_SCHEMA.apply(df) if compact else df
 
-        # 2. DOWNLOADING ---------------
-        csv_paths = self.download_raw_data(states, dates)
+        # 3. DOWNLOADING ---------------
+        # the files are kept in the cache until they are read, even if they
+        # don't fit in it together
+        urls = self._file_urls([(s, d) for s in states for d in dates])
+        with get_cache().pinned(urls):
+            csv_paths = self.download_raw_data(
+                states, dates, max_workers=max_workers, extract=extract
+            )
+
+            if backend != "pandas":
+                import pyarrow as pa
+
+                # the columns without a type are read as text, instead of
+                # types inferred from the first block (see `_arrow_types`)
+                column_types = arrow_types or self._arrow_types()
+                with timed("parse", f"{len(csv_paths)} files") as event:
+                    table = concat_tables(
+                        [
+                            read_table(
+                                csv_path,
+                                columns,
+                                column_types,
+                                default_type=pa.string(),
+                            )
+                            for csv_path in csv_paths
+                        ]
+                    )
+                    event["rows"] = table.num_rows
+                return to_backend(table, backend)
 
-        concat_csv_files(
-            csv_paths=csv_paths,
-            output_path=output_name,
+            concat_csv_files(
+                csv_paths=csv_paths,
+                output_path=output_name,
+            )
+
+        schema_kwargs = (
+            BENEFICIARIOS_SCHEMA.read_csv_kwargs() if compact else {}
         )
 
         if in_chunks:
-            return pd.read_csv(output_name, chunksize=chunk_size, delimiter=";")
+            return pd.read_csv(
+                output_name,
+                chunksize=chunk_size,
+                delimiter=";",
+                usecols=columns,
+                **schema_kwargs,
+            )
         else:
-            return pd.read_csv(output_name, delimiter=";")
+            with timed("parse", output_name) as event:
+                df = pd.read_csv(
+                    output_name, delimiter=";", usecols=columns, **schema_kwargs
+                )
+                event["rows"] = len(df)
+                event["bytes"] = os.path.getsize(output_name)
+            return df
+
+    def _sample(
+        self, sampler: Sampler, stratify: Optional[str], *args, **kwargs
+    ) -> pd.DataFrame:
+        """Sample the rows of the files while streaming them (`iter_chunks`)."""
+        with timed("parse", "sample") as event:
+            for chunk in self.iter_chunks(*args, **kwargs):
+                stratum = getattr(chunk, stratify) if stratify else None
+                sampler.add(chunk.data, stratum)
+
+            df = sampler.result()
+            event["rows"] = len(df)
+
+        # categories differ from chunk to chunk, so they are set again
+        return BENEFICIARIOS_SCHEMA.apply(df) if kwargs["compact"] else df
+
+    def iter_chunks(
+        self,
+        states: Union[STATE_CODES, List[STATE_CODES]],
+        target_date: Optional[str] = None,
+        start=None,
+        end=None,
+        usecols: Optional[List[str]] = None,
+        predicate: Optional[Callable[[pd.DataFrame], pd.Series]] = None,
+        chunk_size: int = 100_000,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        compact: bool = False,
+        pipelined: bool = False,
+        queue_size: int = 4,
+    ) -> Iterator[Chunk]:
+        """
+        Stream the data as DataFrame chunks, file by file.
+
+        Each state/month file is parsed straight out of its ZIP archive while
+        the next files are downloading. Nothing is extracted or merged, and
+        only one chunk is held in memory at a time.
+
+        With `pipelined=True` each file is also parsed while it is still
+        downloading (see `ans_wrapper.pipeline`), up to `max_workers` files at
+        once, with at most `queue_size` parsed chunks waiting per file.
+
+        Args:
+            states: A list of state codes.
+            target_date: A single month, in the "YYYYMM" format.
+            start: First month, with `end`, instead of `target_date`.
+            end: Last month, with `start`, instead of `target_date`.
+            usecols: Columns to read. If None, all columns are read.
+            predicate: Function that takes a chunk and returns a boolean mask
+                of the rows to keep.
+            chunk_size: Number of rows parsed at once.
+            max_workers: Maximum number of files downloaded at the same time.
+            compact: Whether to parse the columns into compact types.
+            pipelined: Whether to parse the files while they download.
+            queue_size: Maximum number of parsed chunks waiting per file, when
+                pipelined.
+
+        Yields:
+            Chunk: `(state, month, data)` tuples. Chunks left empty by the
+                predicate are skipped.
+        """
+        states, dates = self.validate_args(states, target_date, start, end)
+        schema_kwargs = (
+            BENEFICIARIOS_SCHEMA.read_csv_kwargs() if compact else {}
+        )
+
+        pairs = [(state, date) for state in states for date in dates]
+        urls = self._file_urls(pairs)
+
+        def _parse(csv_stream):
+            for data in pd.read_csv(
+                csv_stream,
+                delimiter=";",
+                usecols=usecols,
+                chunksize=chunk_size,
+                **schema_kwargs,
+            ):
+                if predicate is not None:
+                    data = data[predicate(data)]
+                    if data.empty:
+                        continue
+
+                yield data
+
+        if pipelined:
+            from ans_wrapper.pipeline import iter_pipeline
+
+            for i, data in iter_pipeline(
+                urls,
+                _parse,
+                max_workers=max_workers,
+                queue_size=queue_size,
+                revalidate=not self.offline,
+            ):
+                state, date = pairs[i]
+                yield Chunk(state, date, data)
+            return
+
+        zip_paths = iter_downloads(
+            urls,
+            max_workers=max_workers,
+            extract=False,
+            revalidate=not self.offline,
+        )
+
+        with get_cache().pinned(urls):
+            for (state, date), zip_path in zip(pairs, zip_paths):
+                with open_csv(zip_path) as csv_stream:
+                    for data in _parse(csv_stream):
+                        yield Chunk(state, date, data)
+
+    def aggregate(
+        self,
+        states: Union[STATE_CODES, List[STATE_CODES]],
+        by: Union[str, List[str]],
+        values: Union[str, List[str]] = "QT_BENEFICIARIO_ATIVO",
+        target_date: Optional[str] = None,
+        start=None,
+        end=None,
+        chunk_size: int = 100_000,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        parse_workers: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Sum beneficiary counts grouped by some columns, without loading the
+        whole dataset.
+
+        Each state/month file is reduced to partial group sums in a worker
+        process, and the partial sums are then merged. Memory use depends on
+        the number of groups, not on the number of rows.
+
+        Args:
+            states: A list of state codes.
+            by: Column(s) to group by, e.g. "CD_OPERADORA" or
+                ["SG_UF", "DE_FAIXA_ETARIA"].
+            values: Column(s) to sum.
+            target_date: A single month, in the "YYYYMM" format.
+            start: First month, with `end`, instead of `target_date`.
+            end: Last month, with `start`, instead of `target_date`.
+            chunk_size: Number of rows parsed at once by each worker.
+            max_workers: Maximum number of files downloaded at the same time.
+            parse_workers: Number of worker processes. Defaults to the number
+                of CPUs.
+
+        Returns:
+            pd.DataFrame: One row per group, indexed by `by`.
+        """
+        states, dates = self.validate_args(states, target_date, start, end)
+        by = [by] if isinstance(by, str) else list(by)
+        values = [values] if isinstance(values, str) else list(values)
+
+        urls = self._file_urls([(s, d) for s in states for d in dates])
+        with get_cache().pinned(urls):
+            zip_paths = download_many(
+                urls,
+                max_workers=max_workers,
+                extract=False,
+                revalidate=not self.offline,
+            )
+
+            # the partial sums are merged as they arrive, so only the running
+            # total is kept
+            total = None
+            for partial in iter_parallel(
+                _aggregate_file,
+                [(zip_path, by, values, chunk_size) for zip_path in zip_paths],
+                max_workers=parse_workers or os.cpu_count() or 1,
+            ):
+                if total is not None:
+                    partial = _add_sums(total, partial, by)
+                total = partial
+
+        return total.sort_index()
+
+    def get_store(self):
+        """Return the local Parquet store of Beneficiários data.
+
+        Partitions are stored as `state=SP/month=202401`.
+        """
+        from ans_wrapper.store import ParquetStore
+
+        return ParquetStore(self.STORE_NAME, partition_keys=("state", "month"))
+
+    @staticmethod
+    def _arrow_types() -> dict:
+        """
+        Return the pyarrow types of the columns of the store.
+
+        Codes and counts are integers. Every other column, including the ones
+        not in the schema, is read as text: types inferred from the first
+        rows of a file fail on a later value that doesn't fit them.
+        """
+        import pyarrow as pa
+
+        return {
+            column: pa.int64()
+            for column, dtype in BENEFICIARIOS_SCHEMA.dtypes.items()
+            if dtype == "Int32"
+        }
+
+    def update_store(
+        self,
+        states: Union[STATE_CODES, List[STATE_CODES]],
+        dates: Union[str, List[str]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[dict]:
+        """
+        Add the missing state/month files to the local Parquet store.
+
+        Files already in the store are neither downloaded nor converted again.
+
+        Args:
+            states: A list of state codes.
+            dates: List of dates in the "YYYYMM" format.
+            max_workers: Maximum number of files downloaded at the same time.
+
+        Returns:
+            List[dict]: The partitions of every requested state/month.
+        """
+        if isinstance(states, str):
+            states = [states]
+        if isinstance(dates, str):
+            dates = [dates]
+
+        store = self.get_store()
+        partitions = [
+            {"state": state, "month": date}
+            for state in states
+            for date in dates
+        ]
+        # partitions converted with older column types are converted again
+        manifest = store.manifest()
+        missing = [
+            p
+            for p in partitions
+            if not store.has(**p)
+            or self._outdated_version(manifest.get(store.partition_key(**p)))
+        ]
+
+        if missing:
+            self._write_partitions(store, missing, max_workers)
+
+        return partitions
+
+    def sync(
+        self,
+        states: Union[STATE_CODES, List[STATE_CODES]],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[dict]:
+        """
+        Bring the local Parquet store up to date with the server.
+
+        The store keeps a manifest with the remote date and size of every
+        state/month file it holds. Only the files that are new or were
+        republished since the last sync are downloaded and converted.
+
+        Args:
+            states: A list of state codes.
+            start: First month to sync ("YYYYMM"). Defaults to the first month
+                available.
+            end: Last month to sync ("YYYYMM"). Defaults to the last month
+                available.
+            max_workers: Maximum number of files checked or downloaded at the
+                same time.
+
+        Returns:
+            List[dict]: The partitions that were added or replaced.
+        """
+        if self.offline:
+            raise ValueError("`sync` needs the server, it can't run offline")
+
+        if isinstance(states, str):
+            states = [states]
+
+        # A sync always checks the server for new months and files. Only the
+        # month folders that changed since the last crawl are listed again.
+        get_catalog().crawl(self.ENDPOINT, max_workers=max_workers, max_depth=1)
+        self._available_months = self._fetch_available_months()
+
+        dates = [
+            date
+            for date in self.available_months
+            if (start is None or date >= start) and (end is None or date <= end)
+        ]
+
+        store = self.get_store()
+        partitions = [
+            {"state": state, "month": date}
+            for state in states
+            for date in dates
+        ]
+        # not every state has a file every month
+        urls = self._file_urls(
+            [(p["state"], p["month"]) for p in partitions],
+            # the crawl above already listed the changed month folders
+            max_age=float("inf"),
+            missing_ok=True,
+        )
+        partitions = [p for p, url in zip(partitions, urls) if url is not None]
+        remote = remote_info_many(
+            [url for url in urls if url is not None], max_workers=max_workers
+        )
+
+        outdated = []
+        for partition, info in zip(partitions, remote):
+            if info is None:
+                continue
+
+            recorded = store.recorded(**partition)
+            if (
+                recorded is None
+                or not store.has(**partition)
+                or self._outdated_version(recorded)
+                or recorded.get("last_modified") != info["last_modified"]
+                or recorded.get("size") != info["size"]
+            ):
+                outdated.append(partition)
+
+        if outdated:
+            self._write_partitions(store, outdated, max_workers)
+
+        return outdated
+
+    def _outdated_version(self, recorded: Optional[dict]) -> bool:
+        """Whether a partition was recorded with other column types."""
+        return (recorded or {}).get("version") != self.STORE_VERSION
+
+    def _write_partitions(self, store, partitions, max_workers):
+        """Download state/month files and convert them into the store."""
+        import pyarrow as pa
+
+        urls = self._file_urls([(p["state"], p["month"]) for p in partitions])
+        cache = get_cache()
+        with cache.pinned(urls):
+            zip_paths = download_many(
+                urls,
+                max_workers=max_workers,
+                extract=False,
+                revalidate=not self.offline,
+            )
+
+            for partition, url, zip_path in zip(partitions, urls, zip_paths):
+                store.write(
+                    zip_path,
+                    column_types=self._arrow_types(),
+                    default_type=pa.string(),
+                    **partition,
+                )
+
+                entry = cache.get(url) or {}
+                store.record(
+                    {
+                        "url": url,
+                        "etag": entry.get("etag"),
+                        "last_modified": entry.get("last_modified"),
+                        "size": entry.get("size"),
+                        "synced_at": time.time(),
+                        "version": self.STORE_VERSION,
+                    },
+                    **partition,
+                )
 
     def download_raw_data(
-        self, states: STATE_CODES | list[STATE_CODES], dates: str | list[str]
+        self,
+        states: STATE_CODES | list[STATE_CODES],
+        dates: str | list[str],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        extract: bool = True,
     ) -> str:
         """
         Download raw, unaltered datasets from the ANS server
@@ -108,9 +678,12 @@ class Beneficiarios:
         Args:
             states: A list of state codes.
             dates: List of dates in the "YYYYMM" format.
+            max_workers: Maximum number of files downloaded at the same time.
+            extract: Whether to extract the CSV files from the ZIP archives.
 
         Returns:
-            str: The path to the downloaded csv files.
+            str: The path to the downloaded csv files (or ZIP archives, if
+                `extract` is False).
 
         """
         # Checking argument types first
@@ -120,41 +693,126 @@ class Beneficiarios:
             dates = [dates]
 
         # Forming urls
-        file_paths = []
-        for state in states:
-            for date in dates:
-                year, month = date[:4], date[4:]
-                cur_file_name = self.FILENAME.format(
-                    state_sigla=state, year=year, month=month
-                )
-                cur_file_path = date + "/" + cur_file_name
-                file_paths.append(cur_file_path)
+        urls = self._file_urls([(s, d) for s in states for d in dates])
 
         # Downloading CSVs
-        csv_paths = []
-        for urls in file_paths:
-            cur_url = self.__BENEFICIARIOS_URL + urls
-            print(cur_url)
-            csv_path = download_and_extract_csv(cur_url)
-            csv_paths.append(csv_path)
+        csv_paths = download_many(
+            urls,
+            max_workers=max_workers,
+            extract=extract,
+            revalidate=not self.offline,
+        )
 
         return csv_paths
 
-    def _fetch_available_months(self) -> List[str]:
+    @staticmethod
+    def validate_args(states, target_date, start, end):
+        """Validate the state and date arguments of `build_dataset`.
+
+        Args:
+            states: A state code or a list of state codes.
+            target_date: A single month, in the "YYYYMM" format.
+            start: First month, with `end`, instead of `target_date`.
+            end: Last month, with `start`, instead of `target_date`.
+
+        Returns:
+            The list of states and the list of dates ("YYYYMM").
+
+        Raises:
+            ValueError: If a state is unknown, or the dates are given both or
+                neither ways.
+        """
+        # Checking date args
+        if (target_date and (start or end)) or (
+            not target_date and not (start and end)
+        ):
+            raise ValueError(
+                "provide either `target_date` or both `start` and `end`, "
+                "not both."
+            )
+
+        # checking states
+        if isinstance(states, str):
+            states = [states]
+
+        for state in states:
+            if state not in BRAZILIAN_STATE_CODES:
+                raise ValueError(
+                    f"invalid state: {state}, "
+                    f"allowed states: {BRAZILIAN_STATE_CODES}"
+                )
+
+        # Creating a list of dates
+        dates = (
+            [target_date] if target_date else generate_month_range(start, end)
+        )
+
+        return states, dates
+
+    def _file_url(self, state: str, date: str) -> str:
+        """Return the URL of the file of a state in a month ("YYYYMM")."""
+        year, month = date[:4], date[4:]
+        cur_file_name = self.FILENAME.format(
+            state_sigla=state, year=year, month=month
+        )
+        return self.__BENEFICIARIOS_URL + date + "/" + cur_file_name
+
+    def _file_urls(
+        self,
+        pairs: List[Tuple[str, str]],
+        max_age: Optional[float] = None,
+        missing_ok: bool = False,
+    ) -> List[Optional[str]]:
+        """
+        Resolve the URLs of state/month files from the catalog of the server.
+
+        Args:
+            pairs: `(state, "YYYYMM")` tuples.
+            max_age: Maximum age, in seconds, of the month listings used.
+                Defaults to `listing_ttl`.
+            missing_ok: Return None for the files that aren't published,
+                instead of raising.
+
+        Raises:
+            ValueError: If some of the files aren't published.
+        """
+        resolved = get_catalog().resolve(
+            [self._file_url(state, date) for state, date in pairs],
+            max_age=self.listing_ttl if max_age is None else max_age,
+            offline=self.offline,
+        )
+
+        missing = [
+            f"{state}/{date}"
+            for (state, date), url in zip(pairs, resolved)
+            if url is None
+        ]
+        if missing and not missing_ok:
+            raise ValueError(f"files not published by ANS: {missing}")
+
+        return resolved
+
+    def _fetch_available_months(self, ttl: Optional[float] = None) -> List[str]:
         """
         Fetches the list of available months from the beneficiários folder.
 
+        The listing is kept in the catalog for `ttl` seconds (defaults to
+        `listing_ttl`).
+
         Returns:
                 List[str]: A sorted list of strings in the format 'YYYYMM',
                                    representing each available monthly folder on the server.
         """
         # Fetching the page data
-        list_of_links = parse_url_links(self.__BENEFICIARIOS_URL)
+        entries = get_catalog().folder(
+            self.__BENEFICIARIOS_URL,
+            max_age=self.listing_ttl if ttl is None else ttl,
+            offline=self.offline,
+        )
 
         # Parsing and cleaning links
         list_of_dates = []
-        for link in list_of_links:
-            href = link["href"]
+        for href in entries:
             # if it's a folder and name starts with a 6-digit date
             if href.endswith("/") and href[:6].isdigit():
                 list_of_dates.append(href.strip("/"))
@@ -0,0 +1,378 @@
+"""
+Persistent on-disk cache for the files downloaded from the ANS server.
+
+Every ZIP file is stored under a key derived from its URL, together with the
+ETag, Last-Modified and size reported by the server. Cached files are
+revalidated with conditional requests, so an unchanged file costs a single
+`304 Not Modified` response instead of a full download.
+
+The cache can be shared by several processes: its index is merged with the
+changes of the others under a file lock (see `ans_wrapper.locks`).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+from ans_wrapper.instrumentation import log
+from ans_wrapper.locks import FileLock, atomic_write
+
+# Environment variables used to configure the default cache
+CACHE_DIR_ENV = "ANS_WRAPPER_CACHE_DIR"
+CACHE_MAX_SIZE_ENV = "ANS_WRAPPER_CACHE_MAX_SIZE"
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "ans_wrapper")
+
+
+class DownloadCache:
+    """A URL-keyed file cache with LRU eviction.
+
+    The CSV files extracted from a cached ZIP are kept next to it, count
+    towards `max_size` with it, and are removed together with it.
+
+    The files of a running batch can be pinned (see `pinned`), so that they
+    aren't evicted before the batch has read them.
+
+    Args:
+        cache_dir: Folder of the cache. Defaults to `$ANS_WRAPPER_CACHE_DIR`
+            or `~/.cache/ans_wrapper`.
+        max_size: Maximum total size of the cached ZIP files and of the CSV
+            files extracted from them, in bytes. Defaults to
+            `$ANS_WRAPPER_CACHE_MAX_SIZE`, or no limit.
+    """
+
+    INDEX_FILENAME = "index.json"
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_size: Optional[int] = None
+    ):
+        cache_dir = cache_dir or os.environ.get(
+            CACHE_DIR_ENV, DEFAULT_CACHE_DIR
+        )
+        if max_size is None and os.environ.get(CACHE_MAX_SIZE_ENV):
+            max_size = int(os.environ[CACHE_MAX_SIZE_ENV])
+
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_size = max_size
+        self.zip_dir = os.path.join(self.cache_dir, "zips")
+        self.csv_dir = os.path.join(self.cache_dir, "csv")
+
+        self._index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._index = {}
+        self._index_stamp = None
+        # how many running batches pinned each URL
+        self._pins: Dict[str, int] = {}
+        self._over_limit = False
+        self._reload()
+
+    # Index ----------
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """Read the index again if another process changed it."""
+        stamp = self._stamp()
+        if stamp != self._index_stamp:
+            self._index = load_json(self._index_path)
+            self._index_stamp = stamp
+
+    @contextmanager
+    def _updating(self) -> Iterator[dict]:
+        """
+        Change the index, on top of the changes of other processes.
+
+        The index is read again and saved under a file lock, so concurrent
+        processes don't overwrite each other's entries.
+        """
+        with self._lock, FileLock(self._index_path + ".lock"):
+            self._reload()
+            yield self._index
+            save_json(self._index_path, self._index)
+            self._index_stamp = self._stamp()
+
+    # Entries ----------
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Return the cache key of an URL."""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+    def path_for(self, url: str) -> str:
+        """Return the path where the file of `url` is stored."""
+        filename = url.rstrip("/").split("/")[-1]
+        return os.path.join(self.zip_dir, f"{self.key(url)}-{filename}")
+
+    def extract_dir_for(self, url: str) -> str:
+        """Return the folder where the CSV files of `url` are extracted."""
+        return os.path.join(self.csv_dir, self.key(url))
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Return the metadata of a cached URL, or None if it isn't cached.
+
+        Entries whose file was removed from the disk are dropped.
+        """
+        with self._lock:
+            self._reload()
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+
+            if not os.path.exists(entry["path"]):
+                with self._updating() as index:
+                    index.pop(url, None)
+                return None
+
+            return dict(entry)
+
+    def validation_headers(self, url: str) -> Dict[str, str]:
+        """Return the headers needed for a conditional request on `url`."""
+        entry = self.get(url)
+        if entry is None:
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self, url: str, path: str, headers, sha256: Optional[str] = None
+    ) -> dict:
+        """
+        Record a freshly downloaded file and evict old entries if needed.
+
+        Args:
+            url: URL the file was downloaded from.
+            path: Path of the file, as given by `path_for(url)`.
+            headers: Response headers of the download.
+            sha256: SHA-256 of the file, if known.
+        """
+        entry = {
+            "path": path,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "size": os.path.getsize(path),
+            # an older extraction is replaced when the new file is extracted
+            "extracted_size": self._extracted_size(url),
+            "sha256": sha256,
+            "downloaded_at": time.time(),
+            "last_access": time.time(),
+        }
+
+        with self._updating() as index:
+            index[url] = entry
+            self._evict(keep=url)
+
+        return dict(entry)
+
+    def record_extracted(self, url: str):
+        """
+        Count the CSV files extracted from a cached URL towards `max_size`,
+        and evict old entries if needed.
+        """
+        extracted_size = self._extracted_size(url)
+        with self._updating() as index:
+            if url in index:
+                index[url]["extracted_size"] = extracted_size
+                self._evict(keep=url)
+
+    def _extracted_size(self, url: str) -> int:
+        """Total size of the files extracted from `url`, in bytes."""
+        total = 0
+        for dirpath, _, filenames in os.walk(self.extract_dir_for(url)):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except FileNotFoundError:
+                    # e.g. the temporary file of an extraction that ended
+                    pass
+        return total
+
+    def verify(self, url: str) -> bool:
+        """Check a cached file against the size and SHA-256 recorded for it."""
+        entry = self.get(url)
+        if entry is None or os.path.getsize(entry["path"]) != entry["size"]:
+            return False
+        if entry.get("sha256") is None:
+            return True
+
+        hasher = hashlib.sha256()
+        with open(entry["path"], "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest() == entry["sha256"]
+
+    def touch(self, url: str):
+        """Mark a cached URL as recently used."""
+        with self._updating() as index:
+            if url in index:
+                index[url]["last_access"] = time.time()
+
+    def remove(self, url: str):
+        """Remove an URL and its file from the cache."""
+        with self._updating() as index:
+            entry = index.pop(url, None)
+            if entry is not None:
+                self._remove_files(url, entry)
+
+    def clear(self):
+        """Remove every file from the cache."""
+        with self._updating() as index:
+            for url, entry in list(index.items()):
+                self._remove_files(url, entry)
+            index.clear()
+
+    # Size management ----------
+
+    @contextmanager
+    def pinned(self, urls: Iterable[str]) -> Iterator[None]:
+        """
+        Keep the files of `urls` in the cache until the block ends.
+
+        A batch larger than `max_size` would otherwise evict its first files
+        while downloading the last ones, before reading them. Pinned files
+        are never evicted: the cache may go over `max_size` while they are
+        in use, and old entries are evicted again when the block ends.
+
+        Args:
+            urls: URLs of the files used by the block.
+        """
+        urls = list(urls)
+        with self._lock:
+            for url in urls:
+                self._pins[url] = self._pins.get(url, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for url in urls:
+                    self._pins[url] -= 1
+                    if not self._pins[url]:
+                        del self._pins[url]
+            if self.max_size is not None:
+                with self._updating():
+                    self._evict()
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached files and their extracted CSVs, in bytes."""
+        with self._lock:
+            self._reload()
+            return sum(_entry_size(entry) for entry in self._index.values())
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Drop the least recently used entries until `max_size` is met.
+
+        `keep` and the pinned entries are never dropped, nor the entries
+        whose lock (see `download_zip`) is held, e.g. by another process
+        downloading or reading them.
+        """
+        if self.max_size is None:
+            return
+
+        total = self.size
+        by_last_access = sorted(
+            self._index.items(), key=lambda item: item[1]["last_access"]
+        )
+        for url, entry in by_last_access:
+            if total <= self.max_size:
+                break
+            if url == keep or url in self._pins:
+                continue
+
+            lock = FileLock(entry["path"] + ".lock", timeout=0)
+            try:
+                lock.acquire()
+            except TimeoutError:
+                continue
+            try:
+                del self._index[url]
+                self._remove_files(url, entry)
+            finally:
+                lock.release()
+            total -= _entry_size(entry)
+
+        over_limit = total > self.max_size
+        if over_limit and not self._over_limit:
+            log(
+                f"Cache over its size limit ({total} > {self.max_size} "
+                "bytes): the files in use are kept until they are read"
+            )
+        self._over_limit = over_limit
+
+    def _remove_files(self, url: str, entry: dict):
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(self.extract_dir_for(url), ignore_errors=True)
+
+
+def _entry_size(entry: dict) -> int:
+    """Size of a cached file and of the files extracted from it."""
+    return entry["size"] + entry.get("extracted_size", 0)
+
+
+def load_json(path: str) -> dict:
+    """Read a JSON file, or return an empty dict if it is missing or broken."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_json(path: str, data: dict):
+    """Write a JSON file atomically."""
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+_default_cache: Optional[DownloadCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> DownloadCache:
+    """Return the cache used by default by every download."""
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DownloadCache()
+        return _default_cache
+
+
+def configure_cache(
+    cache_dir: Optional[str] = None, max_size: Optional[int] = None
+) -> DownloadCache:
+    """
+    Change the location and size limit of the default cache.
+
+    Args:
+        cache_dir: Folder of the cache.
+        max_size: Maximum total size of the cached ZIP files and of the CSV
+            files extracted from them, in bytes.
+
+    Returns:
+        DownloadCache: The new default cache.
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        _default_cache = DownloadCache(cache_dir=cache_dir, max_size=max_size)
+        return _default_cache
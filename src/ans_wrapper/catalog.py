@@ -0,0 +1,442 @@
+"""
+Catalog of the files published in the ANS open data tree (`PDA/`).
+
+The catalog stores the directory listings of the server: the name, size and
+modification date of every file and folder. It is crawled concurrently, kept
+on disk next to the download cache, and refreshed incrementally: a folder is
+only fetched again when its modification date, as shown by its parent, has
+changed.
+
+The dataset classes resolve their file URLs through the catalog, so files
+that were never published are reported before any download is attempted.
+
+    catalog = get_catalog()
+    catalog.crawl("demonstracoes_contabeis/")
+    for entry in catalog.files("demonstracoes_contabeis/"):
+        print(entry.url, entry.size, entry.modified)
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from ans_wrapper.cache import get_cache, load_json, save_json
+from ans_wrapper.instrumentation import emit
+from ans_wrapper.locks import FileLock
+from ans_wrapper.utils import (
+    BASE_URL,
+    DEFAULT_MAX_WORKERS,
+    DownloadError,
+    get_session,
+)
+
+CATALOG_FILENAME = "catalog.json"
+
+# A link and the rest of its line, where the listing shows the date and size
+_LINK = re.compile(
+    r'<a\s+href="(?P<href>[^"]+)"[^>]*>.*?</a>(?P<rest>[^\n]*)',
+    re.IGNORECASE,
+)
+_TAG = re.compile(r"<[^>]+>")
+# Apache ("2024-01-31 10:05") and nginx ("31-Jan-2024 10:05") date formats
+_DATE = re.compile(
+    r"(?P<iso>\d{4}-\d{2}-\d{2} \d{2}:\d{2})"
+    r"|(?P<nginx>\d{2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2})"
+)
+# Exact ("12345") or human-readable ("1.2M") sizes
+_SIZE = re.compile(r"(?P<number>\d+(?:\.\d+)?)(?P<unit>[KMGT]?)\s*$")
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class CatalogEntry(NamedTuple):
+    """A file or folder of the catalog.
+
+    `size` is the size shown by the listing, which is rounded when the server
+    shows sizes such as "1.2M". It is None for folders.
+    """
+
+    url: str
+    size: Optional[int]
+    modified: Optional[str]
+
+    @property
+    def is_dir(self) -> bool:
+        return self.url.endswith("/")
+
+
+def parse_listing(html: str) -> Dict[str, list]:
+    """
+    Parse a directory listing page.
+
+    A single regular expression pass is much faster than building the whole
+    document tree, and handles the Apache and nginx listing formats.
+
+    Returns:
+        Dict[str, list]: `[size, modified]` of every entry, keyed by name.
+            Folder names end with "/".
+    """
+    entries = {}
+    for match in _LINK.finditer(html):
+        href = match.group("href")
+        # sorting links, parent folder and links out of the folder
+        if href.startswith(("?", "/", "..", "#")) or "://" in href:
+            continue
+
+        text = _TAG.sub(" ", match.group("rest")).replace("&nbsp;", " ")
+
+        modified = None
+        date = _DATE.search(text)
+        if date is not None:
+            if date.group("iso"):
+                modified = date.group("iso")
+            else:
+                modified = datetime.strptime(
+                    date.group("nginx"), "%d-%b-%Y %H:%M"
+                ).strftime("%Y-%m-%d %H:%M")
+            text = text[date.end() :]
+
+        size = None
+        found = _SIZE.search(text.strip())
+        if found is not None and not href.endswith("/"):
+            size = int(
+                float(found.group("number")) * _UNITS[found.group("unit")]
+            )
+
+        entries[href] = [size, modified]
+
+    return entries
+
+
+class Catalog:
+    """Directory listings of the PDA tree, persisted on disk.
+
+    Args:
+        root_url: URL of the root of the tree. Defaults to `BASE_URL`.
+        path: File where the catalog is saved. Defaults to `catalog.json` in
+            the cache folder.
+    """
+
+    def __init__(
+        self, root_url: Optional[str] = None, path: Optional[str] = None
+    ):
+        self.root_url = root_url or BASE_URL
+        self.path = path or os.path.join(
+            get_cache().cache_dir, CATALOG_FILENAME
+        )
+        self._lock = threading.RLock()
+        self._folders = load_json(self.path).get("folders", {})
+        # folders found missing since the last save, and when
+        self._removed: Dict[str, float] = {}
+
+    def save(self):
+        """
+        Write the catalog to the disk.
+
+        The catalog is read again and merged under a file lock, so processes
+        crawling other folders don't overwrite each other's listings. The
+        most recently fetched listing of a folder is kept.
+        """
+        with self._lock, FileLock(self.path + ".lock"):
+            saved = load_json(self.path).get("folders", {})
+            for url, folder in saved.items():
+                current = self._folders.get(url)
+                fetched_at = folder["fetched_at"]
+                if current is not None:
+                    if fetched_at > current["fetched_at"]:
+                        self._folders[url] = folder
+                elif fetched_at > self._removed.get(url, float("-inf")):
+                    self._folders[url] = folder
+
+            save_json(
+                self.path, {"root": self.root_url, "folders": self._folders}
+            )
+            self._removed.clear()
+
+    # Folders ----------
+
+    def _fetch(self, url: str, modified: Optional[str] = None):
+        """Fetch the listing of a folder into the catalog."""
+        start = time.perf_counter()
+        response = get_session().get(url)
+        if response.status_code == 404:
+            entries = None
+        else:
+            response.raise_for_status()
+            entries = parse_listing(response.text)
+
+        with self._lock:
+            previous = self._folders.get(url) or {}
+            if modified is None:
+                # this listing is at least as new as the one it replaces
+                modified = previous.get("modified")
+
+            if entries is None:
+                self._folders.pop(url, None)
+                self._removed[url] = time.time()
+            else:
+                self._folders[url] = {
+                    "entries": entries,
+                    "modified": modified,
+                    "fetched_at": time.time(),
+                }
+
+        emit(
+            "list",
+            source=url,
+            seconds=time.perf_counter() - start,
+            bytes=len(response.content),
+            cache_hit=False,
+        )
+
+    def _entries(self, url: str) -> Optional[Dict[str, CatalogEntry]]:
+        with self._lock:
+            folder = self._folders.get(url)
+            if folder is None:
+                return None
+            return {
+                name: CatalogEntry(url + name, size, modified)
+                for name, (size, modified) in folder["entries"].items()
+            }
+
+    def _is_fresh(self, url: str, max_age: Optional[float]) -> bool:
+        with self._lock:
+            folder = self._folders.get(url)
+        if folder is None:
+            return False
+        age = time.time() - folder["fetched_at"]
+        return max_age is None or age <= max_age
+
+    def folders(
+        self,
+        urls: Sequence[str],
+        max_age: Optional[float] = None,
+        offline: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> Dict[str, Optional[Dict[str, CatalogEntry]]]:
+        """
+        Return the entries of several folders, fetching the missing ones.
+
+        Args:
+            urls: URLs of the folders, ending with "/".
+            max_age: Fetch again the folders fetched more than `max_age`
+                seconds ago. If None, any catalogued listing is used.
+            offline: Only use the catalog, however old it is.
+            max_workers: Maximum number of folders fetched at the same time.
+
+        Returns:
+            The entries of every folder, keyed by name, or None for folders
+            that don't exist (or aren't catalogued, when offline).
+        """
+        if not offline:
+            stale = [
+                url for url in set(urls) if not self._is_fresh(url, max_age)
+            ]
+            if stale:
+                get_session(max_workers)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    list(executor.map(self._fetch, stale))
+                self.save()
+
+        return {url: self._entries(url) for url in urls}
+
+    def folder(
+        self,
+        url: str,
+        max_age: Optional[float] = None,
+        offline: bool = False,
+    ) -> Dict[str, CatalogEntry]:
+        """
+        Return the entries of a folder, keyed by name.
+
+        Raises:
+            DownloadError: If the folder doesn't exist, or isn't catalogued
+                when offline.
+        """
+        entries = self.folders([url], max_age=max_age, offline=offline)[url]
+        if entries is None:
+            if offline:
+                raise DownloadError(
+                    f"No cached listing for {url} (offline mode)"
+                )
+            raise DownloadError(f"Folder not found: {url}")
+        return entries
+
+    def crawl(
+        self,
+        prefix: str = "",
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_depth: Optional[int] = None,
+    ) -> int:
+        """
+        Crawl the tree under `prefix`, one level at a time.
+
+        The folders of each level are fetched concurrently. A folder whose
+        modification date didn't change since it was catalogued is not fetched
+        again, but its subfolders are still checked.
+
+        Args:
+            prefix: Folder to crawl, relative to the root (e.g.
+                "demonstracoes_contabeis/"). Defaults to the whole tree.
+            max_workers: Maximum number of folders fetched at the same time.
+            max_depth: How many levels of subfolders to crawl. If None, the
+                whole subtree is crawled.
+
+        Returns:
+            int: The number of folders fetched.
+        """
+        get_session(max_workers)
+
+        # (url, modification date shown by the parent)
+        level = [(self.root_url + prefix, None)]
+        depth = 0
+        fetched = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while level:
+                stale = []
+                for url, modified in level:
+                    with self._lock:
+                        folder = self._folders.get(url)
+                    if (
+                        folder is None
+                        or modified is None
+                        or folder["modified"] != modified
+                    ):
+                        stale.append((url, modified))
+
+                list(executor.map(lambda args: self._fetch(*args), stale))
+                fetched += len(stale)
+
+                if max_depth is not None and depth >= max_depth:
+                    break
+
+                level = [
+                    (entry.url, entry.modified)
+                    for url, _ in level
+                    for entry in (self._entries(url) or {}).values()
+                    if entry.is_dir
+                ]
+                depth += 1
+
+        self.save()
+        return fetched
+
+    # Files ----------
+
+    def files(self, prefix: str = "") -> List[CatalogEntry]:
+        """List the catalogued files under `prefix`, sorted by URL."""
+        start = self.root_url + prefix
+        with self._lock:
+            urls = [url for url in self._folders if url.startswith(start)]
+
+        return sorted(
+            (
+                entry
+                for url in urls
+                for entry in self._entries(url).values()
+                if not entry.is_dir
+            ),
+            key=lambda entry: entry.url,
+        )
+
+    def find(self, url: str) -> Optional[CatalogEntry]:
+        """Return the catalogued entry of a file, if any."""
+        folder_url, name = url.rsplit("/", 1)
+        return (self._entries(folder_url + "/") or {}).get(name)
+
+    def resolve(
+        self,
+        urls: Sequence[str],
+        max_age: Optional[float] = None,
+        offline: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[Optional[str]]:
+        """
+        Check that files are published, using the listings of their folders.
+
+        A name is matched exactly, then ignoring case, in which case the URL
+        of the published file is returned. Files not found in an old listing
+        are looked up again in a fresh one before being reported missing.
+
+        Args:
+            urls: Expected URLs of the files.
+            max_age: Maximum age, in seconds, of the listings used.
+            offline: Only use the catalog. URLs of folders that aren't
+                catalogued are returned unchecked.
+            max_workers: Maximum number of folders fetched at the same time.
+
+        Returns:
+            List[Optional[str]]: The URL of every file, or None if it isn't
+                published.
+        """
+        started = time.time()
+        resolved = self._resolve(urls, max_age, offline, max_workers)
+        if offline:
+            return resolved
+
+        # files missing from listings fetched before this call
+        retry = []
+        for url, found in zip(urls, resolved):
+            with self._lock:
+                folder = self._folders.get(url.rsplit("/", 1)[0] + "/")
+            if found is None and folder and folder["fetched_at"] < started:
+                retry.append(url)
+
+        if retry:
+            again = self._resolve(retry, 0, False, max_workers)
+            again = dict(zip(retry, again))
+            resolved = [
+                again.get(url, found) for url, found in zip(urls, resolved)
+            ]
+
+        return resolved
+
+    def _resolve(self, urls, max_age, offline, max_workers):
+        folder_urls = [url.rsplit("/", 1)[0] + "/" for url in urls]
+        folders = self.folders(
+            folder_urls,
+            max_age=max_age,
+            offline=offline,
+            max_workers=max_workers,
+        )
+
+        resolved = []
+        for url, folder_url in zip(urls, folder_urls):
+            entries = folders[folder_url]
+            if entries is None:
+                # can't tell without the listing
+                resolved.append(url if offline else None)
+                continue
+
+            name = url.rsplit("/", 1)[1]
+            if name in entries:
+                resolved.append(url)
+                continue
+
+            matches = [
+                entry
+                for other, entry in entries.items()
+                if other.lower() == name.lower()
+            ]
+            resolved.append(matches[0].url if matches else None)
+
+        return resolved
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Return the catalog of the default cache folder."""
+    global _catalog
+
+    with _catalog_lock:
+        path = os.path.join(get_cache().cache_dir, CATALOG_FILENAME)
+        if _catalog is None or _catalog.path != path:
+            _catalog = Catalog(path=path)
+        return _catalog
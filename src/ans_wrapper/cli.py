@@ -0,0 +1,210 @@
+"""
+Command line interface of ans-wrapper.
+
+`prefetch` warms the local data of a batch node ahead of the analysis jobs:
+it downloads the files concurrently into the cache, converts them into the
+local Parquet stores, and prints a throughput summary.
+
+    ans-wrapper prefetch demonstracoes --quarters 1T2020:2T2024
+    ans-wrapper prefetch beneficiarios --states all --start 202001 --end 202406
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, List, Optional
+
+from ans_wrapper.instrumentation import MetricsCollector, set_quiet
+
+
+def _expand(values: List[str], generate_range: Callable) -> List[str]:
+    """Expand "start:end" ranges in a list of quarters or months."""
+    expanded = []
+    for value in values:
+        if ":" in value:
+            start, end = value.split(":", 1)
+            expanded.extend(generate_range(start, end))
+        else:
+            expanded.append(value)
+    # keep the order, without duplicates
+    return list(dict.fromkeys(expanded))
+
+
+# Commands ----------
+
+
+def _prefetch_demonstracoes(args) -> dict:
+    from ans_wrapper.demonstracoes_contabeis import DemonstracoesContabeis
+    from ans_wrapper.utils import download_many, generate_quarter_range
+
+    quarters = _expand(args.quarters, generate_quarter_range)
+    dc = DemonstracoesContabeis()
+
+    if args.no_convert:
+        download_many(
+            dc.urls(quarters),
+            max_workers=args.max_workers,
+            extract=False,
+        )
+        location = None
+    else:
+        # the store sorted by REG_ANS and its index (see `history`)
+        dc.update_index(quarters, max_workers=args.max_workers)
+        location = dc.get_store().root
+
+    return {"files": len(quarters), "unit": "quarters", "location": location}
+
+
+def _prefetch_beneficiarios(args) -> dict:
+    from ans_wrapper.beneficiarios import Beneficiarios
+    from ans_wrapper.enums import BRAZILIAN_STATE_CODES
+
+    states = [state.upper() for state in args.states]
+    if states == ["ALL"]:
+        states = list(BRAZILIAN_STATE_CODES)
+
+    b = Beneficiarios()
+    states, dates = b.validate_args(states, None, args.start, args.end)
+
+    if args.no_convert:
+        b.download_raw_data(
+            states, dates, max_workers=args.max_workers, extract=False
+        )
+        location = None
+    else:
+        b.update_store(states, dates, max_workers=args.max_workers)
+        location = b.get_store().root
+
+    return {
+        "files": len(states) * len(dates),
+        "unit": "state/month files",
+        "location": location,
+    }
+
+
+def _print_summary(result: dict, metrics: MetricsCollector, seconds: float):
+    downloads = metrics.summary().get("download", {})
+    downloaded = downloads.get("cache_misses", 0)
+    cached = downloads.get("cache_hits", 0)
+    megabytes = downloads.get("bytes", 0) / 1024**2
+
+    print(f"Prefetched {result['files']} {result['unit']} in {seconds:.1f} s")
+    print(
+        f"  downloaded: {downloaded:>6} files {megabytes:>10.1f} MB "
+        f"({megabytes / seconds if seconds else 0:.1f} MB/s)"
+    )
+    print(f"  from cache: {cached:>6} files")
+    if result["location"] is not None:
+        already = result["files"] - downloaded - cached
+        print(f"  already converted: {already} files")
+        print(f"  Parquet store: {result['location']}")
+
+
+# Entry point ----------
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the parser of the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="ans-wrapper",
+        description="Download and prepare ANS open data.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prefetch = commands.add_parser(
+        "prefetch",
+        help="download datasets and convert them into the local stores",
+    )
+    datasets = prefetch.add_subparsers(dest="dataset", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="maximum number of files downloaded at the same time",
+    )
+    common.add_argument(
+        "--no-convert",
+        action="store_true",
+        help="only download the files, without converting them to Parquet",
+    )
+    common.add_argument(
+        "--cache-dir", help="cache folder (default: $ANS_WRAPPER_CACHE_DIR)"
+    )
+    common.add_argument(
+        "--quiet", action="store_true", help="hide the progress bars"
+    )
+    common.add_argument(
+        "--metrics",
+        action="store_true",
+        help="also print the time spent in every stage",
+    )
+
+    demonstracoes = datasets.add_parser(
+        "demonstracoes",
+        aliases=["demonstracoes_contabeis"],
+        parents=[common],
+        help="quarterly financial statements",
+    )
+    demonstracoes.add_argument(
+        "--quarters",
+        nargs="+",
+        required=True,
+        help='quarters or ranges of quarters, e.g. "1T2020:2T2024" 4T2019',
+    )
+    demonstracoes.set_defaults(prefetch=_prefetch_demonstracoes)
+
+    beneficiarios = datasets.add_parser(
+        "beneficiarios",
+        parents=[common],
+        help="monthly beneficiaries per state",
+    )
+    beneficiarios.add_argument(
+        "--states",
+        nargs="+",
+        required=True,
+        help='state codes (e.g. SP RJ), or "all"',
+    )
+    beneficiarios.add_argument(
+        "--start", required=True, help='first month, e.g. "202001"'
+    )
+    beneficiarios.add_argument(
+        "--end", required=True, help='last month, e.g. "202406"'
+    )
+    beneficiarios.set_defaults(prefetch=_prefetch_beneficiarios)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line interface. Returns the exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # imported after parsing, so `--help` doesn't load pandas
+    from ans_wrapper.utils import DownloadError
+
+    if args.cache_dir:
+        from ans_wrapper.cache import configure_cache
+
+        configure_cache(cache_dir=args.cache_dir)
+    if args.quiet:
+        set_quiet()
+
+    start = time.perf_counter()
+    try:
+        with MetricsCollector() as metrics:
+            result = args.prefetch(args)
+    except (DownloadError, ValueError) as e:
+        print(f"ans-wrapper: error: {e}", file=sys.stderr)
+        return 1
+
+    _print_summary(result, metrics, time.perf_counter() - start)
+    if args.metrics:
+        print(metrics.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Dense operator × account × quarter arrays of the Demonstrações Contábeis.
+
+`AccountCube` holds one balance column (e.g. `VL_SALDO_FINAL`) as a NumPy
+array with one axis per operator (REG_ANS), account (CD_CONTA_CONTABIL) and
+quarter, plus the labels of every axis. Ratios and trends become array
+operations instead of pivots:
+
+    cube = dc.get_cube(["1T2024", "2T2024"])
+    assets = cube.account("1")             # operators × quarters
+    growth = assets[:, 1] / assets[:, 0] - 1
+"""
+
+from functools import reduce
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class AccountCube:
+    """One balance column as an operator × account × quarter array.
+
+    Cells with no row in the data are NaN.
+
+    Args:
+        values: Array of shape `(operators, accounts, quarters)`.
+        operators: REG_ANS codes, labels of the first axis.
+        accounts: CD_CONTA_CONTABIL codes, labels of the second axis.
+        quarters: Quarters (e.g. "1T2024"), labels of the third axis.
+        column: Name of the balance column held.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        operators: Sequence,
+        accounts: Sequence,
+        quarters: Sequence,
+        column: str = "VL_SALDO_FINAL",
+    ):
+        self.values = values
+        self.operators = pd.Index(operators, name="REG_ANS")
+        self.accounts = pd.Index(accounts, name="CD_CONTA_CONTABIL")
+        self.quarters = pd.Index(quarters, name="quarter")
+        self.column = column
+
+        expected = (len(self.operators), len(self.accounts), len(self.quarters))
+        if values.shape != expected:
+            raise ValueError(
+                f"values have shape {values.shape}, the labels {expected}"
+            )
+
+    def __repr__(self) -> str:
+        return (
+            f"AccountCube({self.column}: {len(self.operators)} operators × "
+            f"{len(self.accounts)} accounts × {len(self.quarters)} quarters)"
+        )
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        column: str = "VL_SALDO_FINAL",
+        quarters: Optional[Sequence[str]] = None,
+        dtype=np.float64,
+    ) -> "AccountCube":
+        """
+        Build a cube from rows with REG_ANS, CD_CONTA_CONTABIL, `quarter` and
+        `column` columns.
+
+        Args:
+            df: The rows of one or more quarters.
+            column: Balance column to put in the cube.
+            quarters: Order of the quarter axis. Defaults to the quarters of
+                `df`, as they appear.
+            dtype: Type of the array. float32 halves its memory.
+        """
+        df = df.dropna(subset=["REG_ANS", "CD_CONTA_CONTABIL"])
+        operator_codes, operators = pd.factorize(df["REG_ANS"], sort=True)
+        account_codes, accounts = pd.factorize(
+            df["CD_CONTA_CONTABIL"].astype(str), sort=True
+        )
+
+        if quarters is None:
+            quarters = pd.unique(df["quarter"])
+        quarters = pd.Index(quarters)
+        quarter_codes = quarters.get_indexer(df["quarter"])
+        if (quarter_codes < 0).any():
+            raise ValueError("`df` has quarters missing from `quarters`")
+
+        values = np.full(
+            (len(operators), len(accounts), len(quarters)), np.nan, dtype=dtype
+        )
+        # a single scatter; duplicated cells keep their last row
+        values[operator_codes, account_codes, quarter_codes] = df[
+            column
+        ].to_numpy(dtype=dtype, na_value=np.nan)
+
+        return cls(values, operators, accounts, quarters, column)
+
+    @classmethod
+    def concat(cls, cubes: Sequence["AccountCube"]) -> "AccountCube":
+        """
+        Stack cubes of different quarters of the same column.
+
+        The operators and accounts axes are the union of the cubes' ones;
+        cells missing from a cube are NaN.
+        """
+        operators = reduce(pd.Index.union, [c.operators for c in cubes])
+        accounts = reduce(pd.Index.union, [c.accounts for c in cubes])
+        quarters = pd.Index([q for c in cubes for q in c.quarters])
+        if quarters.has_duplicates:
+            raise ValueError("the cubes have quarters in common")
+
+        values = np.full(
+            (len(operators), len(accounts), len(quarters)),
+            np.nan,
+            dtype=cubes[0].values.dtype,
+        )
+        for cube in cubes:
+            o = operators.get_indexer(cube.operators)
+            a = accounts.get_indexer(cube.accounts)
+            q = quarters.get_indexer(cube.quarters)
+            values[np.ix_(o, a, q)] = cube.values
+
+        return cls(values, operators, accounts, quarters, cubes[0].column)
+
+    # Indexing ----------
+
+    @staticmethod
+    def _positions(index: pd.Index, labels, axis: str) -> np.ndarray:
+        if labels is None:
+            return np.arange(len(index))
+
+        if isinstance(labels, (str, int, np.integer)):
+            labels = [labels]
+        if axis == "account":
+            labels = [str(label) for label in labels]
+
+        positions = index.get_indexer(labels)
+        if (positions < 0).any():
+            missing = [
+                label
+                for label, position in zip(labels, positions)
+                if position < 0
+            ]
+            raise KeyError(f"{axis}(s) not in the cube: {missing}")
+        return positions
+
+    def sel(
+        self,
+        operators=None,
+        accounts=None,
+        quarters=None,
+    ) -> "AccountCube":
+        """
+        Return the sub-cube of some operators, accounts and/or quarters.
+
+        Raises:
+            KeyError: If a label is not in the cube.
+        """
+        o = self._positions(self.operators, operators, "operator")
+        a = self._positions(self.accounts, accounts, "account")
+        q = self._positions(self.quarters, quarters, "quarter")
+        return AccountCube(
+            self.values[np.ix_(o, a, q)],
+            self.operators[o],
+            self.accounts[a],
+            self.quarters[q],
+            self.column,
+        )
+
+    def account(self, account: str) -> np.ndarray:
+        """Return the operators × quarters array of one account."""
+        a = self._positions(self.accounts, account, "account")[0]
+        return self.values[:, a, :]
+
+    def operator(self, operator: int) -> np.ndarray:
+        """Return the accounts × quarters array of one operator."""
+        o = self._positions(self.operators, operator, "operator")[0]
+        return self.values[o]
+
+    def to_frame(self, dropna: bool = True) -> pd.DataFrame:
+        """
+        Return the cube as rows of REG_ANS, CD_CONTA_CONTABIL, quarter and
+        the balance column.
+
+        Args:
+            dropna: Whether to leave out the empty cells.
+        """
+        index = pd.MultiIndex.from_product(
+            [self.operators, self.accounts, self.quarters]
+        )
+        df = pd.DataFrame(
+            {self.column: self.values.reshape(-1)}, index=index
+        ).reset_index()
+        return df.dropna(subset=[self.column]) if dropna else df
+
+
+def quarter_sort_key(quarter: str) -> List[str]:
+    """Sort key of quarters in the "1T2024" format, oldest first."""
+    return quarter.split("T")[::-1]
@@ -5,14 +5,36 @@ from the Brazilian National Health Agency (ANS). It provides two statements:
 Balance sheets and income statements.
 """
 
-from typing import List, Optional, Union
+import os
+from typing import IO, Iterator, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from ans_wrapper.utils import DownloadError, download_and_extract_csv
-
-# Base URL for ANS open data portal
-BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/"
+from ans_wrapper.backends import (
+    check_backend,
+    concat_tables,
+    read_table,
+    to_backend,
+)
+from ans_wrapper.cache import get_cache, load_json, save_json
+from ans_wrapper.catalog import get_catalog
+from ans_wrapper.cube import quarter_sort_key
+from ans_wrapper.instrumentation import log, timed
+from ans_wrapper.locks import atomic_write
+from ans_wrapper.sampling import Sampler
+from ans_wrapper.schemas import DEMONSTRACOES_CONTABEIS_SCHEMA, Schema
+from ans_wrapper.utils import (
+    BASE_URL,
+    DEFAULT_MAX_WORKERS,
+    LISTING_TTL,
+    download_many,
+    iter_downloads,
+    open_csv,
+    remote_info_many,
+    resolve_engine,
+    run_parallel,
+)
 
 # Example URL format:
 # "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2021/4T2021.zip"
@@ -28,12 +50,37 @@ class DemonstracoesContabeis:
     ENDPOINT: str = "demonstracoes_contabeis/"
     DEM_CONTABEIS_ENDPOINT: str = BASE_URL + ENDPOINT
     FILENAME: str = "{quarter}T{year}.zip"
+    STORE_NAME: str = "demonstracoes_contabeis"
+    INDEX_COLUMN: str = "REG_ANS"
+    # Small row groups keep the reads of a single operator small
+    ROW_GROUP_SIZE: int = 16_384
+
+    def __init__(self, offline: bool = False):
+        """
+        Args:
+            offline: Use the cached files as they are, without revalidating
+                them with the server.
+        """
+        self.offline = offline
 
     def get_info(
         self,
         quarters: Union[str, List[str]],
         company: Optional[Union[str, int, List[Union[str, int]]]] = None,
-    ) -> pd.DataFrame:
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        extract: bool = True,
+        chunk_size: int = 100_000,
+        compact: bool = False,
+        parse_workers: int = 1,
+        engine: str = "c",
+        pipelined: bool = False,
+        backend: str = "pandas",
+        concat: bool = True,
+        sample_size: Optional[int] = None,
+        sample_frac: Optional[float] = None,
+        seed: Optional[int] = None,
+        stratify: Optional[str] = None,
+    ):
         """
         Download and filter financial data for specified companies and quarters.
 
@@ -46,15 +93,60 @@ class DemonstracoesContabeis:
                      string or a list of strings.
             company: ANS code(s) to filter by. Can be a single code (str/int) or a
                     list of codes. If None, returns the full dataset.
+            max_workers: Maximum number of quarters downloaded at the same time.
+            extract: Whether to extract the CSV files to the disk. If False,
+                    they are parsed straight out of the ZIP archives.
+            chunk_size: Number of rows read at once when filtering by company.
+            compact: Whether to parse the columns into compact types
+                    (categoricals, small integers and decimal-aware floats).
+                    See `ans_wrapper.schemas.memory_report` for the savings.
+            parse_workers: Number of processes parsing the quarters' files in
+                    parallel. 1 parses them one after another.
+            engine: `pd.read_csv` engine: "c", "pyarrow" or "auto" (pyarrow
+                    when installed). Falls back to "c" when filtering by
+                    company (chunked read) or with `compact=True`.
+            pipelined: Whether to parse each quarter while it is still
+                    downloading (see `ans_wrapper.pipeline`). `extract` and
+                    `parse_workers` are then ignored.
+            backend: Type of the result: "pandas", "arrow" (`pyarrow.Table`)
+                    or "polars". With "arrow" and "polars" the files are
+                    parsed by pyarrow, with the balances as floats, and the
+                    quarters are concatenated without copying (see
+                    `ans_wrapper.backends`). `engine` is then ignored.
+            concat: Whether to return one result for all the quarters. If
+                    False, a list with the result of each quarter read is
+                    returned instead, in the order of `quarters`. Ignored
+                    when sampling.
+            sample_size: Return only a random sample of this many rows (of the
+                    requested companies), or this many rows per quarter with
+                    `stratify="quarter"`. The files are streamed chunk by
+                    chunk and only the sampled rows are kept in memory (see
+                    `ans_wrapper.sampling`). Requires the pandas backend;
+                    `extract`, `parse_workers`, `engine` and `pipelined` are
+                    then ignored.
+            sample_frac: Return each row with this probability, instead of
+                    `sample_size`.
+            seed: Seed of the sample. The same seed gives the same sample.
+            stratify: "quarter" to sample `sample_size` rows per quarter.
 
         Returns:
-            pd.DataFrame: Filtered financial data with columns including REG_ANS
+            Filtered financial data with columns including REG_ANS, as a
+                `pd.DataFrame` or the type of `backend` (a list of them, one
+                per quarter, with `concat=False`).
 
         Raises:
             ValueError: If quarter format is invalid, no data could be downloaded,
                        REG_ANS column is missing, or company codes are not found
+            DownloadError: If any of the quarters could not be downloaded
             Exception: If CSV reading or processing fails
         """
+        check_backend(backend)
+        sampling = sample_size is not None or sample_frac is not None
+        if sampling and backend != "pandas":
+            raise ValueError("sampling requires the pandas backend")
+        if stratify not in (None, "quarter"):
+            raise ValueError('`stratify` must be "quarter"')
+
         # Parse quarters parameter to ensure it's a list
         if isinstance(quarters, str):
             quarters_list = [quarters]
@@ -70,76 +162,798 @@ class DemonstracoesContabeis:
                 # Convert all elements to integers
                 company_list = [int(c) for c in company]
 
-        # Download CSV files for each quarter
-        csv_paths = []
-        for quarter in quarters_list:
-            # Extract year and quarter number from format like "1T2024"
-            if "T" not in quarter:
-                raise ValueError(
-                    f"Invalid quarter format: {quarter}."
-                    f"Expected format: '1T2024'"
-                )
+        # Build the URL of each quarter
+        request_urls = self.urls(quarters_list)
 
-            quarter_num, year = quarter.split("T")
-            filename = self.FILENAME.format(quarter=quarter_num, year=year)
-            request_url = (
-                self.DEM_CONTABEIS_ENDPOINT + str(year) + "/" + filename
+        # Load and combine all CSV files. When filtering by company, only the
+        # matching rows of each chunk are kept, so memory use depends on the
+        # size of the result, not on the size of the files
+        schema = DEMONSTRACOES_CONTABEIS_SCHEMA if compact else None
+
+        if sampling:
+            return self._sample(
+                request_urls,
+                quarters_list,
+                Sampler(sample_size, sample_frac, seed),
+                stratify,
+                company_list,
+                chunk_size,
+                schema,
+                max_workers,
             )
 
-            try:
-                csv_path = download_and_extract_csv(request_url)
-                csv_paths.append(csv_path)
-            except Exception as e:
-                raise DownloadError(
-                    f"Failed to download data for {quarter}: {e}"
-                )
+        if backend == "pandas":
+            read_csv, read_stream = self._read_csv, self._read_stream
+            read_args = (company_list, chunk_size, schema, engine)
+        else:
+            # pyarrow reads paths and streams alike
+            read_csv = read_stream = read_table
+            read_args = (
+                None,
+                self._arrow_types(compact),
+                ",",
+                {"REG_ANS": company_list} if company_list else None,
+            )
 
-        if not csv_paths:
-            raise ValueError(
-                "No data could be downloaded for the specified quarters"
+        if pipelined:
+            from ans_wrapper.pipeline import iter_pipeline
+
+            def _parse(csv_stream):
+                yield read_stream(csv_stream, *read_args)
+
+            # the parse time includes the downloads it overlaps with
+            with timed("parse", f"{len(request_urls)} files") as event:
+                try:
+                    dataframes = [
+                        df
+                        for _, df in iter_pipeline(
+                            request_urls,
+                            _parse,
+                            max_workers=max_workers,
+                            revalidate=not self.offline,
+                        )
+                    ]
+                except KeyError as e:
+                    raise ValueError(
+                        "REG_ANS column not found in the dataset"
+                    ) from e
+                event["rows"] = sum(len(df) for df in dataframes)
+
+            return self._combine(
+                dataframes, company_list, schema, backend, concat
             )
 
-        # Load and combine all CSV files
-        dataframes = []
-        for csv_path in csv_paths:
-            try:
-                # Use semicolon separator and handle quoted values
-                df = pd.read_csv(csv_path, sep=";", quotechar='"')
-                dataframes.append(df)
-            except Exception as e:
-                print(f"Failed to read CSV file {csv_path}: {e}")
-                continue
+        with get_cache().pinned(request_urls):
+            # Download CSV files for every quarter at once
+            csv_paths = download_many(
+                request_urls,
+                max_workers=max_workers,
+                extract=extract,
+                revalidate=not self.offline,
+            )
 
-        if not dataframes:
-            raise ValueError("No CSV files could be successfully read")
+            if not csv_paths:
+                raise ValueError(
+                    "No data could be downloaded for the specified quarters"
+                )
+
+            with timed("parse", f"{len(csv_paths)} files") as event:
+                futures = run_parallel(
+                    read_csv,
+                    [(csv_path, *read_args) for csv_path in csv_paths],
+                    max_workers=parse_workers,
+                )
 
-        # Combine all dataframes
-        combined_df = pd.concat(dataframes, ignore_index=True)
+                dataframes = []
+                for csv_path, future in zip(csv_paths, futures):
+                    try:
+                        df = future.result()
+                        dataframes.append(df)
+                    except KeyError as e:
+                        raise ValueError(
+                            "REG_ANS column not found in the dataset"
+                        ) from e
+                    except Exception as e:
+                        log(f"Failed to read CSV file {csv_path}: {e}")
+                        continue
+
+                event["rows"] = sum(len(df) for df in dataframes)
+
+        return self._combine(dataframes, company_list, schema, backend, concat)
+
+    def _sample(
+        self,
+        request_urls: List[str],
+        quarters: List[str],
+        sampler: Sampler,
+        stratify: Optional[str],
+        company_list: Optional[List[int]],
+        chunk_size: int,
+        schema: Optional[Schema],
+        max_workers: int,
+    ) -> pd.DataFrame:
+        """Sample the rows of the quarters while streaming their files."""
+        zip_paths = iter_downloads(
+            request_urls,
+            max_workers=max_workers,
+            extract=False,
+            revalidate=not self.offline,
+        )
+
+        # the companies are checked against every row, not only the sample
+        codes = set()
+        with (
+            get_cache().pinned(request_urls),
+            timed("parse", f"{len(request_urls)} files") as event,
+        ):
+            for quarter, zip_path in zip(quarters, zip_paths):
+                with open_csv(zip_path) as csv_stream:
+                    try:
+                        for chunk in self._iter_stream(
+                            csv_stream, company_list, chunk_size, schema
+                        ):
+                            if company_list is not None:
+                                codes.update(chunk["REG_ANS"].unique().tolist())
+                            sampler.add(chunk, quarter if stratify else None)
+                    except KeyError as e:
+                        raise ValueError(
+                            "REG_ANS column not found in the dataset"
+                        ) from e
+
+            df = sampler.result()
+            event["rows"] = len(df)
 
-        # Filter by company codes if specified
         if company_list is not None:
-            if "REG_ANS" not in combined_df.columns:
-                raise ValueError("REG_ANS column not found in the dataset")
+            missing_codes = [code for code in company_list if code not in codes]
+            if missing_codes:
+                raise ValueError(
+                    f"Company code(s) not found in dataset: {missing_codes}"
+                )
+
+        # categories differ from chunk to chunk, so they are set again
+        return schema.apply(df) if schema is not None else df
+
+    def _combine(
+        self,
+        dataframes: list,
+        company_list: Optional[List[int]],
+        schema: Optional[Schema],
+        backend: str = "pandas",
+        concat: bool = True,
+    ):
+        """Concatenate the quarters and check the requested companies."""
+        if not dataframes:
+            raise ValueError("No CSV files could be successfully read")
 
-            # NOTE: IDK, I'm adding this just in case REG_ANS is not an integer
-            combined_df["REG_ANS"] = combined_df["REG_ANS"].astype(int)
+        # Combine all dataframes (or tables, without copying them)
+        if not concat:
+            parts = dataframes
+        elif backend == "pandas":
+            parts = [pd.concat(dataframes, ignore_index=True)]
+        else:
+            parts = [concat_tables(dataframes)]
 
-            # Check if all the company codes the user wants are in the dataset
-            available_codes = combined_df["REG_ANS"].unique()
-            missing_codes = [
-                code for code in company_list if code not in available_codes
-            ]
+        if backend == "pandas" and schema is not None:
+            parts = [schema.apply(df) for df in parts]
+
+        # Check if all the company codes the user wants are in the dataset.
+        # The rows themselves were filtered while parsing, so the time spent
+        # on it is part of the parse event.
+        if company_list is not None:
+            with timed("filter", "REG_ANS") as event:
+                available_codes = set()
+                for part in parts:
+                    codes = part["REG_ANS"].unique()
+                    available_codes.update(
+                        codes.tolist()
+                        if backend == "pandas"
+                        else codes.to_pylist()
+                    )
+                missing_codes = [
+                    code for code in company_list if code not in available_codes
+                ]
+                event["rows"] = sum(len(part) for part in parts)
 
             if missing_codes:
                 raise ValueError(
                     f"Company code(s) not found in dataset: {missing_codes}"
                 )
 
-            filtered_df = combined_df[combined_df["REG_ANS"].isin(company_list)]
+            if event["rows"] == 0:
+                log(f"Warning: No data found for companies {company_list}")
+
+        if backend != "pandas":
+            parts = [to_backend(part, backend) for part in parts]
+        return parts[0] if concat else parts
 
-            if filtered_df.empty:
-                print(f"Warning: No data found for companies {company_list}")
+    @staticmethod
+    def _arrow_types(compact: bool = False) -> dict:
+        """Return the pyarrow types of the columns parsed by pyarrow."""
+        import pyarrow as pa
+
+        if compact:
+            return DEMONSTRACOES_CONTABEIS_SCHEMA.arrow_types()
+        return {
+            "REG_ANS": pa.int64(),
+            # account codes are hierarchical prefixes, not numbers
+            "CD_CONTA_CONTABIL": pa.string(),
+        }
+
+    # Numeric cube ----------
+
+    def get_cube(
+        self,
+        quarters: Union[str, List[str]],
+        company: Optional[Union[str, int, List[Union[str, int]]]] = None,
+        accounts: Optional[List[str]] = None,
+        column: str = "VL_SALDO_FINAL",
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        extract: bool = True,
+        chunk_size: int = 100_000,
+        parse_workers: int = 1,
+        dtype=np.float64,
+    ):
+        """
+        Return a balance column as an operator × account × quarter array.
+
+        The Brazilian-formatted values ("1.234,56") are converted by the CSV
+        parser itself, and the cube is filled with a single vectorized
+        scatter, so no per-row conversion or pivot is needed. The cube uses
+        `operators × accounts × quarters × 8` bytes (4 with float32).
+
+        Args:
+            quarters: Quarter(s) in format "1T2024".
+            company: ANS code(s) to keep. If None, every operator is kept.
+            accounts: CD_CONTA_CONTABIL codes to keep. If None, every account
+                is kept.
+            column: Balance column: "VL_SALDO_FINAL" or "VL_SALDO_INICIAL".
+            max_workers: Maximum number of quarters downloaded at the same time.
+            extract: Whether to extract the CSV files to the disk.
+            chunk_size: Number of rows read at once when filtering by company.
+            parse_workers: Number of processes parsing the quarters' files.
+            dtype: Type of the array. float32 halves its memory.
+
+        Returns:
+            AccountCube: The values, with the REG_ANS, CD_CONTA_CONTABIL and
+                quarter labels of every axis (see `ans_wrapper.cube`).
+        """
+        from ans_wrapper.cube import AccountCube
+
+        if isinstance(quarters, str):
+            quarters = [quarters]
+        quarters = sorted(quarters, key=quarter_sort_key)
+
+        company_list = None
+        if company is not None:
+            if isinstance(company, (str, int)):
+                company = [company]
+            company_list = [int(c) for c in company]
+
+        urls = self.urls(quarters)
+        with get_cache().pinned(urls):
+            csv_paths = download_many(
+                urls,
+                max_workers=max_workers,
+                extract=extract,
+                revalidate=not self.offline,
+            )
+
+            usecols = ["REG_ANS", "CD_CONTA_CONTABIL", column]
+            with timed("parse", f"{len(csv_paths)} files") as event:
+                futures = run_parallel(
+                    self._read_csv,
+                    [
+                        (
+                            csv_path,
+                            company_list,
+                            chunk_size,
+                            DEMONSTRACOES_CONTABEIS_SCHEMA,
+                            "c",
+                            usecols,
+                        )
+                        for csv_path in csv_paths
+                    ],
+                    max_workers=parse_workers,
+                )
+
+                frames = []
+                for quarter, future in zip(quarters, futures):
+                    df = future.result()
+                    if accounts is not None:
+                        codes = df["CD_CONTA_CONTABIL"].astype(str)
+                        df = df[codes.isin([str(a) for a in accounts])]
+                    frames.append(df.assign(quarter=quarter))
+
+                event["rows"] = sum(len(df) for df in frames)
+
+        return AccountCube.from_frame(
+            pd.concat(frames, ignore_index=True),
+            column=column,
+            quarters=quarters,
+            dtype=dtype,
+        )
+
+    # Chart of accounts ----------
+
+    def get_account_tree(self, quarter: str):
+        """
+        Return the chart of accounts of a quarter, as an `AccountTree`.
+
+        The tree is built once from the quarter's file and cached next to the
+        downloaded data. It is rebuilt if the file is republished.
+        """
+        url = self.urls([quarter])[0]
+        with get_cache().pinned([url]):
+            zip_path = download_many(
+                [url], extract=False, revalidate=not self.offline
+            )[0]
+            return self._load_quarter(quarter, url, zip_path)[0]
+
+    def rollup(
+        self,
+        quarters: Union[str, List[str]],
+        level: int,
+        company: Optional[Union[str, int, List[Union[str, int]]]] = None,
+        column: str = "VL_SALDO_FINAL",
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        use_cache: bool = True,
+    ):
+        """
+        Roll the leaf accounts of every operator up to a level of the chart.
+
+        Each quarter is rolled up for all operators at once, with vectorized
+        segment sums over its account tree (see `ans_wrapper.accounts`). The
+        result of every quarter and level is cached next to the downloaded
+        data, so later rollups don't read the file again.
+
+        Args:
+            quarters: Quarter(s) in format "1T2024".
+            level: Level of the chart to roll up to (1 is the top, e.g.
+                "1" Ativo; 2 is "11", "12", ...).
+            company: ANS code(s) to keep. If None, every operator is kept.
+            column: Balance column: "VL_SALDO_FINAL" or "VL_SALDO_INICIAL".
+            max_workers: Maximum number of quarters downloaded at the same time.
+            use_cache: Whether to use and store cached rollups.
+
+        Returns:
+            AccountCube: Operator × account × quarter totals, with the accounts
+                of `level` (see `ans_wrapper.cube`).
+
+        Raises:
+            ValueError: If company codes are not found in the data.
+        """
+        from ans_wrapper.cube import AccountCube
+
+        if isinstance(quarters, str):
+            quarters = [quarters]
+        quarters = sorted(quarters, key=quarter_sort_key)
+
+        urls = self.urls(quarters)
+        with get_cache().pinned(urls):
+            zip_paths = download_many(
+                urls,
+                max_workers=max_workers,
+                extract=False,
+                revalidate=not self.offline,
+            )
+
+            cubes = []
+            for quarter, url, zip_path in zip(quarters, urls, zip_paths):
+                source = self._source(url)
+                path = os.path.join(
+                    self._accounts_dir(quarter), f"rollup-{column}-{level}.npz"
+                )
+
+                cube = self._load_rollup(path, source) if use_cache else None
+                if cube is None:
+                    tree, full = self._load_quarter(
+                        quarter, url, zip_path, column
+                    )
+                    accounts, totals = tree.rollup(
+                        full.values, full.accounts, level=level
+                    )
+                    cube = AccountCube(
+                        totals, full.operators, accounts, [quarter], column
+                    )
+                    if use_cache:
+                        self._save_rollup(path, cube, source)
+
+                cubes.append(cube)
+
+        cube = AccountCube.concat(cubes)
+
+        if company is not None:
+            if isinstance(company, (str, int)):
+                company = [company]
+            company_list = [int(c) for c in company]
+            missing = [c for c in company_list if c not in cube.operators]
+            if missing:
+                raise ValueError(
+                    f"Company code(s) not found in dataset: {missing}"
+                )
+            cube = cube.sel(operators=company_list)
+
+        return cube
+
+    def _load_quarter(
+        self,
+        quarter: str,
+        url: str,
+        zip_path: str,
+        column: Optional[str] = None,
+    ):
+        """
+        Return the account tree of a quarter, and its cube of `column` if
+        given. The tree is cached as JSON next to the downloaded data.
+        """
+        from ans_wrapper.accounts import AccountTree
+        from ans_wrapper.cube import AccountCube
+
+        source = self._source(url)
+        tree_path = os.path.join(self._accounts_dir(quarter), "tree.json")
+        saved = load_json(tree_path)
+        tree = None
+        if saved and saved.get("source") == source:
+            tree = AccountTree.from_dict(saved)
+            if column is None:
+                return tree, None
+
+        usecols = ["REG_ANS", "CD_CONTA_CONTABIL", "DESCRICAO"]
+        df = self._read_csv(
+            zip_path,
+            schema=DEMONSTRACOES_CONTABEIS_SCHEMA,
+            usecols=usecols + ([column] if column else []),
+        )
+
+        if tree is None:
+            names = df.drop_duplicates("CD_CONTA_CONTABIL")
+            tree = AccountTree(
+                names["CD_CONTA_CONTABIL"].astype(str),
+                names=dict(
+                    zip(
+                        names["CD_CONTA_CONTABIL"].astype(str),
+                        names["DESCRICAO"].astype(str),
+                    )
+                ),
+            )
+            save_json(tree_path, {**tree.to_dict(), "source": source})
+
+        cube = None
+        if column is not None:
+            cube = AccountCube.from_frame(
+                df.assign(quarter=quarter), column=column, quarters=[quarter]
+            )
+        return tree, cube
+
+    def _accounts_dir(self, quarter: str) -> str:
+        """Folder of the cached account trees and rollups of a quarter."""
+        return os.path.join(get_cache().cache_dir, "accounts", quarter)
+
+    @staticmethod
+    def _source(url: str) -> Optional[str]:
+        """Identify the cached copy of a file, to invalidate derived data."""
+        entry = get_cache().get(url) or {}
+        return entry.get("sha256") or entry.get("etag")
+
+    @staticmethod
+    def _load_rollup(path: str, source: Optional[str]):
+        """Load a cached rollup, unless it was built from another file."""
+        from ans_wrapper.cube import AccountCube
+
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path, allow_pickle=False) as saved:
+            if source is None or str(saved["source"]) != source:
+                return None
+            return AccountCube(
+                saved["values"],
+                saved["operators"],
+                saved["accounts"].astype(str).tolist(),
+                saved["quarters"].astype(str).tolist(),
+                str(saved["column"]),
+            )
+
+    @staticmethod
+    def _save_rollup(path: str, cube, source: Optional[str]):
+        """Save a rollup atomically, with the file it was built from."""
+        with atomic_write(path, "wb") as f:
+            np.savez(
+                f,
+                values=cube.values,
+                operators=np.asarray(cube.operators, dtype=np.int64),
+                accounts=np.asarray(cube.accounts, dtype=str),
+                quarters=np.asarray(cube.quarters, dtype=str),
+                column=np.asarray(cube.column),
+                source=np.asarray(source or ""),
+            )
+
+    # Per-operator index ----------
+
+    def get_store(self):
+        """
+        Return the local Parquet store of the quarters, one partition per
+        quarter, sorted by REG_ANS.
+
+        Requires `pyarrow` (`pip install ans-wrapper[parquet]`).
+        """
+        from ans_wrapper.store import ParquetStore
+
+        return ParquetStore(self.STORE_NAME, ("quarter",))
+
+    def get_index(self):
+        """Return the REG_ANS index of the local Parquet store."""
+        from ans_wrapper.index import RowGroupIndex
+
+        return RowGroupIndex(self.get_store(), self.INDEX_COLUMN)
+
+    def update_index(
+        self,
+        quarters: Union[str, List[str]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[str]:
+        """
+        Add the missing quarters to the local store and to its REG_ANS index.
+
+        The store keeps a manifest with the ETag, date and size of the file
+        of every quarter it holds. Quarters already in the store are only
+        downloaded, converted and indexed again if the server republished
+        them (checked with a HEAD request, unless offline).
+
+        Args:
+            quarters: Quarter(s) in format "1T2024".
+            max_workers: Maximum number of quarters downloaded at the same time.
+
+        Returns:
+            List[str]: The requested quarters.
+        """
+        if isinstance(quarters, str):
+            quarters = [quarters]
+
+        store = self.get_store()
+        index = self.get_index()
+
+        outdated = [q for q in quarters if not store.has(quarter=q)]
+        if not self.offline:
+            # quarters republished since they were stored are replaced
+            stored = [q for q in quarters if q not in outdated]
+            remote = remote_info_many(
+                self.urls(stored), max_workers=max_workers
+            )
+            for quarter, info in zip(stored, remote):
+                recorded = store.recorded(quarter=quarter) or {}
+                if info is not None and any(
+                    recorded.get(field) != info[field]
+                    for field in ("etag", "last_modified", "size")
+                ):
+                    outdated.append(quarter)
+
+        if outdated:
+            urls = self.urls(outdated)
+            cache = get_cache()
+            with cache.pinned(urls):
+                zip_paths = download_many(
+                    urls,
+                    max_workers=max_workers,
+                    extract=False,
+                    revalidate=not self.offline,
+                )
+
+                for quarter, url, zip_path in zip(outdated, urls, zip_paths):
+                    store.write(
+                        zip_path,
+                        column_types=self._arrow_types(),
+                        sort_by=self.INDEX_COLUMN,
+                        row_group_size=self.ROW_GROUP_SIZE,
+                        decimal_point=",",
+                        quarter=quarter,
+                    )
+
+                    entry = cache.get(url) or {}
+                    store.record(
+                        {
+                            "url": url,
+                            "etag": entry.get("etag"),
+                            "last_modified": entry.get("last_modified"),
+                            "size": entry.get("size"),
+                        },
+                        quarter=quarter,
+                    )
+
+        indexed = {p["quarter"] for p in index.indexed()}
+        new = [q for q in quarters if q in outdated or q not in indexed]
+        if new:
+            index.add([{"quarter": quarter} for quarter in new])
+
+        return quarters
+
+    def history(
+        self,
+        company: Union[str, int],
+        quarters: Optional[Union[str, List[str]]] = None,
+        columns: Optional[List[str]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> pd.DataFrame:
+        """
+        Return the financial history of one operator from the local index.
+
+        Only the row groups holding the operator are read, so once the
+        quarters are local a lookup takes milliseconds.
+
+        Args:
+            company: ANS code of the operator.
+            quarters: Quarter(s) in format "1T2024". Missing quarters are
+                downloaded and indexed first. If None, every indexed quarter
+                is used.
+            columns: Columns to read. If None, all columns are read.
+            max_workers: Maximum number of quarters downloaded at the same time.
+
+        Returns:
+            pd.DataFrame: The rows of the operator, oldest quarter first.
+
+        Raises:
+            ValueError: If the operator is in none of the quarters.
+        """
+        company = int(company)
+        index = self.get_index()
+
+        if quarters is not None:
+            quarters = self.update_index(quarters, max_workers=max_workers)
+        else:
+            quarters = [p["quarter"] for p in index.indexed()]
+
+        quarters = sorted(quarters, key=quarter_sort_key)
+
+        df = index.read(
+            company,
+            partitions=[{"quarter": quarter} for quarter in quarters],
+            columns=columns,
+        )
+        if df.empty:
+            raise ValueError(f"Company code not found in the index: {company}")
+
+        return df
+
+    def _quarter_url(self, quarter: str) -> str:
+        """Return the URL of a quarter's ZIP file, e.g. for "1T2024"."""
+        # Extract year and quarter number from format like "1T2024"
+        if "T" not in quarter:
+            raise ValueError(
+                f"Invalid quarter format: {quarter}.Expected format: '1T2024'"
+            )
+
+        quarter_num, year = quarter.split("T")
+        filename = self.FILENAME.format(quarter=quarter_num, year=year)
+        return self.DEM_CONTABEIS_ENDPOINT + str(year) + "/" + filename
+
+    def urls(self, quarters: List[str]) -> List[str]:
+        """
+        Resolve the URLs of quarters' ZIP files from the catalog of the server.
+
+        Args:
+            quarters: Quarters in the "1T2024" format.
+
+        Returns:
+            List[str]: The URL of each quarter, in the same order.
+
+        Raises:
+            ValueError: If a quarter is malformed or isn't published.
+        """
+        expected = [self._quarter_url(quarter) for quarter in quarters]
+        resolved = get_catalog().resolve(
+            expected, max_age=LISTING_TTL, offline=self.offline
+        )
+
+        missing = [q for q, url in zip(quarters, resolved) if url is None]
+        if missing:
+            raise ValueError(f"Quarter(s) not published by ANS: {missing}")
+
+        return resolved
+
+    @staticmethod
+    def _read_csv(
+        csv_path: str,
+        company_list: Optional[List[int]] = None,
+        chunk_size: int = 100_000,
+        schema: Optional[Schema] = None,
+        engine: str = "c",
+        usecols: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read a quarter's CSV, keeping only the rows of `company_list`.
+
+        Raises:
+            KeyError: If filtering by company and REG_ANS column is missing
+        """
+        with open_csv(csv_path) as csv_stream:
+            return DemonstracoesContabeis._read_stream(
+                csv_stream, company_list, chunk_size, schema, engine, usecols
+            )
+
+    @staticmethod
+    def _read_stream(
+        csv_stream: IO[bytes],
+        company_list: Optional[List[int]] = None,
+        chunk_size: int = 100_000,
+        schema: Optional[Schema] = None,
+        engine: str = "c",
+        usecols: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Read an open quarter's CSV stream, see `_read_csv`."""
+        schema_kwargs = schema.read_csv_kwargs() if schema else {}
+
+        # Use semicolon separator and handle quoted values
+        if company_list is None:
+            try:
+                return pd.read_csv(
+                    csv_stream,
+                    sep=";",
+                    quotechar='"',
+                    engine=resolve_engine(engine, schema_kwargs),
+                    usecols=usecols,
+                    **schema_kwargs,
+                )
+            except pd.errors.EmptyDataError:
+                return DemonstracoesContabeis._empty_frame(schema, usecols)
+
+        matches = list(
+            DemonstracoesContabeis._iter_stream(
+                csv_stream, company_list, chunk_size, schema, usecols
+            )
+        )
+        if not matches:
+            return DemonstracoesContabeis._empty_frame(schema, usecols)
+        return pd.concat(matches, ignore_index=True)
+
+    @staticmethod
+    def _empty_frame(
+        schema: Optional[Schema] = None,
+        usecols: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Return the rows of an empty quarter's CSV: none, with the columns."""
+        columns = usecols or list(DEMONSTRACOES_CONTABEIS_SCHEMA.dtypes)
+        df = pd.DataFrame(columns=columns)
+        return schema.apply(df) if schema is not None else df
+
+    @staticmethod
+    def _iter_stream(
+        csv_stream: IO[bytes],
+        company_list: Optional[List[int]] = None,
+        chunk_size: int = 100_000,
+        schema: Optional[Schema] = None,
+        usecols: Optional[List[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read an open quarter's CSV stream in chunks, keeping only the rows of
+        `company_list` (or every row if None).
+
+        Raises:
+            KeyError: If filtering by company and REG_ANS column is missing
+        """
+        schema_kwargs = schema.read_csv_kwargs() if schema else {}
+
+        try:
+            chunks = pd.read_csv(
+                csv_stream,
+                sep=";",
+                quotechar='"',
+                chunksize=chunk_size,
+                usecols=usecols,
+                **schema_kwargs,
+            )
+        except pd.errors.EmptyDataError:
+            # an empty file has no rows, nor even a header
+            return
+
+        for chunk in chunks:
+            if company_list is None:
+                yield chunk
+                continue
 
-            return filtered_df
+            if "REG_ANS" not in chunk.columns:
+                raise KeyError("REG_ANS")
 
-        return combined_df
+            # NOTE: IDK, I'm adding this just in case REG_ANS is not an
+            # integer
+            chunk["REG_ANS"] = chunk["REG_ANS"].astype(int)
+            yield chunk[chunk["REG_ANS"].isin(company_list)]
@@ -0,0 +1,188 @@
+"""
+Index of where each value of a column lives in a Parquet store.
+
+The partitions of the store are sorted by the indexed column (see
+`ParquetStore.write(sort_by=...)`), so all the rows of a value sit in a few
+consecutive row groups. The index records, for every value, which row groups
+of which partition hold it. Looking a value up then reads only those row
+groups, instead of scanning every partition.
+
+The index is a JSON file stored next to the partitions. Partitions are added
+to it one at a time, so new data only costs indexing the new partitions.
+
+Requires `pyarrow` (`pip install ans-wrapper[parquet]`).
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ans_wrapper.cache import load_json, save_json
+from ans_wrapper.locks import FileLock
+from ans_wrapper.store import ParquetStore
+
+INDEX_FILENAME = "index-{column}.json"
+
+
+class RowGroupIndex:
+    """Maps each value of a column to the row groups holding its rows.
+
+    Args:
+        store: Store whose partitions are indexed. They must be sorted by
+            `column`.
+        column: Name of the indexed column.
+    """
+
+    def __init__(self, store: ParquetStore, column: str):
+        self.store = store
+        self.column = column
+        self.path = os.path.join(
+            store.root, INDEX_FILENAME.format(column=column)
+        )
+
+        # the index is loaded once and reloaded only when the file changes
+        self._loaded = None
+        self._loaded_mtime = None
+
+    def load(self) -> dict:
+        """
+        Return the index, as saved on disk.
+
+        It holds `partitions`, the list of indexed partition folders, and
+        `values`, a mapping of every value to `{partition: [first, last]}`
+        row group ranges.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {"partitions": [], "values": {}}
+
+        if mtime != self._loaded_mtime:
+            index = load_json(self.path)
+            index.setdefault("partitions", [])
+            index.setdefault("values", {})
+            self._loaded, self._loaded_mtime = index, mtime
+
+        return self._loaded
+
+    def indexed(self) -> List[Dict[str, str]]:
+        """List the partitions already in the index."""
+        return [
+            self.store.parse_partition_key(key)
+            for key in self.load()["partitions"]
+        ]
+
+    def add(self, partitions: Sequence[Dict[str, str]]):
+        """
+        Add partitions of the store to the index.
+
+        Partitions already indexed are indexed again, in case their data was
+        replaced.
+
+        Raises:
+            ValueError: If a partition is not sorted by the indexed column.
+        """
+        import pyarrow.parquet as pq
+
+        # other processes may add their partitions at the same time
+        with FileLock(self.path + ".lock"):
+            index = self.load()
+            values = index["values"]
+
+            for partition in partitions:
+                key = self.store.partition_key(**partition)
+                path = self.store.partition_path(**partition)
+                parquet_file = pq.ParquetFile(path)
+
+                # nulls are sorted last, so dropping them keeps row numbers
+                column = parquet_file.read(columns=[self.column]).column(0)
+                keys = column.drop_null().to_numpy()
+                if len(keys) and np.any(keys[:-1] > keys[1:]):
+                    raise ValueError(
+                        f"partition {key} is not sorted by {self.column}"
+                    )
+
+                # last row (exclusive) of every row group
+                ends = np.cumsum(
+                    [
+                        parquet_file.metadata.row_group(i).num_rows
+                        for i in range(parquet_file.num_row_groups)
+                    ]
+                )
+                unique, starts, counts = np.unique(
+                    keys, return_index=True, return_counts=True
+                )
+                first = np.searchsorted(ends, starts, side="right")
+                last = np.searchsorted(ends, starts + counts - 1, side="right")
+
+                for partitions_of_value in values.values():
+                    partitions_of_value.pop(key, None)
+                for value, a, b in zip(unique.tolist(), first, last):
+                    values.setdefault(str(value), {})[key] = [int(a), int(b)]
+
+                if key not in index["partitions"]:
+                    index["partitions"].append(key)
+
+            save_json(self.path, index)
+            self._loaded = index
+            self._loaded_mtime = os.path.getmtime(self.path)
+
+    def lookup(self, value) -> Dict[str, List[int]]:
+        """Return the `[first, last]` row groups of a value per partition."""
+        return self.load()["values"].get(str(value), {})
+
+    def read(
+        self,
+        value,
+        partitions: Optional[Sequence[Dict[str, str]]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read the rows of a value, reading only the row groups that hold it.
+
+        Args:
+            value: Value of the indexed column.
+            partitions: Partitions to read from, in this order. Defaults to
+                every indexed partition holding the value.
+            columns: Columns to read. If None, all columns are read.
+
+        Returns:
+            pd.DataFrame: The rows of the value, empty if it is not indexed.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        found = self.lookup(value)
+        if partitions is None:
+            keys = list(found)
+        else:
+            keys = [self.store.partition_key(**p) for p in partitions]
+
+        read_columns = columns
+        if columns is not None and self.column not in columns:
+            read_columns = [*columns, self.column]
+
+        tables = []
+        for key in keys:
+            if key not in found:
+                continue
+
+            first, last = found[key]
+            path = self.store.partition_path(
+                **self.store.parse_partition_key(key)
+            )
+            table = pq.ParquetFile(path).read_row_groups(
+                range(first, last + 1), columns=read_columns
+            )
+            tables.append(table.filter(pc.equal(table[self.column], value)))
+
+        if not tables:
+            return pd.DataFrame(columns=columns)
+
+        table = pa.concat_tables(tables, promote_options="permissive")
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
@@ -0,0 +1,183 @@
+"""
+Instrumentation hooks for the download and processing stages.
+
+Every stage of the package reports an `Event` when it finishes: listing the
+server folders, downloading, extracting, parsing, concatenating and filtering.
+Subscribe a callback to receive them, or use `MetricsCollector` to get a
+summary of where the time went:
+
+    with MetricsCollector() as metrics:
+        dc.get_info(["1T2024", "2T2024"])
+    print(metrics.report())
+
+`set_quiet()` (or `$ANS_WRAPPER_QUIET=1`) turns off every message and progress
+bar the package writes to the terminal.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+STAGES = ("list", "download", "extract", "parse", "concat", "filter")
+
+
+class Event(NamedTuple):
+    """What a stage did, reported when it finishes.
+
+    Callbacks may be called from the download threads, so they must be
+    thread-safe.
+    """
+
+    stage: str
+    source: Optional[str] = None
+    seconds: float = 0.0
+    bytes: Optional[int] = None
+    rows: Optional[int] = None
+    cache_hit: Optional[bool] = None
+
+
+_subscribers: List[Callable[[Event], None]] = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(callback: Callable[[Event], None]) -> Callable[[Event], None]:
+    """Call `callback(event)` for every event. Returns the callback."""
+    with _subscribers_lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback: Callable[[Event], None]):
+    """Stop calling a subscribed callback."""
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def emit(stage: str, **fields):
+    """Send an event to every subscriber."""
+    if not _subscribers:
+        return
+
+    event = Event(stage, **fields)
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        callback(event)
+
+
+@contextmanager
+def timed(stage: str, source: Optional[str] = None) -> Iterator[dict]:
+    """
+    Time a block and emit its event when it ends without error.
+
+    The yielded dict can be filled with the other `Event` fields:
+
+        with timed("parse", path) as event:
+            df = pd.read_csv(path)
+            event["rows"] = len(df)
+    """
+    fields = {"source": source}
+    start = time.perf_counter()
+    yield fields
+    fields["seconds"] = time.perf_counter() - start
+    emit(stage, **fields)
+
+
+class MetricsCollector:
+    """Collects events and summarizes them per stage.
+
+    Use it as a context manager, or subscribe it yourself with `subscribe`.
+    """
+
+    def __init__(self):
+        self.events: List[Event] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event):
+        with self._lock:
+            self.events.append(event)
+
+    def __enter__(self):
+        subscribe(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        unsubscribe(self)
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Totals per stage: number of events, seconds, bytes, rows and cache
+        hits/misses.
+
+        Downloads run concurrently, so their seconds add up to more than the
+        wall time they took.
+        """
+        with self._lock:
+            events = list(self.events)
+
+        summary = {}
+        for event in events:
+            totals = summary.setdefault(
+                event.stage,
+                {
+                    "count": 0,
+                    "seconds": 0.0,
+                    "bytes": 0,
+                    "rows": 0,
+                    "cache_hits": 0,
+                    "cache_misses": 0,
+                },
+            )
+            totals["count"] += 1
+            totals["seconds"] += event.seconds
+            totals["bytes"] += event.bytes or 0
+            totals["rows"] += event.rows or 0
+            if event.cache_hit is True:
+                totals["cache_hits"] += 1
+            elif event.cache_hit is False:
+                totals["cache_misses"] += 1
+
+        return summary
+
+    def report(self) -> str:
+        """Return the summary as a text table."""
+        lines = [
+            (
+                f"{'stage':<10}{'count':>7}{'seconds':>10}{'MB':>10}"
+                f"{'rows':>12}{'hits':>6}{'misses':>8}"
+            )
+        ]
+        for stage, totals in self.summary().items():
+            lines.append(
+                f"{stage:<10}{totals['count']:>7}{totals['seconds']:>10.2f}"
+                f"{totals['bytes'] / 1024**2:>10.1f}{totals['rows']:>12}"
+                f"{totals['cache_hits']:>6}{totals['cache_misses']:>8}"
+            )
+        return "\n".join(lines)
+
+
+# Terminal output ----------
+
+QUIET_ENV = "ANS_WRAPPER_QUIET"
+
+_quiet = os.environ.get(QUIET_ENV, "") not in ("", "0")
+
+
+def set_quiet(quiet: bool = True):
+    """Turn off (or back on) every message and progress bar of the package."""
+    global _quiet
+    _quiet = quiet
+
+
+def is_quiet() -> bool:
+    """Whether terminal output is turned off."""
+    return _quiet
+
+
+def log(message: str):
+    """Print a message, unless quiet mode is on."""
+    if not _quiet:
+        print(message)
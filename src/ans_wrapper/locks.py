@@ -0,0 +1,161 @@
+"""
+File locks and atomic writes, to share the cache between processes.
+
+Several processes (or threads) may download, extract or convert the same file
+at the same moment. `FileLock` lets one of them do the work while the others
+wait and then reuse its result, and `atomic_path` / `atomic_write` make sure
+nobody ever sees a half-written file: files are written under a temporary
+name and renamed into place once complete.
+
+    with FileLock(path + ".lock"):
+        if not os.path.exists(path):
+            with atomic_write(path, "wb") as f:
+                f.write(data)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """An exclusive lock held on a file, across processes and threads.
+
+    The lock file is created if needed and left in place afterwards: removing
+    it while another process waits on it would let two processes hold the
+    lock at once. A `FileLock` is not reentrant.
+
+    Args:
+        path: Path of the lock file, e.g. `<file>.lock`.
+        timeout: How long to wait for the lock, in seconds. If None, waits
+            forever.
+        poll_interval: How often to try again when the lock is busy and
+            waiting can't block (with a timeout, or on Windows).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.05,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self):
+        """
+        Wait for the lock and take it.
+
+        Raises:
+            TimeoutError: If the lock is still busy after `timeout` seconds.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            if self.timeout is None and fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                deadline = (
+                    None
+                    if self.timeout is None
+                    else time.monotonic() + self.timeout
+                )
+                while not _try_lock(fd):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(
+                            f"Timed out waiting for the lock {self.path}"
+                        )
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+
+    def release(self):
+        """Release the lock."""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @property
+    def locked(self) -> bool:
+        """Whether this object holds the lock."""
+        return self._fd is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _try_lock(fd: int) -> bool:
+    """Try to lock a file without waiting. Return whether it worked."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            # `msvcrt.LK_LOCK` only waits for 10 seconds, so callers poll
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+# Atomic writes ----------
+
+
+def temp_path(path: str) -> str:
+    """Return a temporary path next to `path`, unique to this thread."""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Yield a temporary path to write `path` through.
+
+    The temporary file replaces `path` in a single step once the block
+    succeeds, and is deleted if it fails, so readers see either the old file
+    or the complete new one.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """Open `path` for writing through `atomic_path` (see `open`)."""
+    with atomic_path(path) as tmp_path, open(tmp_path, mode, **kwargs) as f:
+        yield f
@@ -0,0 +1,483 @@
+"""
+Streaming pipeline: download, decompress and parse at the same time.
+
+`stream_csv` opens the CSV inside a remote ZIP archive while it is still
+downloading: the archive's bytes are inflated and handed to the parser as they
+arrive, and written to the download cache on the way, so the next run finds
+the file locally.
+
+`iter_pipeline` runs `stream_csv` for several files at once in a pool of
+threads. Each file's parsed items go through a bounded queue, so a file that
+parses faster than it is consumed waits instead of filling the memory, and
+the items come out in the same order as the URLs.
+"""
+
+import hashlib
+import io
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from tqdm import tqdm
+
+from ans_wrapper.cache import DownloadCache, get_cache
+from ans_wrapper.instrumentation import emit, is_quiet
+from ans_wrapper.locks import FileLock
+from ans_wrapper.utils import (
+    DEFAULT_MAX_WORKERS,
+    DownloadError,
+    _chunk_size,
+    _expected_size,
+    _remove_part,
+    _SharedProgress,
+    get_session,
+    open_zipped_csv,
+)
+
+# Local file header of a ZIP entry, see APPNOTE.TXT 4.3.7
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+# Compression methods that can be read as a stream
+STORED, DEFLATED = 0, 8
+
+# General purpose flags
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+# Largest block of CSV bytes inflated at once
+INFLATE_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class _NotStreamable(Exception):
+    """The archive can't be read before it is completely downloaded."""
+
+
+class _InflatingStream(io.RawIOBase):
+    """Reads the first CSV of a ZIP archive from the archive's raw bytes.
+
+    Args:
+        chunks: The bytes of the archive, as they arrive.
+        on_bytes: Called with every chunk of the archive read from `chunks`.
+
+    Raises:
+        _NotStreamable: If the CSV is stored in a way that requires the
+            central directory at the end of the archive.
+        ValueError: If no CSV is found in the archive.
+    """
+
+    def __init__(
+        self, chunks: Iterator[bytes], on_bytes: Callable[[bytes], None]
+    ):
+        super().__init__()
+        self._chunks = chunks
+        self._on_bytes = on_bytes
+        self._pending = b""
+        self._output = b""
+        self._crc = 0
+        self.complete = False
+        self._open_entry()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._output and not self.complete:
+            self._inflate()
+
+        n = min(len(buffer), len(self._output))
+        buffer[:n] = self._output[:n]
+        self._output = self._output[n:]
+        return n
+
+    def drain(self):
+        """Read the rest of the archive, so all of it goes to `on_bytes`."""
+        while self._next_chunk():
+            pass
+        self._pending = b""
+
+    # Archive ----------
+
+    def _next_chunk(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        if chunk:
+            self._on_bytes(chunk)
+            self._pending += chunk
+        return True
+
+    def _take(self, n: int) -> bytes:
+        while len(self._pending) < n:
+            if not self._next_chunk():
+                raise DownloadError("the ZIP archive ended unexpectedly")
+
+        data, self._pending = self._pending[:n], self._pending[n:]
+        return data
+
+    def _skip(self, n: int):
+        while n:
+            if not self._pending and not self._next_chunk():
+                raise DownloadError("the ZIP archive ended unexpectedly")
+            skipped = min(n, len(self._pending))
+            self._pending = self._pending[skipped:]
+            n -= skipped
+
+    def _open_entry(self):
+        """Skip the entries before the first CSV and read its header."""
+        while True:
+            (
+                signature,
+                _,
+                flags,
+                method,
+                _,
+                _,
+                crc,
+                compressed_size,
+                _,
+                name_length,
+                extra_length,
+            ) = LOCAL_HEADER.unpack(self._take(LOCAL_HEADER.size))
+
+            # reached the central directory without finding a CSV
+            if signature != LOCAL_HEADER_SIGNATURE:
+                raise ValueError("No CSV file found in the ZIP archive.")
+
+            encoding = "utf-8" if flags & FLAG_UTF8 else "cp437"
+            name = self._take(name_length).decode(encoding)
+            self._skip(extra_length)
+
+            sizes_known = not flags & FLAG_DATA_DESCRIPTOR
+            if name.lower().endswith(".csv"):
+                break
+
+            # the end of an entry can only be found if its size is known
+            if not sizes_known or compressed_size == 0xFFFFFFFF:
+                raise _NotStreamable(name)
+            self._skip(compressed_size)
+
+        zip64 = compressed_size == 0xFFFFFFFF
+        if method == DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        elif method == STORED and sizes_known and not zip64:
+            self._decompressor = None
+            self._remaining = compressed_size
+            self.complete = compressed_size == 0
+        else:
+            raise _NotStreamable(name)
+
+        # with a data descriptor the CRC only comes after the data
+        self._expected_crc = crc if sizes_known else None
+
+    def _inflate(self):
+        """Decompress the next block of the CSV into `_output`."""
+        if not self._pending and not self._next_chunk():
+            raise DownloadError("the ZIP archive ended unexpectedly")
+
+        if self._decompressor is None:
+            n = min(self._remaining, len(self._pending))
+            self._output = self._pending[:n]
+            self._pending = self._pending[n:]
+            self._remaining -= n
+            done = self._remaining == 0
+        else:
+            self._output = self._decompressor.decompress(
+                self._pending, INFLATE_BLOCK_SIZE
+            )
+            self._pending = self._decompressor.unconsumed_tail
+            done = self._decompressor.eof
+            if done:
+                self._pending = self._decompressor.unused_data
+
+        self._crc = zlib.crc32(self._output, self._crc)
+        if done:
+            expected_crc = self._expected_crc
+            if expected_crc is not None and self._crc != expected_crc:
+                raise DownloadError("CRC check of the CSV file failed")
+            self.complete = True
+
+
+@contextmanager
+def stream_csv(
+    url: str,
+    session: Optional[requests.Session] = None,
+    progress: Optional[_SharedProgress] = None,
+    cache: Optional[DownloadCache] = None,
+    revalidate: bool = True,
+) -> Iterator[IO[bytes]]:
+    """
+    Open the CSV of a remote ZIP archive as a binary stream, while the archive
+    is still downloading.
+
+    The archive is saved in the download cache as it streams. If it is
+    already cached and up to date, the cached copy is read instead. Archives
+    that can't be read before they are complete (e.g. a CSV stored after
+    other entries of unknown size) are downloaded first.
+
+    Unlike `download_zip`, an interrupted stream is not resumed: its partial
+    file is deleted. Like it, only one process or thread fetches a given
+    archive at a time; the others wait for it and read the cached copy.
+
+    Args:
+        url: URL of the ZIP archive.
+        session: Session used for the request. Defaults to the shared session.
+        progress: Shared progress bar. If None, a bar is shown for this file.
+        cache: Cache used to store the archive. Defaults to the default cache.
+        revalidate: Whether to check with the server that a cached archive is
+            still up to date.
+
+    Raises:
+        DownloadError: If the download fails or its size is wrong.
+        ValueError: If no CSV is found in the archive.
+    """
+    session = session or get_session()
+    cache = cache or get_cache()
+    start = time.perf_counter()
+
+    filepath = cache.path_for(url)
+    requested_at = time.time()
+    with (
+        FileLock(filepath + ".lock"),
+        _stream_locked(
+            url, session, progress, cache, revalidate, start, requested_at
+        ) as csv_stream,
+    ):
+        yield csv_stream
+
+
+@contextmanager
+def _stream_locked(
+    url, session, progress, cache, revalidate, start, requested_at
+) -> Iterator[IO[bytes]]:
+    """The body of `stream_csv`, run while holding the archive's lock."""
+    filepath = cache.path_for(url)
+    headers = {}
+    entry = cache.get(url)
+    if entry is not None:
+        # fetched by another process or thread while this one waited
+        fresh = entry.get("downloaded_at", 0) >= requested_at
+        if fresh or not revalidate:
+            cache.touch(url)
+            emit("download", source=url, seconds=0.0, bytes=0, cache_hit=True)
+            with open_zipped_csv(filepath) as csv_stream:
+                yield csv_stream
+            return
+        headers = cache.validation_headers(url)
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    part_path = filepath + ".part"
+    # a partial file left by `download_zip` is overwritten from the start
+    _remove_part(part_path)
+
+    try:
+        response = session.get(url, stream=True, headers=headers)
+    except requests.ConnectionError as e:
+        raise DownloadError(f"Failed to download {url}: {e}") from e
+
+    with response:
+        # The cached copy is still up to date
+        if response.status_code == 304:
+            cache.touch(url)
+            emit(
+                "download",
+                source=url,
+                seconds=time.perf_counter() - start,
+                bytes=0,
+                cache_hit=True,
+            )
+            with open_zipped_csv(filepath) as csv_stream:
+                yield csv_stream
+            return
+
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            raise DownloadError(f"Failed to download {url}: {e}") from e
+        expected_size = _expected_size(response, 0)
+
+        if progress is None:
+            pbar = tqdm(
+                total=expected_size,
+                unit="B",
+                unit_scale=True,
+                desc=url.split("/")[-1],
+                disable=is_quiet(),
+            )
+        else:
+            pbar = progress
+            pbar.add_total(expected_size)
+
+        hasher = hashlib.sha256()
+        size = 0
+
+        try:
+            with open(part_path, "wb") as part:
+
+                def _on_bytes(chunk: bytes):
+                    nonlocal size
+                    part.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    pbar.update(len(chunk))
+
+                chunks = response.iter_content(
+                    chunk_size=_chunk_size(expected_size)
+                )
+                try:
+                    stream = _InflatingStream(iter(chunks), _on_bytes)
+                except _NotStreamable:
+                    stream = None
+
+                if stream is not None:
+                    yield io.BufferedReader(stream)
+                    # the rest of the archive (its central directory, or rows
+                    # the caller didn't read) completes the cached copy
+                    stream.drain()
+                else:
+                    for chunk in chunks:
+                        if chunk:
+                            _on_bytes(chunk)
+        except (
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ) as e:
+            _remove_part(part_path)
+            raise DownloadError(f"Failed to download {url}: {e}") from e
+        except BaseException:
+            _remove_part(part_path)
+            raise
+        finally:
+            if progress is None:
+                pbar.close()
+
+    if expected_size and size != expected_size:
+        _remove_part(part_path)
+        raise DownloadError(
+            f"Downloaded {size} bytes from {url}, expected "
+            f"{expected_size} bytes"
+        )
+
+    os.replace(part_path, filepath)
+    cache.put(url, filepath, response.headers, sha256=hasher.hexdigest())
+    emit(
+        "download",
+        source=url,
+        seconds=time.perf_counter() - start,
+        bytes=size,
+        cache_hit=False,
+    )
+
+    if stream is None:
+        with open_zipped_csv(filepath) as csv_stream:
+            yield csv_stream
+
+
+class _Failed:
+    """An error raised while producing the items of a file."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Stopped(Exception):
+    """The consumer of the pipeline went away."""
+
+
+_DONE = object()
+
+
+def iter_pipeline(
+    urls: List[str],
+    parse: Callable[[IO[bytes]], Iterable],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    queue_size: int = 4,
+    revalidate: bool = True,
+) -> Iterator[Tuple[int, object]]:
+    """
+    Download, decompress and parse several ZIP files at the same time.
+
+    Each file is streamed with `stream_csv` and parsed by `parse` in a worker
+    thread, while the file is downloading. At most `queue_size` parsed items
+    per file wait to be consumed; a worker whose queue is full pauses.
+
+    Args:
+        urls: URLs of the ZIP files.
+        parse: Function that takes the CSV stream of a file and returns (or
+            yields) the items to pass on, e.g. DataFrame chunks.
+        max_workers: Maximum number of files streamed at the same time.
+        queue_size: Maximum number of parsed items waiting per file.
+        revalidate: Whether to check with the server that cached files are
+            still up to date.
+
+    Yields:
+        Tuple[int, object]: The position of the file in `urls` and an item
+            parsed from it, in the same order as `urls`.
+
+    Raises:
+        DownloadError: If any of the files could not be downloaded. Errors
+            raised by `parse` are passed on as they are.
+    """
+    if max_workers < 1:
+        raise ValueError("`max_workers` must be at least 1")
+
+    session = get_session(max_workers)
+    progress = _SharedProgress(len(urls))
+    queues = [queue.Queue(maxsize=queue_size) for _ in urls]
+    stop = threading.Event()
+
+    def _put(items: queue.Queue, item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Stopped
+
+    def _work(i: int, url: str):
+        try:
+            with stream_csv(
+                url, session=session, progress=progress, revalidate=revalidate
+            ) as csv_stream:
+                for item in parse(csv_stream):
+                    _put(queues[i], item)
+            progress.file_done()
+            _put(queues[i], _DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:  # noqa: BLE001
+            # handed over to the consumer, which raises it
+            try:
+                _put(queues[i], _Failed(e))
+            except _Stopped:
+                pass
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for i, url in enumerate(urls):
+            executor.submit(_work, i, url)
+
+        # consuming the files in order; the later ones keep streaming into
+        # their own queues in the meantime
+        for i, items in enumerate(queues):
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield i, item
+    finally:
+        # on failure (or if the caller stops early), stop the workers and
+        # don't start the files that are still queued
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        progress.close()
@@ -0,0 +1,144 @@
+"""
+Seeded, single-pass samples of the rows of a stream of DataFrame chunks.
+
+`Sampler` sees every chunk once, as the files are parsed, and only keeps the
+sampled rows, so memory depends on the size of the sample, not on the size
+of the data:
+
+- With `frac`, every row is kept with probability `frac` (Bernoulli
+  sampling). Each stratum is sampled at the same rate.
+- With `size`, a uniform sample of exactly `size` rows is kept (reservoir
+  sampling), or `size` rows per stratum when chunks are given a stratum
+  (e.g. their state or month).
+
+Every row draws a random key, and a reservoir keeps the rows with the
+smallest keys. The same seed, data and chunk size always give the same sample.
+
+    sampler = Sampler(size=10_000, seed=42)
+    for chunk in b.iter_chunks(["SP", "RJ"], start="202401", end="202406"):
+        sampler.add(chunk.data, stratum=chunk.state)
+    sample = sampler.result()
+"""
+
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class _Reservoir:
+    """The sampled rows of one stratum, with their keys and stream order."""
+
+    def __init__(self):
+        self.frames: List[pd.DataFrame] = []
+        self.keys: List[np.ndarray] = []
+        self.order: List[np.ndarray] = []
+        self.rows = 0
+        # rows with a key above the threshold can't be in the sample
+        self.threshold = 1.0
+
+    def append(self, frame: pd.DataFrame, keys: np.ndarray, order: np.ndarray):
+        self.frames.append(frame)
+        self.keys.append(keys)
+        self.order.append(order)
+        self.rows += len(frame)
+
+    def shrink(self, size: int):
+        """Keep only the `size` rows with the smallest keys."""
+        if not self.frames:
+            return
+
+        keys = np.concatenate(self.keys)
+        order = np.concatenate(self.order)
+        frame = pd.concat(self.frames, ignore_index=True)
+
+        if len(keys) > size:
+            keep = np.sort(np.argpartition(keys, size)[:size])
+            frame = frame.take(keep).reset_index(drop=True)
+            keys, order = keys[keep], order[keep]
+
+        self.frames, self.keys, self.order = [frame], [keys], [order]
+        self.rows = len(frame)
+        if size and len(keys) >= size:
+            self.threshold = float(keys.max())
+
+
+class Sampler:
+    """Seeded single-pass sample of DataFrame chunks.
+
+    Args:
+        size: Number of rows to keep, in total or per stratum.
+        frac: Fraction of the rows to keep, instead of `size`.
+        seed: Seed of the random generator. If None, the sample changes at
+            every run.
+
+    Raises:
+        ValueError: If neither or both of `size` and `frac` are given, or
+            they are out of range.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        frac: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        if (size is None) == (frac is None):
+            raise ValueError("provide either `size` or `frac`")
+        if size is not None and size < 0:
+            raise ValueError("`size` must be at least 0")
+        if frac is not None and not 0 <= frac <= 1:
+            raise ValueError("`frac` must be between 0 and 1")
+
+        self.size = size
+        self.frac = frac
+        self._rng = np.random.default_rng(seed)
+        self._reservoirs: Dict[Hashable, _Reservoir] = {}
+        self._empty: Optional[pd.DataFrame] = None
+        self.rows_seen = 0
+
+    def add(self, chunk: pd.DataFrame, stratum: Hashable = None):
+        """Sample the rows of a chunk (of the given stratum)."""
+        if self._empty is None:
+            self._empty = chunk.iloc[:0]
+
+        n = len(chunk)
+        order = np.arange(self.rows_seen, self.rows_seen + n)
+        self.rows_seen += n
+        # drawn for every row, so the sample doesn't depend on earlier ones
+        keys = self._rng.random(n)
+
+        reservoir = self._reservoirs.setdefault(stratum, _Reservoir())
+        if self.frac is not None:
+            keep = keys < self.frac
+        else:
+            keep = keys < reservoir.threshold
+        if not keep.any():
+            return
+
+        reservoir.append(chunk[keep], keys[keep], order[keep])
+        # shrinking once the reservoir holds twice the sample keeps the
+        # memory bounded while merging each row only a few times
+        if self.size is not None and reservoir.rows > 2 * max(self.size, 1):
+            reservoir.shrink(self.size)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Return the sampled rows, in the order they were seen.
+
+        Returns:
+            pd.DataFrame: The sample, empty if no chunk was added.
+        """
+        frames, orders = [], []
+        for reservoir in self._reservoirs.values():
+            if self.size is not None:
+                reservoir.shrink(self.size)
+            frames.extend(reservoir.frames)
+            orders.extend(reservoir.order)
+
+        if not frames:
+            return self._empty if self._empty is not None else pd.DataFrame()
+
+        sample = pd.concat(frames, ignore_index=True)
+        order = np.argsort(np.concatenate(orders), kind="stable")
+        return sample.take(order).reset_index(drop=True)
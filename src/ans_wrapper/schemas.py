@@ -0,0 +1,158 @@
+"""
+Compact column types for the ANS datasets.
+
+By default `pd.read_csv` stores every text column as `object` and every
+number as int64/float64. The schemas below map the known columns of each
+dataset to smaller types: categoricals for repeated text, small (nullable)
+integers for codes and counts, and floats parsed with the Brazilian decimal
+separator for monetary values.
+"""
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+class Schema:
+    """Column types of a dataset, applied when its CSV files are parsed.
+
+    Args:
+        dtypes: Mapping of column names to pandas dtypes. Columns not listed
+            keep the types inferred by pandas.
+        decimal: Decimal separator of the numeric columns.
+        thousands: Thousands separator of the numeric columns, if any.
+    """
+
+    def __init__(
+        self,
+        dtypes: Dict[str, object],
+        decimal: str = ".",
+        thousands: Optional[str] = None,
+    ):
+        self.dtypes = dtypes
+        self.decimal = decimal
+        self.thousands = thousands
+
+    def read_csv_kwargs(self) -> dict:
+        """Return the keyword arguments to pass to `pd.read_csv`."""
+        return {
+            "dtype": self.dtypes,
+            "decimal": self.decimal,
+            "thousands": self.thousands,
+        }
+
+    def arrow_types(self) -> dict:
+        """
+        Return the pyarrow types of the columns, to parse with pyarrow.
+
+        Categoricals become dictionary-encoded strings, and nullable
+        integers the pyarrow integer of the same size.
+        """
+        import pyarrow as pa
+
+        types = {}
+        for column, dtype in self.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype) or dtype == "category":
+                types[column] = pa.dictionary(pa.int32(), pa.string())
+            else:
+                dtype = pd.api.types.pandas_dtype(dtype)
+                # nullable integers ("Int32") wrap a NumPy dtype
+                dtype = getattr(dtype, "numpy_dtype", dtype)
+                types[column] = pa.from_numpy_dtype(dtype)
+        return types
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the columns of an already loaded DataFrame to the schema.
+
+        Useful after `pd.concat`, which turns categoricals with different
+        categories back into `object`.
+        """
+        dtypes = {
+            column: dtype
+            for column, dtype in self.dtypes.items()
+            if column in df.columns and df[column].dtype != dtype
+        }
+        return df.astype(dtypes) if dtypes else df
+
+
+BENEFICIARIOS_SCHEMA = Schema(
+    {
+        "ID_CMPT_MOVEL": "Int32",
+        "CD_OPERADORA": "Int32",
+        "NM_RAZAO_SOCIAL": "category",
+        "NR_CNPJ": "category",
+        "MODALIDADE_OPERADORA": "category",
+        # not a fixed list of states, which would turn unknown codes into NaN
+        "SG_UF": "category",
+        "CD_MUNICIPIO": "Int32",
+        "NM_MUNICIPIO": "category",
+        "TP_SEXO": "category",
+        "DE_FAIXA_ETARIA": "category",
+        "DE_FAIXA_ETARIA_REAJ": "category",
+        "CD_PLANO": "category",
+        "TP_VIGENCIA_PLANO": "category",
+        "DE_CONTRATACAO_PLANO": "category",
+        "DE_SEGMENTACAO_PLANO": "category",
+        "DE_ABRG_GEOGRAFICA_PLANO": "category",
+        "COBERTURA_ASSIST_PLAN": "category",
+        "TIPO_VINCULO": "category",
+        "QT_BENEFICIARIO_ATIVO": "Int32",
+        "QT_BENEFICIARIO_ADERIDO": "Int32",
+        "QT_BENEFICIARIO_CANCELADO": "Int32",
+        "DT_CARGA": "category",
+    }
+)
+
+DEMONSTRACOES_CONTABEIS_SCHEMA = Schema(
+    {
+        "DATA": "category",
+        "REG_ANS": "Int32",
+        "CD_CONTA_CONTABIL": "category",
+        "DESCRICAO": "category",
+        # monetary values need the precision of float64
+        "VL_SALDO_INICIAL": "float64",
+        "VL_SALDO_FINAL": "float64",
+    },
+    decimal=",",
+    thousands=".",
+)
+
+
+def _default_dtype(series: pd.Series):
+    """Return the dtype pandas would infer for a column by default."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories.dtype
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series.dtype
+    if pd.api.types.is_integer_dtype(series.dtype):
+        # nullable integers with missing values would be read as float64
+        return "float64" if series.hasnans else "int64"
+    if pd.api.types.is_float_dtype(series.dtype):
+        return "float64"
+    return series.dtype
+
+
+def memory_report(df: pd.DataFrame) -> dict:
+    """
+    Compare the memory used by a DataFrame with its default-typed version.
+
+    The default-typed size is measured by converting one column at a time, so
+    the whole DataFrame is never copied.
+
+    Returns:
+        dict: `compact_bytes`, `default_bytes` and `saved_bytes`.
+    """
+    compact_bytes = int(df.memory_usage(index=False, deep=True).sum())
+
+    default_bytes = 0
+    for column in df.columns:
+        series = df[column]
+        default = series.astype(_default_dtype(series))
+        default_bytes += int(default.memory_usage(index=False, deep=True))
+
+    return {
+        "compact_bytes": compact_bytes,
+        "default_bytes": default_bytes,
+        "saved_bytes": default_bytes - compact_bytes,
+    }
@@ -0,0 +1,241 @@
+"""
+Local columnar store for the datasets downloaded from ANS.
+
+Each downloaded CSV is converted once into a Parquet file, stored in a
+hive-style partition folder such as `state=SP/month=202401/`. Later reads only
+open the partitions and columns they need, instead of parsing the CSV again.
+
+Requires `pyarrow` (`pip install ans-wrapper[parquet]`).
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from ans_wrapper.cache import get_cache, load_json, save_json
+from ans_wrapper.locks import FileLock, atomic_path
+from ans_wrapper.utils import open_csv, read_csv_columns
+
+PARTITION_FILENAME = "part-0.parquet"
+MANIFEST_FILENAME = "manifest.json"
+
+# Size of the blocks read from the CSV. Column types without an explicit type
+# are inferred from the first block, so it should hold a good sample of rows.
+CSV_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "the Parquet store requires pyarrow: "
+            "`pip install ans-wrapper[parquet]`"
+        ) from e
+
+
+class ParquetStore:
+    """A folder of Parquet files partitioned by a fixed set of keys.
+
+    Args:
+        name: Name of the dataset, used as the folder name inside the cache.
+        partition_keys: Names of the partition levels, from outer to inner.
+        root: Folder of the store. Defaults to `<cache_dir>/parquet/<name>`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        partition_keys: Sequence[str],
+        root: Optional[str] = None,
+    ):
+        _import_pyarrow()
+
+        self.name = name
+        self.partition_keys = tuple(partition_keys)
+        self.root = root or os.path.join(get_cache().cache_dir, "parquet", name)
+
+    def partition_path(self, **partition: str) -> str:
+        """Return the path of the Parquet file of a partition."""
+        if set(partition) != set(self.partition_keys):
+            raise ValueError(
+                f"expected the partition keys {self.partition_keys}, "
+                f"got {tuple(partition)}"
+            )
+
+        folders = [f"{key}={partition[key]}" for key in self.partition_keys]
+        return os.path.join(self.root, *folders, PARTITION_FILENAME)
+
+    def has(self, **partition: str) -> bool:
+        """Whether a partition is already in the store."""
+        return os.path.exists(self.partition_path(**partition))
+
+    def partitions(self) -> List[Dict[str, str]]:
+        """List the partitions stored, as dicts of partition values."""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            if PARTITION_FILENAME not in filenames:
+                continue
+
+            relative = os.path.relpath(dirpath, self.root)
+            found.append(
+                dict(folder.split("=", 1) for folder in relative.split(os.sep))
+            )
+
+        return found
+
+    # Manifest ----------
+
+    def partition_key(self, **partition: str) -> str:
+        """Return the folder of a partition, e.g. `state=SP/month=202401`."""
+        return "/".join(
+            f"{key}={partition[key]}" for key in self.partition_keys
+        )
+
+    @staticmethod
+    def parse_partition_key(key: str) -> Dict[str, str]:
+        """Return the partition values of a folder given by `partition_key`."""
+        return dict(folder.split("=", 1) for folder in key.split("/"))
+
+    def manifest(self) -> Dict[str, dict]:
+        """
+        Return the source of every recorded partition.
+
+        Keys are partition folders (`state=SP/month=202401`), values are
+        whatever was given to `record`.
+        """
+        return load_json(os.path.join(self.root, MANIFEST_FILENAME))
+
+    def recorded(self, **partition: str) -> Optional[dict]:
+        """Return the recorded source of a partition, if any."""
+        return self.manifest().get(self.partition_key(**partition))
+
+    def record(self, source: dict, **partition: str):
+        """Record where a partition came from (e.g. remote size and date)."""
+        path = os.path.join(self.root, MANIFEST_FILENAME)
+        # other processes may record their partitions at the same time
+        with FileLock(path + ".lock"):
+            manifest = self.manifest()
+            manifest[self.partition_key(**partition)] = source
+            save_json(path, manifest)
+
+    # Data ----------
+
+    def write(
+        self,
+        csv_path: str,
+        column_types: Optional[dict] = None,
+        sort_by: Optional[str] = None,
+        row_group_size: Optional[int] = None,
+        decimal_point: str = ".",
+        default_type=None,
+        **partition,
+    ) -> str:
+        """
+        Convert a CSV file (or the CSV inside a ZIP) into a partition.
+
+        The CSV is converted block by block, so memory use doesn't depend on
+        its size, unless it has to be sorted. The partition is replaced
+        atomically once it is complete.
+
+        Args:
+            csv_path: Path of the CSV file or ZIP archive.
+            column_types: Optional mapping of column names to pyarrow types,
+                used instead of the inferred types.
+            sort_by: Column to sort the rows by, so the rows of each value
+                are stored together (see `ans_wrapper.index`). The whole file
+                is then loaded in memory.
+            row_group_size: Maximum number of rows of each Parquet row group.
+            decimal_point: Decimal separator of the numeric columns.
+            default_type: pyarrow type of the columns not in `column_types`,
+                e.g. `pa.string()`. If None, their types are inferred from the
+                first block, and a later block that doesn't fit them fails.
+            **partition: Values of the partition keys.
+
+        Returns:
+            str: Path of the Parquet file.
+        """
+        import pyarrow.csv as pv
+        import pyarrow.parquet as pq
+
+        path = self.partition_path(**partition)
+
+        if default_type is not None:
+            columns = read_csv_columns(csv_path)
+            column_types = {
+                **dict.fromkeys(columns, default_type),
+                **(column_types or {}),
+            }
+
+        with open_csv(csv_path) as csv_stream, atomic_path(path) as tmp_path:
+            reader = pv.open_csv(
+                csv_stream,
+                read_options=pv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                parse_options=pv.ParseOptions(delimiter=";"),
+                convert_options=pv.ConvertOptions(
+                    column_types=column_types, decimal_point=decimal_point
+                ),
+            )
+
+            if sort_by is not None:
+                table = reader.read_all().sort_by(sort_by)
+                pq.write_table(table, tmp_path, row_group_size=row_group_size)
+            else:
+                with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch, row_group_size=row_group_size)
+
+        return path
+
+    def read_table(
+        self,
+        partitions: List[Dict[str, str]],
+        columns: Optional[List[str]] = None,
+    ):
+        """
+        Read some partitions of the store as a `pyarrow.Table`.
+
+        Args:
+            partitions: Partitions to read, as dicts of partition values.
+            columns: Columns to read. If None, all columns are read.
+        """
+        return self._dataset(partitions).to_table(columns=columns)
+
+    def read(
+        self,
+        partitions: List[Dict[str, str]],
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Read some partitions of the store as a DataFrame."""
+        return self.read_table(partitions, columns).to_pandas()
+
+    def iter_read(
+        self,
+        partitions: List[Dict[str, str]],
+        columns: Optional[List[str]] = None,
+        chunk_size: int = 100_000,
+    ) -> Iterator[pd.DataFrame]:
+        """Read some partitions of the store as DataFrame chunks."""
+        dataset = self._dataset(partitions)
+        for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+            yield batch.to_pandas()
+
+    def _dataset(self, partitions: List[Dict[str, str]]):
+        """Return a `pyarrow.dataset.Dataset` over some partitions."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        paths = [self.partition_path(**partition) for partition in partitions]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"partitions not in the store: {missing}")
+
+        # Types are inferred per file, so a column that is empty in one
+        # partition may have a narrower type than in the others
+        schema = pa.unify_schemas(
+            [pq.read_schema(path) for path in paths],
+            promote_options="permissive",
+        )
+        return ds.dataset(paths, schema=schema, format="parquet")
@@ -3,16 +3,48 @@ Collection of download utils to help download,
 extract and manipulate zip files and project folders
 """
 
+import hashlib
 import os
+import shutil
+import threading
+import time
 import zipfile
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from contextlib import contextmanager
 from datetime import datetime
+from typing import IO, Callable, Iterator, List, Optional, Sequence
 
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
-from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from ans_wrapper.cache import DownloadCache, get_cache
+from ans_wrapper.instrumentation import emit, is_quiet, log, timed
+from ans_wrapper.locks import FileLock, atomic_write
+
+# Base URL of the ANS open data portal. `$ANS_WRAPPER_BASE_URL` points the
+# package to a mirror (or to a local stand-in server, see `benchmarks/`).
+BASE_URL_ENV = "ANS_WRAPPER_BASE_URL"
+BASE_URL = os.environ.get(
+    BASE_URL_ENV, "https://dadosabertos.ans.gov.br/FTP/PDA/"
+)
+
+# Number of files downloaded at the same time by `download_many`
+DEFAULT_MAX_WORKERS = 8
+
+# Smallest and largest blocks read at once from a download
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# How long a cached directory listing is used before fetching it again
+LISTING_TTL = 6 * 60 * 60  # 6 hours
+
 
 class DownloadError(Exception):
     pass
@@ -20,45 +52,424 @@ class DownloadError(Exception):
 
 # Download Utils ----------
 
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
 
-def download_zip(url: str, output_dir="ans_downloads") -> str:
+def get_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
     """
-    Download a ZIP file from the web and save it locally in the specified folder.
+    Return the `requests.Session` shared by every download in the package.
+
+    The session keeps its connections alive, so consecutive requests to the
+    ANS server reuse the same TCP/TLS connection instead of opening a new one.
+
+    Args:
+        pool_size: Minimum number of connections kept in the pool. The pool is
+            grown if a later call asks for more connections.
+    """
+    global _session, _session_pool_size
+
+    with _session_lock:
+        if _session is None or _session_pool_size < pool_size:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session, _session_pool_size = session, pool_size
+
+        return _session
+
+
+class _SharedProgress:
+    """A single tqdm bar shared by several concurrent downloads."""
+
+    def __init__(self, n_files: int):
+        self._lock = threading.Lock()
+        self._n_files = n_files
+        self._done = 0
+        self._bar = tqdm(
+            total=0,
+            unit="B",
+            unit_scale=True,
+            desc="Downloading",
+            disable=is_quiet(),
+        )
+        self._bar.set_postfix_str(f"0/{n_files} files")
+
+    def add_total(self, n_bytes: int):
+        with self._lock:
+            self._bar.total += n_bytes
+            self._bar.refresh()
+
+    def update(self, n_bytes: int):
+        with self._lock:
+            self._bar.update(n_bytes)
+
+    def file_done(self):
+        with self._lock:
+            self._done += 1
+            self._bar.set_postfix_str(f"{self._done}/{self._n_files} files")
+
+    def close(self):
+        self._bar.close()
+
+
+def download_zip(
+    url: str,
+    output_dir: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    progress: Optional[_SharedProgress] = None,
+    cache: Optional[DownloadCache] = None,
+    revalidate: bool = True,
+    retries: int = 3,
+) -> str:
+    """
+    Download a ZIP file from the web and save it locally.
+
+    By default the file is stored in the download cache (see
+    `ans_wrapper.cache`). If the file is already cached, it is revalidated
+    with a conditional request and only downloaded again if it changed.
+
+    The file is written to `<path>.part` and renamed once its size has been
+    checked. An interrupted download keeps its `.part` file and is resumed
+    from where it stopped, by this call's retries or by the next call.
+
+    Only one process or thread downloads a given file at a time: the others
+    wait on a lock file (`<path>.lock`) and reuse the file it downloaded.
+
+    Args:
+        url: URL of the ZIP file.
+        output_dir: Folder where the ZIP file is saved. If given, the cache is
+            bypassed and the file is always downloaded.
+        session: Session used for the request. Defaults to the shared session.
+        progress: Shared progress bar. If None, a bar is shown for this file.
+        cache: Cache used to store the file. Defaults to the default cache.
+        revalidate: Whether to check with the server that a cached file is
+            still up to date. If False, cached files are used as they are.
+        retries: How many times an interrupted download is resumed before
+            giving up.
 
     Returns:
         str: Full path to the downloaded ZIP file.
+
+    Raises:
+        DownloadError: If the download fails or its size is wrong.
     """
-    # create directory if it doesn't exist yet
-    os.makedirs(output_dir, exist_ok=True)
+    session = session or get_session()
+    start = time.perf_counter()
 
     # getting the name of the zip file
     filename = url.split("/")[-1]
-    # the path where are storing this zip
-    filepath = os.path.join(output_dir, filename)
 
-    # downloading the zip file
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
+    if output_dir is None:
+        cache = cache or get_cache()
+        # the path where are storing this zip
+        filepath = cache.path_for(url)
+    else:
+        cache = None
+        filepath = os.path.join(output_dir, filename)
+
+    requested_at = time.time()
+    with FileLock(filepath + ".lock"):
+        return _download_locked(
+            url,
+            filepath,
+            session,
+            progress,
+            cache,
+            revalidate,
+            retries,
+            start,
+            requested_at,
+        )
+
+
+def _download_locked(
+    url,
+    filepath,
+    session,
+    progress,
+    cache,
+    revalidate,
+    retries,
+    start,
+    requested_at,
+) -> str:
+    """The body of `download_zip`, run while holding the file's lock."""
+    headers = {}
+    if cache is not None:
+        entry = cache.get(url)
+        if entry is not None:
+            # downloaded by another process or thread while this one waited
+            # for the lock, so there is nothing to revalidate
+            fresh = entry.get("downloaded_at", 0) >= requested_at
+            if fresh or not revalidate:
+                cache.touch(url)
+                _emit_download(url, filepath, start, cache_hit=True)
+                return filepath
+            headers = cache.validation_headers(url)
+
+    # create directory if it doesn't exist yet
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    # downloading the zip file into `<filepath>.part`
+    result = _download_part(url, filepath, session, headers, progress, retries)
+
+    # The cached copy is still up to date
+    if result is None:
+        cache.touch(url)
+        if progress is None:
+            log(f"ZIP file up to date in cache: {filepath}")
+        _emit_download(url, filepath, start, cache_hit=True)
+        return filepath
+
+    response_headers, sha256 = result
 
-    total_size = int(response.headers.get("content-length", 0))
+    # the complete file replaces the previous copy in a single step
+    os.replace(filepath + ".part", filepath)
+    _remove_part_validator(filepath + ".part")
 
-    # saving it
-    with open(filepath, "wb") as f, tqdm(
-        total=total_size, unit="B", unit_scale=True, desc=filename
-    ) as pbar:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
-                pbar.update(len(chunk))
+    if cache is not None:
+        cache.put(url, filepath, response_headers, sha256=sha256)
 
-    print(f"ZIP file saved at: {filepath}")
+    if progress is None:
+        log(f"ZIP file saved at: {filepath}")
+    _emit_download(url, filepath, start, cache_hit=False)
     return filepath
 
 
-def extract_csv(zip_path, temp_extract_dir="ans_downloads") -> str:
+def _emit_download(url: str, filepath: str, start: float, cache_hit: bool):
+    emit(
+        "download",
+        source=url,
+        seconds=time.perf_counter() - start,
+        bytes=0 if cache_hit else os.path.getsize(filepath),
+        cache_hit=cache_hit,
+    )
+
+
+def _chunk_size(total_size: int) -> int:
+    """Pick a read size of about 1/256th of the file, within sane bounds."""
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, total_size // 256))
+
+
+def _part_validator(response) -> Optional[str]:
+    """Return the value to send as `If-Range` to resume this response."""
+    etag = response.headers.get("ETag")
+    # weak ETags can't be used to resume a download
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _load_part_validator(part_path: str) -> Optional[str]:
+    try:
+        with open(part_path + ".validator", encoding="utf-8") as f:
+            return f.read() or None
+    except FileNotFoundError:
+        return None
+
+
+def _save_part_validator(part_path: str, validator: Optional[str]):
+    if validator is None:
+        _remove_part_validator(part_path)
+        return
+    with open(part_path + ".validator", "w", encoding="utf-8") as f:
+        f.write(validator)
+
+
+def _remove_part_validator(part_path: str):
+    try:
+        os.remove(part_path + ".validator")
+    except FileNotFoundError:
+        pass
+
+
+def _remove_part(part_path: str):
+    """Delete a partial download and its validator."""
+    try:
+        os.remove(part_path)
+    except FileNotFoundError:
+        pass
+    _remove_part_validator(part_path)
+
+
+def _download_part(url, filepath, session, headers, progress, retries):
+    """
+    Download `url` into `<filepath>.part`, resuming it if it already exists.
+
+    A partial file is resumed with a `Range` request, guarded by `If-Range`
+    so the server sends the whole file again if it changed in the meantime.
+    The SHA-256 and size of the file are computed while it is written.
+
+    Returns:
+        The response headers and the SHA-256 of the file, or None if the
+        server answered `304 Not Modified` to the conditional `headers`.
+
+    Raises:
+        DownloadError: If the download keeps failing after `retries` retries,
+            or the size of the file doesn't match the announced size.
+    """
+    filename = url.split("/")[-1]
+    part_path = filepath + ".part"
+    pbar = None
+
+    try:
+        for attempt in range(retries + 1):
+            offset = (
+                os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            )
+            validator = _load_part_validator(part_path)
+
+            request_headers = dict(headers)
+            if offset and validator:
+                # the partial file is a newer copy than the cached one, so
+                # the conditional headers no longer apply
+                request_headers = {
+                    "Range": f"bytes={offset}-",
+                    "If-Range": validator,
+                }
+
+            try:
+                response = session.get(
+                    url, stream=True, headers=request_headers
+                )
+            except requests.ConnectionError as e:
+                if attempt == retries:
+                    raise DownloadError(f"Failed to download {url}: {e}") from e
+                continue
+
+            with response:
+                if response.status_code == 304:
+                    return None
+
+                # the partial file is already complete or invalid
+                if response.status_code == 416:
+                    _remove_part(part_path)
+                    continue
+
+                response.raise_for_status()
+
+                # the server sent the whole file: start over
+                if response.status_code != 206:
+                    offset = 0
+                    _save_part_validator(part_path, _part_validator(response))
+
+                expected_size = _expected_size(response, offset)
+
+                if pbar is None:
+                    if progress is None:
+                        pbar = tqdm(
+                            total=expected_size,
+                            unit="B",
+                            unit_scale=True,
+                            desc=filename,
+                            disable=is_quiet(),
+                        )
+                    else:
+                        pbar = progress
+                        pbar.add_total(expected_size)
+                    pbar.update(offset)
+
+                # hashing the bytes already on disk, then the new ones as they
+                # arrive, avoids a second pass over the finished file
+                hasher = _hash_file(part_path, offset)
+                size = offset
+
+                try:
+                    with open(part_path, "r+b" if offset else "wb") as f:
+                        f.seek(offset)
+                        f.truncate()
+                        for chunk in response.iter_content(
+                            chunk_size=_chunk_size(expected_size)
+                        ):
+                            if chunk:
+                                f.write(chunk)
+                                hasher.update(chunk)
+                                size += len(chunk)
+                                pbar.update(len(chunk))
+                except (
+                    requests.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                ) as e:
+                    # keep the partial file and resume it
+                    if attempt == retries:
+                        raise DownloadError(
+                            f"Failed to download {url}: {e}. "
+                            f"The partial file will be resumed next time."
+                        ) from e
+                    continue
+
+            if expected_size and size < expected_size:
+                if attempt == retries:
+                    raise DownloadError(
+                        f"Incomplete download of {url}: got {size} of "
+                        f"{expected_size} bytes"
+                    )
+                continue
+
+            if expected_size and size > expected_size:
+                _remove_part(part_path)
+                raise DownloadError(
+                    f"Downloaded {size} bytes from {url}, expected "
+                    f"{expected_size} bytes"
+                )
+
+            return response.headers, hasher.hexdigest()
+
+        raise DownloadError(f"Failed to download {url}")
+    finally:
+        if pbar is not None and progress is None:
+            pbar.close()
+
+
+def _expected_size(response, offset: int) -> int:
+    """Return the size of the whole file, or 0 if the server didn't say."""
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+
+    content_length = int(response.headers.get("content-length", 0))
+    return content_length + offset if content_length else 0
+
+
+def _hash_file(path: str, size: int):
+    """Return a SHA-256 hasher fed with the first `size` bytes of a file."""
+    hasher = hashlib.sha256()
+    if size:
+        with open(path, "rb") as f:
+            remaining = size
+            while remaining:
+                block = f.read(min(MAX_CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def extract_csv(
+    zip_path, temp_extract_dir="ans_downloads", verbose=True, remove_zip=True
+) -> str:
     """
     Extracts the first CSV file from a ZIP archive to a temporary directory.
 
+    If the CSV was already extracted from the same archive, it is reused.
+    The CSV is written under a temporary name and renamed once complete, and
+    concurrent extractions of the same file wait for each other, so readers
+    never see a partial file.
+
+    Args:
+        zip_path: Path of the ZIP archive.
+        temp_extract_dir: Folder where the CSV file is extracted.
+        verbose: Whether to print the path of the extracted file.
+        remove_zip: Whether to delete the ZIP archive after extracting it.
+
     Returns:
         str: Full path to the extracted CSV file.
 
@@ -66,49 +477,327 @@ def extract_csv(zip_path, temp_extract_dir="ans_downloads") -> str:
         ValueError: If no CSV is found in the archive.
     """
     os.makedirs(temp_extract_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    # the archive isn't removed or replaced while it is being extracted
+    zip_lock = FileLock(zip_path + ".lock")
+    if remove_zip:
+        zip_lock.acquire()
+
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            csv_filename = _find_csv(zip_ref)
+            # the folders of the entry name, without ones leaving the folder
+            extracted_csv_path = os.path.join(
+                temp_extract_dir,
+                *[
+                    part
+                    for part in csv_filename.split("/")
+                    if part not in ("", ".", "..")
+                ],
+            )
+
+            with FileLock(extracted_csv_path + ".lock"):
+                # Skip the extraction if this archive was already extracted
+                already_extracted = (
+                    os.path.exists(extracted_csv_path)
+                    and os.path.getsize(extracted_csv_path)
+                    == zip_ref.getinfo(csv_filename).file_size
+                    and os.path.getmtime(extracted_csv_path)
+                    >= os.path.getmtime(zip_path)
+                )
+
+                if not already_extracted:
+                    with (
+                        zip_ref.open(csv_filename) as source,
+                        atomic_write(extracted_csv_path, "wb") as target,
+                    ):
+                        shutil.copyfileobj(source, target, MAX_CHUNK_SIZE)
+
+        # removing the zip file
+        if remove_zip:
+            os.remove(zip_path)
+    finally:
+        zip_lock.release()
+
+    emit(
+        "extract",
+        source=zip_path,
+        seconds=time.perf_counter() - start,
+        bytes=os.path.getsize(extracted_csv_path),
+        cache_hit=already_extracted,
+    )
+
+    if verbose:
+        log(f"CSV extracted: {extracted_csv_path}")
 
-    # From the given zip path. we list all the files inside it and get the csv
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_contents = zip_ref.namelist()
-        csv_files = [f for f in zip_contents if f.lower().endswith(".csv")]
+    return extracted_csv_path
 
-        # Raise error if there are no csv files in the zip
-        if not csv_files:
-            raise ValueError("No CSV file found in the ZIP archive.")
 
-        # There will be only one csv in the list, so we can get it with:
-        csv_filename = csv_files[0]
+def _find_csv(zip_ref: zipfile.ZipFile) -> str:
+    """Return the name of the first CSV file inside an open ZIP archive."""
+    # From the given zip, we list all the files inside it and get the csv
+    zip_contents = zip_ref.namelist()
+    csv_files = [f for f in zip_contents if f.lower().endswith(".csv")]
 
-        # TODO: implement try-error here.
-        zip_ref.extract(csv_filename, temp_extract_dir)
+    # Raise error if there are no csv files in the zip
+    if not csv_files:
+        raise ValueError("No CSV file found in the ZIP archive.")
 
-    extracted_csv_path = os.path.join(temp_extract_dir, csv_filename)
-    print(f"CSV extracted: {extracted_csv_path}")
+    # There will be only one csv in the list, so we can get it with:
+    return csv_files[0]
 
-    # removing the zip file
-    os.remove(zip_path)
 
-    return extracted_csv_path
+@contextmanager
+def open_zipped_csv(zip_path: str) -> Iterator[IO[bytes]]:
+    """
+    Open the first CSV file of a ZIP archive as a binary stream.
 
+    The CSV is decompressed on the fly while it is read, so nothing is written
+    to the disk. The stream can be passed directly to `pd.read_csv`.
 
-def download_and_extract_csv(url):
-    zip_file_path = download_zip(url)
-    csv_file_path = extract_csv(zip_file_path)
+    Raises:
+        ValueError: If no CSV is found in the archive.
+    """
+    with (
+        zipfile.ZipFile(zip_path, "r") as zip_ref,
+        zip_ref.open(_find_csv(zip_ref)) as csv_stream,
+    ):
+        yield csv_stream
+
+
+@contextmanager
+def open_csv(path: str) -> Iterator[IO[bytes]]:
+    """Open a CSV file, or the CSV inside a ZIP archive, as a binary stream."""
+    if path.lower().endswith(".zip"):
+        with open_zipped_csv(path) as csv_stream:
+            yield csv_stream
+    else:
+        with open(path, "rb") as csv_stream:
+            yield csv_stream
+
+
+def download_and_extract_csv(
+    url, session=None, progress=None, cache=None, revalidate=True
+):
+    """Download a ZIP file through the cache and extract its CSV next to it."""
+    cache = cache or get_cache()
+    zip_file_path = download_zip(
+        url,
+        session=session,
+        progress=progress,
+        cache=cache,
+        revalidate=revalidate,
+    )
+    csv_file_path = extract_csv(
+        zip_file_path,
+        temp_extract_dir=cache.extract_dir_for(url),
+        verbose=progress is None,
+        remove_zip=False,
+    )
+    cache.record_extracted(url)
     return csv_file_path
 
 
-def parse_url_links(url: str) -> list:
-    """Parse the paths of a given url"""
-    # This returns a html file inside a string
-    response = requests.get(url)
+def remote_info(url: str, session=None) -> Optional[dict]:
+    """
+    Return the ETag, Last-Modified and size of a remote file, with a HEAD.
 
-    # Parsing the html
-    soup = BeautifulSoup(response.content, "html.parser")
+    Returns:
+        dict: `etag`, `last_modified` and `size`, or None if the file doesn't
+            exist on the server.
+    """
+    session = session or get_session()
+    response = session.head(url, allow_redirects=True)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
 
-    # Parsing all the links
-    links = soup.find_all("a")
+    size = response.headers.get("content-length")
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "size": int(size) if size is not None else None,
+    }
+
+
+def remote_info_many(
+    urls: List[str], max_workers: int = DEFAULT_MAX_WORKERS
+) -> List[Optional[dict]]:
+    """Run `remote_info` on several URLs at the same time, keeping the order."""
+    session = get_session(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda url: remote_info(url, session), urls))
+
+
+def download_many(
+    urls: List[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    extract: bool = True,
+    revalidate: bool = True,
+) -> List[str]:
+    """
+    Download and extract several ZIP files at the same time.
 
-    return links
+    See `iter_downloads` for the details.
+
+    Returns:
+        List[str]: Paths to the extracted CSV files (or to the ZIP files), in
+            the same order as `urls`.
+
+    Raises:
+        DownloadError: If any of the files could not be downloaded.
+    """
+    return list(
+        iter_downloads(
+            urls,
+            max_workers=max_workers,
+            extract=extract,
+            revalidate=revalidate,
+        )
+    )
+
+
+def iter_downloads(
+    urls: List[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    extract: bool = True,
+    revalidate: bool = True,
+) -> Iterator[str]:
+    """
+    Download and extract several ZIP files at the same time, yielding each
+    path as soon as it and the files before it are ready.
+
+    Files are fetched by a pool of `max_workers` threads sharing one
+    connection pool, and a single progress bar is shown for all of them.
+
+    Args:
+        urls: URLs of the ZIP files.
+        max_workers: Maximum number of simultaneous downloads.
+        extract: Whether to extract the CSV files. If False, the paths of the
+            ZIP files are returned instead, to be read with `open_csv`.
+        revalidate: Whether to check with the server that cached files are
+            still up to date.
+
+    Yields:
+        str: Paths to the extracted CSV files (or to the ZIP files), in the
+            same order as `urls`.
+
+    Raises:
+        DownloadError: If any of the files could not be downloaded.
+    """
+    if max_workers < 1:
+        raise ValueError("`max_workers` must be at least 1")
+
+    session = get_session(max_workers)
+    progress = _SharedProgress(len(urls))
+
+    def _download(url):
+        try:
+            if extract:
+                csv_path = download_and_extract_csv(
+                    url, session, progress, revalidate=revalidate
+                )
+            else:
+                csv_path = download_zip(
+                    url,
+                    session=session,
+                    progress=progress,
+                    revalidate=revalidate,
+                )
+        except Exception as e:
+            raise DownloadError(f"Failed to download {url}: {e}") from e
+        progress.file_done()
+        return csv_path
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(_download, url) for url in urls]
+        # collecting in submission order keeps the results aligned with `urls`
+        for future in futures:
+            yield future.result()
+    finally:
+        # on failure (or if the caller stops early), don't start the
+        # downloads that are still queued
+        executor.shutdown(wait=True, cancel_futures=True)
+        progress.close()
+
+
+# Parsing Utils ----------
+
+# `pd.read_csv` options the pyarrow engine doesn't support
+PYARROW_UNSUPPORTED_OPTIONS = ("chunksize", "low_memory", "thousands")
+
+
+def run_parallel(
+    func: Callable, args_list: Sequence[tuple], max_workers: int = 1
+) -> List[Future]:
+    """
+    Run `func(*args)` for every item of `args_list` in a process pool.
+
+    With `max_workers <= 1` the calls run one after another in this process.
+    `func` and its arguments must be picklable.
+
+    Returns:
+        List[Future]: Completed futures, in the same order as `args_list`.
+            Exceptions are kept in the futures instead of being raised.
+    """
+    with _parse_executor(max_workers) as executor:
+        return [executor.submit(func, *args) for args in args_list]
+
+
+def iter_parallel(
+    func: Callable, args_list: Sequence[tuple], max_workers: int = 1
+) -> Iterator:
+    """
+    Run `func(*args)` like `run_parallel`, but yield every result as soon as
+    it is ready, so the results don't have to be held all at once.
+
+    Yields:
+        The results of the calls, in the order they complete.
+
+    Raises:
+        Exception: The first exception raised by a call.
+    """
+    with _parse_executor(max_workers) as executor:
+        # no list of the futures is kept: `as_completed` drops each one, and
+        # its result, once it is yielded
+        futures = as_completed(
+            [executor.submit(func, *args) for args in args_list]
+        )
+        for future in futures:
+            yield future.result()
+
+
+def _parse_executor(max_workers: int):
+    if max_workers <= 1:
+        # a single thread runs the calls one after another
+        return ThreadPoolExecutor(max_workers=1)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def resolve_engine(engine: str, read_csv_kwargs: Optional[dict] = None) -> str:
+    """
+    Pick the `pd.read_csv` engine to use.
+
+    "auto" means pyarrow when it is installed. The pyarrow engine is replaced
+    by the C engine when pyarrow is missing or when an option it doesn't
+    support is used.
+    """
+    if engine not in ("auto", "pyarrow"):
+        return engine
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "c"
+
+    read_csv_kwargs = read_csv_kwargs or {}
+    for option in PYARROW_UNSUPPORTED_OPTIONS:
+        if read_csv_kwargs.get(option) is not None:
+            return "c"
+
+    return "pyarrow"
 
 
 # General Utils ----------
@@ -116,6 +805,8 @@ def parse_url_links(url: str) -> list:
 
 def generate_month_range(start: str, end: str) -> list[str]:
     """Generates a range of dates with monthly frequency."""
+    from dateutil.relativedelta import relativedelta
+
     start_date = datetime.strptime(start, "%Y%m")
     end_date = datetime.strptime(end, "%Y%m")
 
@@ -129,33 +820,118 @@ def generate_month_range(start: str, end: str) -> list[str]:
     return date_range
 
 
+def generate_quarter_range(start: str, end: str) -> list[str]:
+    """Generates the quarters ("1T2024") from `start` to `end`, inclusive."""
+
+    def _index(quarter: str) -> int:
+        number, _, year = quarter.upper().partition("T")
+        if not (number.isdigit() and year.isdigit() and 1 <= int(number) <= 4):
+            raise ValueError(
+                f"Invalid quarter format: {quarter}. Expected format: '1T2024'"
+            )
+        return int(year) * 4 + int(number) - 1
+
+    return [
+        f"{index % 4 + 1}T{index // 4}"
+        for index in range(_index(start), _index(end) + 1)
+    ]
+
+
+# Size of the blocks copied at once by the byte-level concatenation
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+
+
 def concat_csv_files(csv_paths, output_path, chunksize=100_000):
     """
     Concatenate multiple large CSV files with ';' as delimiter.
-    Works efficiently in chunks to avoid memory issues.
+
+    When every file has the same header line, the files are glued together
+    byte for byte, keeping only the first header. Otherwise they are parsed
+    and rewritten in chunks to avoid memory issues.
+
+    ZIP archives can be given instead of CSV files, in which case their CSV is
+    read directly from the archive.
     """
+    try:
+        headers = {_read_header(path) for path in csv_paths}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        # an unreadable file is skipped by the parsing path
+        headers = None
+
+    with timed("concat", str(output_path)) as event:
+        if headers and len(headers) == 1:
+            output_path = _concat_csv_bytes(csv_paths, output_path)
+        else:
+            output_path = _concat_csv_parsed(csv_paths, output_path, chunksize)
+        event["bytes"] = os.path.getsize(output_path)
+
+    return output_path
+
+
+def _read_header(path) -> bytes:
+    """Return the header line of a CSV, without BOM and line terminator."""
+    with open_csv(path) as csv_stream:
+        header = csv_stream.readline()
+
+    return header.removeprefix(b"\xef\xbb\xbf").rstrip(b"\r\n")
+
+
+def read_csv_columns(path) -> List[str]:
+    """Return the column names of a ';' separated CSV (or of a ZIP's CSV)."""
+    header = _read_header(path).decode("utf-8")
+    return [column.strip('"') for column in header.split(";")]
+
+
+def _concat_csv_bytes(csv_paths, output_path):
+    """Concatenate CSV files sharing the same header without parsing them."""
+    ends_with_newline = True
+
+    with open(output_path, "wb") as f_out:
+        for i, path in enumerate(csv_paths):
+            with open_csv(path) as csv_stream:
+                # keep only the header of the first file
+                if i > 0:
+                    csv_stream.readline()
+
+                # a file without a final line break would merge its last
+                # row with the first row of the next file
+                block = csv_stream.read(COPY_BUFFER_SIZE)
+                if block and not ends_with_newline:
+                    f_out.write(b"\n")
+
+                while block:
+                    f_out.write(block)
+                    ends_with_newline = block.endswith(b"\n")
+                    block = csv_stream.read(COPY_BUFFER_SIZE)
+
+    return str(output_path)
+
+
+def _concat_csv_parsed(csv_paths, output_path, chunksize=100_000):
+    """Concatenate CSV files by parsing and rewriting them in chunks."""
     header_written = False
 
     with open(output_path, "w", encoding="utf-8", newline="") as f_out:
         for path in csv_paths:
             try:
-                for chunk in pd.read_csv(
-                    path,
-                    sep=";",
-                    chunksize=chunksize,
-                    low_memory=False,
-                    encoding="utf-8",
-                    on_bad_lines="skip",
-                ):
-                    chunk.to_csv(
-                        f_out,
+                with open_csv(path) as csv_stream:
+                    for chunk in pd.read_csv(
+                        csv_stream,
                         sep=";",
-                        index=False,
-                        header=not header_written,
-                        mode="a",
-                    )
-                    header_written = True
+                        chunksize=chunksize,
+                        low_memory=False,
+                        encoding="utf-8",
+                        on_bad_lines="skip",
+                    ):
+                        chunk.to_csv(
+                            f_out,
+                            sep=";",
+                            index=False,
+                            header=not header_written,
+                            mode="a",
+                        )
+                        header_written = True
             except Exception as e:
-                print(f"Skipping {path} due to error: {e}")
+                log(f"Skipping {path} due to error: {e}")
 
     return str(output_path)
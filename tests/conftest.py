@@ -0,0 +1,54 @@
+"""
+Shared fixtures: a local stand-in for the ANS server, and a fresh cache.
+
+The server is started before the tests are collected, because the package
+reads `$ANS_WRAPPER_BASE_URL` when it is imported.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+from ans_server import ANSServer, generate_tree
+
+STATES = ["SP", "RJ"]
+MONTHS = ["202401", "202402"]
+QUARTERS = ["3T2023", "4T2023", "1T2024"]
+
+_server = None
+_root = None
+
+
+def pytest_configure(config):
+    global _server, _root
+
+    _root = tempfile.mkdtemp(prefix="ans-server-")
+    generate_tree(_root, STATES, MONTHS, QUARTERS, 2_000, 3_000)
+    _server = ANSServer(_root).start()
+    os.environ["ANS_WRAPPER_BASE_URL"] = _server.base_url
+
+
+def pytest_unconfigure(config):
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+    if _root is not None:
+        shutil.rmtree(_root, ignore_errors=True)
+
+
+@pytest.fixture
+def server():
+    """The stand-in server, with its counters set back to zero."""
+    _server.reset_stats()
+    return _server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A fresh default cache, and quiet progress bars."""
+    from ans_wrapper.cache import configure_cache
+    from ans_wrapper.instrumentation import set_quiet
+
+    set_quiet()
+    return configure_cache(cache_dir=str(tmp_path / "cache"))
@@ -0,0 +1,58 @@
+"""Tests of the chart-of-accounts tree and its rollups."""
+
+import numpy as np
+import pytest
+
+from ans_wrapper.accounts import AccountTree
+
+CODES = ["1", "11", "111", "112", "12", "2", "21"]
+
+
+@pytest.fixture
+def tree():
+    return AccountTree(CODES + ["11"])
+
+
+def test_structure(tree):
+    assert len(tree) == 7
+    assert tree.level(1).tolist() == ["1", "2"]
+    assert tree.children("1").tolist() == ["11", "12"]
+    assert tree.leaves("1").tolist() == ["111", "112", "12"]
+    assert tree.leaves("21").tolist() == ["21"]
+
+
+def test_rollup_sums_only_leaves(tree):
+    # parent totals in the data (the 1000s) are not counted twice
+    values = np.array(
+        [
+            [1000, 1000, 1, 2, 4, 1000, 8],
+            [1000, 1000, np.nan, np.nan, np.nan, 1000, 16],
+        ]
+    )
+
+    codes, totals = tree.rollup(values, CODES, level=1)
+
+    assert codes.tolist() == ["1", "2"]
+    np.testing.assert_array_equal(totals, [[7, 8], [np.nan, 16]])
+
+
+def test_rollup_to_codes_on_other_axis(tree):
+    values = np.arange(7, dtype=float).reshape(7, 1)
+
+    codes, totals = tree.rollup(values, CODES, codes=["11", "2"], axis=0)
+
+    assert codes.tolist() == ["11", "2"]
+    np.testing.assert_array_equal(totals, [[2 + 3], [6]])
+
+
+def test_rollup_unknown_account(tree):
+    with pytest.raises(KeyError):
+        tree.rollup(np.zeros((1, 1)), ["9"], level=1)
+
+
+def test_round_trip(tree):
+    loaded = AccountTree.from_dict(tree.to_dict())
+
+    assert loaded.codes.equals(tree.codes)
+    np.testing.assert_array_equal(loaded.end, tree.end)
+    np.testing.assert_array_equal(loaded.is_leaf, tree.is_leaf)
@@ -0,0 +1,34 @@
+"""Tests of the pyarrow result backend."""
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from ans_wrapper import backends
+from ans_wrapper.backends import read_table
+
+
+def test_read_table_default_type_across_blocks(tmp_path, monkeypatch):
+    # the first blocks alone would infer an int64 column
+    monkeypatch.setattr(backends, "CSV_BLOCK_SIZE", 4096)
+    rows = [f"{i};{i}" for i in range(2_000)] + ["2000;ABC123"]
+    csv_path = tmp_path / "a.csv"
+    csv_path.write_text("\n".join(["CD_OPERADORA;CD_PLANO", *rows]) + "\n")
+
+    table = read_table(
+        str(csv_path),
+        column_types={"CD_OPERADORA": pa.int64()},
+        default_type=pa.string(),
+    )
+
+    assert table.schema.field("CD_OPERADORA").type == pa.int64()
+    assert table.column("CD_PLANO").to_pylist()[-1] == "ABC123"
+    assert table.num_rows == 2_001
+
+
+def test_read_table_default_type_needs_a_path(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    csv_path.write_text("CD_OPERADORA\n1\n")
+
+    with open(csv_path, "rb") as f, pytest.raises(ValueError):
+        read_table(f, default_type=pa.string())
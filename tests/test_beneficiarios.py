@@ -0,0 +1,41 @@
+"""Tests of the out-of-core aggregation of the Beneficiários files."""
+
+import pytest
+
+from ans_wrapper.beneficiarios import _aggregate_file
+
+BY = ["SG_UF", "CD_OPERADORA"]
+VALUES = ["QT_BENEFICIARIO_ATIVO"]
+
+
+def _write_csv(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "content", ["", "SG_UF;CD_OPERADORA;QT_BENEFICIARIO_ATIVO\n"]
+)
+def test_aggregate_empty_file(tmp_path, content):
+    partial = _aggregate_file(
+        _write_csv(tmp_path / "a.csv", content), BY, VALUES, chunk_size=10
+    )
+
+    assert partial.empty
+    assert partial.index.names == BY
+    assert list(partial.columns) == VALUES
+
+
+def test_aggregate_file_across_chunks(tmp_path):
+    content = "SG_UF;CD_OPERADORA;QT_BENEFICIARIO_ATIVO\n" + "".join(
+        f"SP;{i % 2};1\n" for i in range(5)
+    )
+
+    partial = _aggregate_file(
+        _write_csv(tmp_path / "a.csv", content), BY, VALUES, chunk_size=2
+    )
+
+    assert partial["QT_BENEFICIARIO_ATIVO"].to_dict() == {
+        ("SP", 0): 3,
+        ("SP", 1): 2,
+    }
@@ -0,0 +1,94 @@
+"""Tests of the persistent download cache."""
+
+import os
+
+from ans_wrapper.cache import DownloadCache
+from ans_wrapper.locks import FileLock
+
+
+def _put(cache, url, size, extracted=0):
+    path = cache.path_for(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"z" * size)
+    cache.put(url, path, {"ETag": '"1"'})
+
+    if extracted:
+        extract_dir = cache.extract_dir_for(url)
+        os.makedirs(extract_dir, exist_ok=True)
+        with open(os.path.join(extract_dir, "data.csv"), "wb") as f:
+            f.write(b"c" * extracted)
+        cache.record_extracted(url)
+    return path
+
+
+def test_put_and_get(tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    path = _put(cache, "http://host/a.zip", 10)
+
+    entry = cache.get("http://host/a.zip")
+    assert entry["path"] == path
+    assert entry["size"] == 10
+    assert cache.validation_headers("http://host/a.zip") == {
+        "If-None-Match": '"1"'
+    }
+    assert cache.verify("http://host/a.zip")
+
+
+def test_extracted_files_count_towards_size(tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    _put(cache, "http://host/a.zip", 10, extracted=100)
+
+    assert cache.size == 110
+
+
+def test_eviction_removes_extracted_files(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_size=150)
+    _put(cache, "http://host/a.zip", 10, extracted=100)
+    _put(cache, "http://host/b.zip", 10, extracted=100)
+
+    # the ZIPs alone fit, with their CSVs only the latest one does
+    assert cache.get("http://host/a.zip") is None
+    assert not os.path.exists(cache.extract_dir_for("http://host/a.zip"))
+    assert cache.get("http://host/b.zip") is not None
+    assert cache.size == 110
+
+
+def test_pinned_entries_are_kept_until_released(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_size=15)
+    urls = ["http://host/a.zip", "http://host/b.zip"]
+
+    with cache.pinned(urls):
+        _put(cache, urls[0], 10)
+        _put(cache, urls[1], 10)
+        # over the limit, but the batch still needs both files
+        assert cache.get(urls[0]) is not None
+        assert cache.size == 20
+
+    assert cache.get(urls[0]) is None
+    assert cache.get(urls[1]) is not None
+    assert cache.size == 10
+
+
+def test_eviction_skips_locked_entries(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_size=15)
+    path = _put(cache, "http://host/a.zip", 10)
+
+    # e.g. another process reading the file
+    with FileLock(path + ".lock"):
+        _put(cache, "http://host/b.zip", 10)
+    assert os.path.exists(path)
+
+    _put(cache, "http://host/c.zip", 10)
+    assert not os.path.exists(path)
+    assert cache.get("http://host/b.zip") is None
+
+
+def test_index_shared_between_instances(tmp_path):
+    first = DownloadCache(str(tmp_path))
+    second = DownloadCache(str(tmp_path))
+    _put(first, "http://host/a.zip", 10)
+    _put(second, "http://host/b.zip", 10)
+
+    assert first.get("http://host/b.zip") is not None
+    assert second.get("http://host/a.zip") is not None
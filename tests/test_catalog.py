@@ -0,0 +1,60 @@
+"""Tests of the catalog of the server."""
+
+import time
+
+from ans_wrapper.catalog import Catalog, parse_listing
+
+APACHE = """
+<a href="?C=N;O=D">Name</a>
+<a href="/FTP/">Parent Directory</a>
+<a href="2024/">2024/</a>        2024-05-02 10:05    -
+<a href="1T2024.zip">1T2024.zip</a>    2024-05-01 09:00  1.5M
+<a href="2T2024.zip">2T2024.zip</a>    2024-08-01 09:00  1234
+"""
+
+
+def test_parse_listing():
+    entries = parse_listing(APACHE)
+
+    assert entries == {
+        "2024/": [None, "2024-05-02 10:05"],
+        "1T2024.zip": [int(1.5 * 1024**2), "2024-05-01 09:00"],
+        "2T2024.zip": [1234, "2024-08-01 09:00"],
+    }
+
+
+def _folder(entries, fetched_at=None):
+    return {
+        "entries": entries,
+        "modified": None,
+        "fetched_at": fetched_at or time.time(),
+    }
+
+
+def test_save_merges_other_processes(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    first = Catalog("http://host/", path=path)
+    second = Catalog("http://host/", path=path)
+
+    first._folders["http://host/a/"] = _folder({"x.zip": [1, None]})
+    second._folders["http://host/b/"] = _folder({"y.zip": [2, None]})
+    first.save()
+    second.save()
+
+    catalog = Catalog("http://host/", path=path)
+    assert catalog.find("http://host/a/x.zip").size == 1
+    assert catalog.find("http://host/b/y.zip").size == 2
+
+
+def test_save_keeps_newest_listing(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    first = Catalog("http://host/", path=path)
+    second = Catalog("http://host/", path=path)
+
+    second._folders["http://host/a/"] = _folder({"new.zip": [1, None]}, 20)
+    second.save()
+    first._folders["http://host/a/"] = _folder({"old.zip": [1, None]}, 10)
+    first.save()
+
+    catalog = Catalog("http://host/", path=path)
+    assert list(catalog.folder("http://host/a/", offline=True)) == ["new.zip"]
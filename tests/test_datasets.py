@@ -0,0 +1,180 @@
+"""End-to-end tests of the dataset classes against the stand-in server."""
+
+import os
+
+import pandas as pd
+import pytest
+from conftest import MONTHS, QUARTERS, STATES
+
+from ans_wrapper import Beneficiarios, DemonstracoesContabeis
+from ans_wrapper.cli import main
+
+
+@pytest.fixture
+def b(cache):
+    return Beneficiarios()
+
+
+@pytest.fixture
+def dc(cache):
+    return DemonstracoesContabeis()
+
+
+# Beneficiários ----------
+
+
+def test_build_dataset(b, tmp_path):
+    df = b.build_dataset(
+        STATES, start=MONTHS[0], end=MONTHS[-1], output_name=tmp_path / "out"
+    )
+
+    assert len(df) == 2_000 * len(STATES) * len(MONTHS)
+    assert set(df["SG_UF"]) == set(STATES)
+
+
+def test_batch_larger_than_cache(cache, tmp_path):
+    from ans_wrapper.cache import configure_cache
+
+    # every file alone is bigger than the cache
+    configure_cache(cache_dir=str(tmp_path / "cache"), max_size=1)
+    b = Beneficiarios()
+
+    df = b.build_dataset(
+        STATES, target_date=MONTHS[0], output_name=tmp_path / "out"
+    )
+    totals = b.aggregate(STATES, by="SG_UF", target_date=MONTHS[0])
+
+    assert len(df) == 2_000 * len(STATES)
+    assert totals["QT_BENEFICIARIO_ATIVO"].sum() == (
+        df["QT_BENEFICIARIO_ATIVO"].sum()
+    )
+
+
+def test_store_matches_csv(b, tmp_path):
+    columns = ["SG_UF", "CD_OPERADORA", "QT_BENEFICIARIO_ATIVO"]
+    from_csv = b.build_dataset(
+        STATES,
+        target_date=MONTHS[0],
+        columns=columns,
+        output_name=tmp_path / "out",
+    )
+    from_store = b.build_dataset(
+        STATES, target_date=MONTHS[0], columns=columns, use_store=True
+    )
+
+    pd.testing.assert_frame_equal(
+        from_store[columns], from_csv[columns], check_dtype=False
+    )
+
+
+def test_arrow_backend_types(b):
+    pa = pytest.importorskip("pyarrow")
+
+    table = b.build_dataset(
+        STATES, target_date=MONTHS[0], backend="arrow", compact=False
+    )
+
+    assert table.num_rows == 2_000 * len(STATES)
+    assert table.schema.field("CD_OPERADORA").type == pa.int64()
+    # codes without a type are text, not numbers inferred from the first rows
+    assert table.schema.field("NR_CNPJ").type == pa.string()
+
+
+def test_iter_chunks(b):
+    chunks = list(b.iter_chunks(STATES, target_date=MONTHS[0], chunk_size=500))
+
+    assert {(chunk.state, chunk.month) for chunk in chunks} == {
+        (state, MONTHS[0]) for state in STATES
+    }
+    assert sum(len(chunk.data) for chunk in chunks) == 2_000 * len(STATES)
+
+
+def test_sampling_is_reproducible(b):
+    kwargs = {
+        "start": MONTHS[0],
+        "end": MONTHS[-1],
+        "chunk_size": 300,
+        "seed": 5,
+    }
+
+    first = b.build_dataset(STATES, sample_size=100, stratify="state", **kwargs)
+    second = b.build_dataset(
+        STATES, sample_size=100, stratify="state", **kwargs
+    )
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first["SG_UF"].value_counts().to_dict() == {"SP": 100, "RJ": 100}
+
+
+# Demonstrações Contábeis ----------
+
+
+def test_get_info_company(dc):
+    full = dc.get_info(QUARTERS)
+    company = int(full["REG_ANS"].iloc[0])
+
+    df = dc.get_info(QUARTERS, company=company, chunk_size=100)
+    parts = dc.get_info(QUARTERS, company=company, concat=False)
+
+    assert set(df["REG_ANS"]) == {company}
+    assert len(df) == (full["REG_ANS"] == company).sum()
+    assert [len(part) for part in parts] == [
+        (full[full["DATA"] == date]["REG_ANS"] == company).sum()
+        for date in full["DATA"].unique()
+    ]
+    with pytest.raises(ValueError, match="not found"):
+        dc.get_info(QUARTERS, company=1)
+
+
+def test_history_matches_get_info(dc):
+    full = dc.get_info(QUARTERS)
+    company = int(full["REG_ANS"].iloc[0])
+
+    dc.update_index(QUARTERS)
+    history = dc.history(company)
+
+    assert len(history) == (full["REG_ANS"] == company).sum()
+
+
+def test_update_index_refreshes_republished_quarters(dc):
+    store = dc.get_store()
+    dc.update_index(QUARTERS)
+    path = store.partition_path(quarter=QUARTERS[0])
+    written = os.stat(path).st_mtime_ns
+
+    # unchanged quarters are neither downloaded nor converted again
+    dc.update_index(QUARTERS)
+    assert os.stat(path).st_mtime_ns == written
+
+    # as if the server had published another file since
+    recorded = store.recorded(quarter=QUARTERS[0])
+    store.record({**recorded, "size": 1}, quarter=QUARTERS[0])
+    dc.update_index(QUARTERS)
+
+    assert os.stat(path).st_mtime_ns != written
+    assert store.recorded(quarter=QUARTERS[0]) == recorded
+
+
+def test_rollup(dc):
+    cube = dc.rollup(QUARTERS[:1], level=1)
+
+    assert list(cube.quarters) == QUARTERS[:1]
+    assert set(cube.accounts) <= set(dc.get_account_tree(QUARTERS[0]).level(1))
+
+
+def test_unpublished_quarter(dc):
+    with pytest.raises(ValueError, match="not published"):
+        dc.get_info("1T1999")
+
+
+# Command line ----------
+
+
+def test_prefetch(cache, capsys):
+    exit_code = main(
+        ["prefetch", "demonstracoes", "--quarters", "3T2023:1T2024", "--quiet"]
+    )
+
+    assert exit_code == 0
+    assert "Prefetched 3 quarters" in capsys.readouterr().out
+    assert main(["prefetch", "demonstracoes", "--quarters", "5T2023"]) == 1
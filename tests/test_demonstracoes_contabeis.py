@@ -0,0 +1,38 @@
+"""Tests of the parsing of the quarters' files."""
+
+import io
+
+import pytest
+
+from ans_wrapper.demonstracoes_contabeis import DemonstracoesContabeis
+from ans_wrapper.schemas import DEMONSTRACOES_CONTABEIS_SCHEMA
+
+CSV = (
+    b'"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";'
+    b'"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+    b'"2024-01-01";"300000";"1";"ATIVO";"10,5";"20,5"\n'
+    b'"2024-01-01";"300001";"1";"ATIVO";"1,0";"2,0"\n'
+)
+
+
+@pytest.mark.parametrize("company_list", [None, [300000]])
+@pytest.mark.parametrize("content", [b"", b"DATA;REG_ANS\n"])
+def test_read_stream_empty_file(content, company_list):
+    df = DemonstracoesContabeis._read_stream(
+        io.BytesIO(content), company_list, chunk_size=10
+    )
+
+    assert len(df) == 0
+    assert "REG_ANS" in df.columns
+
+
+def test_read_stream_filters_companies():
+    df = DemonstracoesContabeis._read_stream(
+        io.BytesIO(CSV),
+        [300001],
+        chunk_size=1,
+        schema=DEMONSTRACOES_CONTABEIS_SCHEMA,
+    )
+
+    assert df["REG_ANS"].tolist() == [300001]
+    assert df["VL_SALDO_FINAL"].tolist() == [2.0]
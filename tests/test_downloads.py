@@ -0,0 +1,144 @@
+"""Tests of the downloads: caching, resuming and locking."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+from ans_wrapper.cache import DownloadCache
+from ans_wrapper.locks import FileLock, atomic_write
+from ans_wrapper.utils import download_zip, remote_info
+
+
+def _url(server):
+    return server.base_url + "demonstracoes_contabeis/2024/1T2024.zip"
+
+
+def _served_file(server):
+    path = os.path.join(
+        server.root,
+        "FTP",
+        "PDA",
+        "demonstracoes_contabeis",
+        "2024",
+        "1T2024.zip",
+    )
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Cache ----------
+
+
+def test_download_is_cached_and_revalidated(server, cache):
+    url = _url(server)
+
+    path = download_zip(url, cache=cache)
+    first = server.reset_stats()
+    assert download_zip(url, cache=cache) == path
+    again = server.reset_stats()
+
+    with open(path, "rb") as f:
+        assert f.read() == _served_file(server)
+    assert first["bytes_sent"] == len(_served_file(server))
+    # a 304 Not Modified, without the file
+    assert again == {"requests": 1, "bytes_sent": 0}
+    assert download_zip(url, cache=cache, revalidate=False) == path
+    assert server.reset_stats()["requests"] == 0
+
+
+# Resume ----------
+
+
+def test_interrupted_download_is_resumed(server, cache):
+    url = _url(server)
+    data = _served_file(server)
+    half = len(data) // 2
+
+    part_path = cache.path_for(url) + ".part"
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    with open(part_path, "wb") as f:
+        f.write(data[:half])
+    with open(part_path + ".validator", "w") as f:
+        f.write(remote_info(url)["etag"])
+    server.reset_stats()
+
+    path = download_zip(url, cache=cache)
+
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert server.reset_stats()["bytes_sent"] == len(data) - half
+    assert not os.path.exists(part_path)
+    assert cache.verify(url)
+
+
+def test_outdated_partial_download_starts_over(server, cache):
+    url = _url(server)
+    data = _served_file(server)
+
+    part_path = cache.path_for(url) + ".part"
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    with open(part_path, "wb") as f:
+        f.write(b"bytes of an older version")
+    with open(part_path + ".validator", "w") as f:
+        f.write('"older"')
+
+    path = download_zip(url, cache=cache)
+
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+# Locking ----------
+
+
+def _hold_lock(path, ready, release):
+    with FileLock(path):
+        ready.set()
+        release.wait(10)
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    path = str(tmp_path / "file.lock")
+    context = get_context("spawn")
+    ready, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(path, ready, release))
+    holder.start()
+    try:
+        assert ready.wait(10)
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout=0.2).acquire()
+    finally:
+        release.set()
+        holder.join(10)
+
+    with FileLock(path, timeout=1):
+        pass
+
+
+def _download(url, cache_dir):
+    return download_zip(url, cache=DownloadCache(cache_dir))
+
+
+def test_concurrent_processes_download_once(server, tmp_path):
+    url = _url(server)
+    cache_dir = str(tmp_path / "shared")
+
+    with ProcessPoolExecutor(4, mp_context=get_context("spawn")) as executor:
+        paths = list(executor.map(_download, [url] * 4, [cache_dir] * 4))
+
+    assert len(set(paths)) == 1
+    stats = server.reset_stats()
+    assert stats["bytes_sent"] == len(_served_file(server))
+    assert list(DownloadCache(cache_dir)._index) == [url]
+
+
+def test_atomic_write_leaves_no_partial_file(tmp_path):
+    path = tmp_path / "data.json"
+
+    with pytest.raises(RuntimeError), atomic_write(str(path)) as f:
+        f.write("partial")
+        raise RuntimeError
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,87 @@
+"""Tests of the streaming sampler."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ans_wrapper.sampling import Sampler
+
+
+def _chunks(n=10_000, chunk_size=700):
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        yield pd.DataFrame(
+            {"x": np.arange(start, stop), "group": np.arange(start, stop) % 3}
+        )
+
+
+def _sample(stratify=False, **kwargs):
+    sampler = Sampler(**kwargs)
+    for chunk in _chunks():
+        if stratify:
+            for group, rows in chunk.groupby("group"):
+                sampler.add(rows, stratum=group)
+        else:
+            sampler.add(chunk)
+    return sampler.result()
+
+
+def test_same_seed_same_sample():
+    first = _sample(size=100, seed=7)
+    second = _sample(size=100, seed=7)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert not first.equals(_sample(size=100, seed=8))
+
+
+def test_size_keeps_stream_order():
+    sample = _sample(size=100, seed=1)
+
+    assert len(sample) == 100
+    assert sample["x"].is_monotonic_increasing
+    assert sample["x"].is_unique
+
+
+def test_size_larger_than_stream():
+    sample = _sample(size=20_000, seed=1)
+
+    assert sample["x"].tolist() == list(range(10_000))
+
+
+def test_stratified_size():
+    sample = _sample(stratify=True, size=50, seed=1)
+
+    assert sample["group"].value_counts().to_dict() == {0: 50, 1: 50, 2: 50}
+
+
+def test_reservoir_is_uniform():
+    hits = np.zeros(10_000)
+    for seed in range(200):
+        hits[_sample(size=100, seed=seed)["x"]] += 1
+
+    # 2000 rows drawn from each tenth of the stream on average
+    per_tenth = hits.reshape(10, -1).sum(axis=1)
+    assert np.all(np.abs(per_tenth - 2_000) < 250)
+
+
+def test_frac():
+    sample = _sample(frac=0.1, seed=3)
+
+    assert 800 < len(sample) < 1_200
+    pd.testing.assert_frame_equal(sample, _sample(frac=0.1, seed=3))
+
+
+def test_empty_stream():
+    assert Sampler(size=10).result().empty
+    sampler = Sampler(size=10)
+    sampler.add(pd.DataFrame({"x": []}))
+    assert list(sampler.result().columns) == ["x"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"size": 1, "frac": 0.5}, {"size": -1}, {"frac": 1.5}],
+)
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        Sampler(**kwargs)
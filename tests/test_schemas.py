@@ -0,0 +1,31 @@
+"""Tests of the compact column types."""
+
+import io
+
+import pandas as pd
+
+from ans_wrapper.schemas import BENEFICIARIOS_SCHEMA, memory_report
+
+
+def test_unknown_state_codes_are_kept():
+    csv = b"SG_UF;QT_BENEFICIARIO_ATIVO\nSP;1\nXX;2\n;3\n"
+
+    df = pd.read_csv(
+        io.BytesIO(csv), sep=";", **BENEFICIARIOS_SCHEMA.read_csv_kwargs()
+    )
+
+    assert isinstance(df["SG_UF"].dtype, pd.CategoricalDtype)
+    assert df["SG_UF"].tolist()[:2] == ["SP", "XX"]
+    assert df["SG_UF"].isna().tolist() == [False, False, True]
+
+
+def test_apply_after_concat():
+    parts = [
+        pd.DataFrame({"SG_UF": ["SP"]}).astype("category"),
+        pd.DataFrame({"SG_UF": ["RJ"]}).astype("category"),
+    ]
+
+    df = BENEFICIARIOS_SCHEMA.apply(pd.concat(parts, ignore_index=True))
+
+    assert isinstance(df["SG_UF"].dtype, pd.CategoricalDtype)
+    assert memory_report(df)["compact_bytes"] > 0
@@ -0,0 +1,63 @@
+"""Tests of the local Parquet store."""
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from ans_wrapper import store as store_module
+from ans_wrapper.store import ParquetStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ParquetStore("test", ("state", "month"), root=str(tmp_path / "db"))
+
+
+def _write_csv(path, rows):
+    lines = ["CD_OPERADORA;NM_MUNICIPIO;CD_PLANO"] + rows
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_write_and_read_round_trip(store, tmp_path):
+    csv_path = _write_csv(tmp_path / "a.csv", ["1;SAO PAULO;10", "2;;20"])
+
+    store.write(csv_path, state="SP", month="202401")
+
+    assert store.has(state="SP", month="202401")
+    assert store.partitions() == [{"state": "SP", "month": "202401"}]
+    df = store.read([{"state": "SP", "month": "202401"}], ["CD_OPERADORA"])
+    assert df["CD_OPERADORA"].tolist() == [1, 2]
+
+
+def test_write_explicit_types_across_blocks(store, tmp_path, monkeypatch):
+    # the first blocks alone would infer a null and an int64 column
+    monkeypatch.setattr(store_module, "CSV_BLOCK_SIZE", 1024)
+    rows = [f"{i};;{i}" for i in range(500)] + ["500;x;x1"]
+    csv_path = _write_csv(tmp_path / "a.csv", rows)
+
+    store.write(
+        csv_path,
+        column_types={"CD_OPERADORA": pa.int64()},
+        default_type=pa.string(),
+        state="SP",
+        month="202401",
+    )
+
+    table = store.read_table([{"state": "SP", "month": "202401"}])
+    assert table.schema.field("CD_OPERADORA").type == pa.int64()
+    assert table.schema.field("NM_MUNICIPIO").type == pa.string()
+    assert table.column("CD_PLANO").to_pylist()[-1] == "x1"
+    assert table.num_rows == 501
+
+
+def test_read_missing_partition(store):
+    with pytest.raises(FileNotFoundError):
+        store.read([{"state": "SP", "month": "202401"}])
+
+
+def test_record(store, tmp_path):
+    store.record({"size": 10}, state="SP", month="202401")
+
+    assert store.recorded(state="SP", month="202401") == {"size": 10}
+    assert store.recorded(state="RJ", month="202401") is None
@@ -0,0 +1,71 @@
+"""Tests of the download and CSV helpers."""
+
+import zipfile
+
+import pytest
+
+from ans_wrapper import utils
+
+
+def _write_zip(path, name, content: bytes):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(name, content)
+    return str(path)
+
+
+# Concatenation ----------
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 7, 1024])
+def test_concat_csv_files_bytes_any_buffer_size(
+    tmp_path, monkeypatch, buffer_size
+):
+    # blocks that end mid-row must be written as they are
+    monkeypatch.setattr(utils, "COPY_BUFFER_SIZE", buffer_size)
+    first = tmp_path / "a.csv"
+    first.write_bytes(b"A;B\n1;hello\n2;world")
+    second = tmp_path / "b.csv"
+    second.write_bytes(b"A;B\n3;foo\n4;bar\n")
+    output = tmp_path / "out.csv"
+
+    utils.concat_csv_files([str(first), str(second)], str(output))
+
+    assert output.read_bytes() == (b"A;B\n1;hello\n2;world\n3;foo\n4;bar\n")
+
+
+def test_concat_csv_files_from_zips(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "COPY_BUFFER_SIZE", 5)
+    paths = [
+        _write_zip(tmp_path / "a.zip", "a.csv", b"A;B\n1;x\n"),
+        _write_zip(tmp_path / "b.zip", "b.csv", b"A;B\n2;y\n"),
+    ]
+    output = tmp_path / "out.csv"
+
+    utils.concat_csv_files(paths, str(output))
+
+    assert output.read_bytes() == b"A;B\n1;x\n2;y\n"
+
+
+def test_concat_csv_files_different_headers(tmp_path):
+    # headers quoted differently are parsed and rewritten
+    first = tmp_path / "a.csv"
+    first.write_bytes(b"A;B\n1;x\n")
+    second = tmp_path / "b.csv"
+    second.write_bytes(b'"A";"B"\n2;y')
+    output = tmp_path / "out.csv"
+
+    utils.concat_csv_files([str(first), str(second)], str(output))
+
+    assert output.read_text().splitlines() == ["A;B", "1;x", "2;y"]
+
+
+# Parallel parsing ----------
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_parallel(max_workers):
+    results = utils.iter_parallel(
+        pow, [(n, 2) for n in range(5)], max_workers=max_workers
+    )
+
+    assert sorted(results) == [0, 1, 4, 9, 16]